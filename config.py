@@ -20,6 +20,24 @@ USERS_FILE = "users.json"
 APPOINTMENTS_FILE = "appointments.json"
 TIMESLOTS_FILE = "timeslots.json"
 
+# Backend de stockage : "json" (fichiers data/*.json) ou "sqlite" (data/cabinet.db)
+STORAGE_BACKEND = "json"
+SQLITE_FILE = "cabinet.db"
+
+# Rétention des notifications : au-delà, elles passent dans data/archives (gzip par mois)
+NOTIFICATION_RETENTION = {
+    'read_days': 90,       # notifs lues ou envoyées
+    'unread_days': 365,    # notifs non lues
+    'archive_dir': 'archives',
+    'interval_hours': 24   # fréquence de la passe d'archivage
+}
+
+# Rappels email avant chaque rdv confirmé : nom -> délai avant le début
+# (ex. {'J-7': timedelta(days=7), 'J-1': timedelta(days=1), 'H-2': timedelta(hours=2)})
+REMINDER_LEAD_TIMES = {
+    'J-1': timedelta(days=1)
+}
+
 # Paramètres GUI
 WINDOW_WIDTH = 1024
 WINDOW_HEIGHT = 768
@@ -1,15 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from managers.appointment_manager import AppointmentManager
-from managers.storage_manager import StorageManager
-from managers.user_manager import UserManager
-from managers.schedule_manager import ScheduleManager
-from managers.prescription_manager import PrescriptionManager
 from datetime import datetime, timedelta
 from tkcalendar import DateEntry
 from PIL import Image, ImageTk
 import os
 import logging
+from managers import event_bus as events
+from gui.treeview_binder import TreeviewBinder, format_iso
+from gui.virtual_list import VirtualList
+
+APPOINTMENT_EVENTS = (events.APPOINTMENT_BOOKED, events.APPOINTMENT_VALIDATED, events.APPOINTMENT_CANCELLED,
+                      events.APPOINTMENT_STATUS_CHANGED, events.APPOINTMENT_DELETED)
+SCHEDULE_EVENTS = (events.SLOTS_ADDED, events.SLOT_BLOCKED, events.SLOT_UNBLOCKED, events.SLOT_RESERVED,
+                   events.SLOT_RELEASED, events.SCHEDULE_CHANGED)
+PRESCRIPTION_EVENTS = (events.PRESCRIPTION_CREATED, events.PRESCRIPTION_UPDATED, events.PRESCRIPTION_DELETED)
 
 # --- Base Frame for Content ---
 class ContentFrame(tk.Frame):
@@ -32,8 +36,8 @@ class PatientDashboardFrame(ContentFrame):
 class PatientAppointmentsFrame(ContentFrame):
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
-        self.appointment_manager = AppointmentManager(StorageManager())
-        self.user_manager = UserManager(StorageManager())
+        self.appointment_manager = controller.context.appointment_manager
+        self.user_manager = controller.context.user_manager
         
         # --- Main Layout ---
         self.grid_rowconfigure(1, weight=1)
@@ -49,6 +53,7 @@ class PatientAppointmentsFrame(ContentFrame):
         # Create Treeview for appointments
         columns = ("ID", "Médecin", "Date", "Heure", "Statut", "Raison")
         self.appointments_tree = ttk.Treeview(appointments_frame, columns=columns, show='headings', height=15)
+        self.appointments_binder = TreeviewBinder(self.appointments_tree)
         
         # Configure columns
         for col in columns:
@@ -75,31 +80,36 @@ class PatientAppointmentsFrame(ContentFrame):
         refresh_button.pack(side='right', padx=10)
 
         self.load_patient_appointments()
+        # la liste suit les changements publiés par l'AppointmentManager
+        controller.dispatcher.subscribe(APPOINTMENT_EVENTS, self.on_appointment_event)
+
+    def _appointment_values(self, app):
+        doctor = self.user_manager.find_user_by_doctor_id(app['doctor_id'])
+        doctor_name = f"{doctor['first_name']} {doctor['last_name']}" if doctor else "Inconnu"
+        return (
+            app['appointment_id'],
+            doctor_name,
+            format_iso(app['start_time'], '%Y-%m-%d'),
+            format_iso(app['start_time'], '%H:%M'),
+            app['status'],
+            app['reason']
+        )
 
     def load_patient_appointments(self):
-        # Toujours recharger les rendez-vous depuis le fichier
-        self.appointment_manager.appointments = self.appointment_manager._load_appointments()
-        for i in self.appointments_tree.get_children():
-            self.appointments_tree.delete(i)
-        
+        # les rdv sont partagés en mémoire (AppContext) : pas de relecture du fichier
         patient_id = self.controller.user['patient_id']
         appointments = self.appointment_manager.get_appointments_for_patient(patient_id)
-        
-        doctors = {user['doctor_id']: f"{user['first_name']} {user['last_name']}" 
-                   for user in self.user_manager.users if user['role'] == 'Doctor'}
 
-        for app in sorted(appointments, key=lambda x: x['start_time'], reverse=True):
-            doctor_name = doctors.get(app['doctor_id'], "Inconnu")
-            start_time = datetime.fromisoformat(app['start_time'])
-            
-            self.appointments_tree.insert("", "end", values=(
-                app['appointment_id'],
-                doctor_name,
-                start_time.strftime('%Y-%m-%d'),
-                start_time.strftime('%H:%M'),
-                app['status'],
-                app['reason']
-            ))
+        # seules les lignes modifiées sont mises à jour
+        self.appointments_binder.bind(
+            (app['appointment_id'], self._appointment_values(app))
+            for app in sorted(appointments, key=lambda x: x['start_time'], reverse=True))
+
+    def on_appointment_event(self, event_type, payload):
+        """applique un changement de rdv à la liste (thread Tk)"""
+        if payload['appointment']['patient_id'] == self.controller.user['patient_id']:
+            # diff sur les rdv du patient : seule la ligne concernée change (et garde sa place par date)
+            self.load_patient_appointments()
 
     def cancel_selected_appointment(self):
         selected_item = self.appointments_tree.selection()
@@ -113,16 +123,15 @@ class PatientAppointmentsFrame(ContentFrame):
             success, message = self.appointment_manager.cancel_appointment(appointment_id)
             if success:
                 messagebox.showinfo("Succès", message)
-                self.load_patient_appointments()
             else:
                 messagebox.showerror("Erreur", message)
 
 class PatientNewAppointmentFrame(ContentFrame):
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
-        self.appointment_manager = AppointmentManager(StorageManager())
-        self.user_manager = UserManager(StorageManager())
-        self.schedule_manager = ScheduleManager(StorageManager())
+        self.appointment_manager = controller.context.appointment_manager
+        self.user_manager = controller.context.user_manager
+        self.schedule_manager = controller.context.schedule_manager
         self.doctors_by_specialty = self._get_doctors_by_specialty()
         
         # --- Main Layout ---
@@ -174,9 +183,9 @@ class PatientNewAppointmentFrame(ContentFrame):
         self.reason_entry.grid(row=5, column=1, sticky="ew", padx=5, pady=10)
 
         # Book Button
-        book_button = ttk.Button(booking_frame, text="Prendre Rendez-vous", 
-                                command=self.book_appointment, style='Accent.TButton')
-        book_button.grid(row=6, column=1, sticky="e", padx=5, pady=20)
+        self.book_button = ttk.Button(booking_frame, text="Prendre Rendez-vous", 
+                                     command=self.book_appointment, style='Accent.TButton')
+        self.book_button.grid(row=6, column=1, sticky="e", padx=5, pady=20)
 
     def _get_doctors_by_specialty(self):
         doctors = [user for user in self.user_manager.users if user['role'] == 'Doctor']
@@ -215,25 +224,17 @@ class PatientNewAppointmentFrame(ContentFrame):
             messagebox.showerror("Erreur", "Impossible de trouver le médecin sélectionné.")
             return
             
-        available_slots = self.schedule_manager.get_doctor_availability(doctor_id)
+        available_slots = self.schedule_manager.get_doctor_availability(doctor_id, selected_date)
         
         for slot in available_slots:
             start_time = datetime.fromisoformat(slot['start_time'])
-            slot_date = start_time.date()
-            
-            if slot_date == selected_date:
-                self.slots_listbox.insert(tk.END, start_time.strftime('%H:%M'))
+            self.slots_listbox.insert(tk.END, start_time.strftime('%H:%M'))
         
         if self.slots_listbox.size() == 0:
-            all_slots = self.schedule_manager.get_doctor_schedule(doctor_id)
-            available_dates = set()
-            for slot in all_slots:
-                if not slot['is_reserved']:
-                    slot_date = datetime.fromisoformat(slot['start_time']).date()
-                    available_dates.add(slot_date)
+            available_dates = self.schedule_manager.get_available_dates(doctor_id, limit=5)
             
             if available_dates:
-                dates_str = ", ".join([d.strftime('%Y-%m-%d') for d in sorted(available_dates)[:5]])
+                dates_str = ", ".join([d.strftime('%Y-%m-%d') for d in available_dates])
                 messagebox.showinfo("Aucun créneau pour la date sélectionnée", 
                                   f"Aucun créneau disponible pour {selected_date}.\n\nDates disponibles pour ce médecin: {dates_str}")
             else:
@@ -269,21 +270,27 @@ class PatientNewAppointmentFrame(ContentFrame):
         start_time = datetime(selected_date.year, selected_date.month, selected_date.day, hour, minute)
         end_time = start_time + timedelta(hours=1)
         
-        try:
-            success, message = self.appointment_manager.book_appointment(patient_id, doctor_id, start_time, end_time, reason, auto_confirm=True)
-            if success:
-                messagebox.showinfo("Succès", message)
-                self.controller.show_content("PatientAppointmentsFrame")
-            else:
-                messagebox.showerror("Erreur", message)
-        except Exception as e:
-            logging.error(f"Exception in book_appointment: {e}")
-            messagebox.showerror("Erreur", "Une erreur inattendue est survenue.")
+        # Book in the background: the window stays responsive while it saves
+        self.controller.tasks.submit(
+            lambda task: self.appointment_manager.book_appointment(patient_id, doctor_id, start_time, end_time, reason, auto_confirm=True, check_patient_overlap=True),
+            on_done=self._on_booked, on_error=self._on_book_error, widgets=[self.book_button])
+
+    def _on_booked(self, result):
+        success, message = result
+        if success:
+            messagebox.showinfo("Succès", message)
+            self.controller.show_content("PatientAppointmentsFrame")
+        else:
+            messagebox.showerror("Erreur", message)
+
+    def _on_book_error(self, e):
+        logging.error(f"Exception in book_appointment: {e}")
+        messagebox.showerror("Erreur", "Une erreur inattendue est survenue.")
 
 class PatientProfileFrame(ContentFrame):
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
-        self.user_manager = UserManager(StorageManager())
+        self.user_manager = controller.context.user_manager
         self.user_info = self.user_manager.find_user_by_email(controller.user['email'])
 
         frame = ttk.Frame(self, padding="20")
@@ -352,13 +359,15 @@ class PatientProfileFrame(ContentFrame):
 
 # --- Doctor Frames ---
 class DoctorDashboardFrame(ContentFrame):
+    WEEKDAYS = ("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche")
+
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
         
-        self.appointment_manager = AppointmentManager(StorageManager())
-        self.schedule_manager = ScheduleManager(StorageManager())
-        self.user_manager = UserManager(StorageManager())
-        self.prescription_manager = PrescriptionManager(StorageManager())
+        self.appointment_manager = controller.context.appointment_manager
+        self.schedule_manager = controller.context.schedule_manager
+        self.user_manager = controller.context.user_manager
+        self.prescription_manager = controller.context.prescription_manager
         self.doctor_id = controller.user['doctor_id']
         
         main_container = ttk.Frame(self)
@@ -392,6 +401,32 @@ class DoctorDashboardFrame(ContentFrame):
         
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
+        # changements publiés par les managers (autres écrans, service de rappels...)
+        controller.dispatcher.subscribe(APPOINTMENT_EVENTS, self.on_appointment_event)
+        controller.dispatcher.subscribe(SCHEDULE_EVENTS, self.on_schedule_event)
+        controller.dispatcher.subscribe(PRESCRIPTION_EVENTS, self.on_prescription_event)
+        
+    def on_appointment_event(self, event_type, payload):
+        """met à jour la ligne du rdv concerné (thread Tk)"""
+        app = payload['appointment']
+        if app['doctor_id'] != self.doctor_id:
+            return
+        status_filter = self.status_filter.get()
+        if event_type == events.APPOINTMENT_DELETED or (status_filter != "Tous" and app['status'] != status_filter):
+            self.appointments_binder.remove(app['appointment_id'])
+        else:
+            self.appointments_binder.upsert(app['appointment_id'], self._appointment_values(app))
+        
+    def on_schedule_event(self, event_type, payload):
+        """recharge le planning (depuis la mémoire) quand il change"""
+        if payload['doctor_id'] == self.doctor_id:
+            self.load_doctor_schedule()
+        
+    def on_prescription_event(self, event_type, payload):
+        """recharge les ordonnances (depuis la mémoire) quand une des miennes change"""
+        if payload['prescription'].doctor_id == self.doctor_id:
+            self.load_doctor_prescriptions()
+        
     def on_tab_changed(self, event):
         current_tab = self.notebook.select()
         tab_id = self.notebook.index(current_tab)
@@ -429,6 +464,7 @@ class DoctorDashboardFrame(ContentFrame):
         
         columns = ("ID", "Patient", "Date", "Heure", "Statut", "Raison")
         self.appointments_tree = ttk.Treeview(self.appointments_frame, columns=columns, show='headings', height=15)
+        self.appointments_binder = TreeviewBinder(self.appointments_tree)
         
         for col in columns:
             self.appointments_tree.heading(col, text=col)
@@ -472,6 +508,9 @@ class DoctorDashboardFrame(ContentFrame):
         ttk.Label(time_frame, text=":").pack(side='left')
         ttk.Spinbox(time_frame, from_=0, to=59, width=5, textvariable=self.end_minute).pack(side='left', padx=(5, 0))
         
+        self.repeat_weekly = tk.BooleanVar(value=False)
+        ttk.Checkbutton(add_frame, text="Répéter chaque semaine", variable=self.repeat_weekly).pack(anchor='w')
+        
         ttk.Button(add_frame, text="Ajouter Disponibilité", command=self.add_availability).pack(pady=(10, 0))
         
         block_frame = ttk.LabelFrame(self.schedule_frame, text="Bloquer Créneaux (Marquer comme Indisponible)", padding=10)
@@ -499,6 +538,9 @@ class DoctorDashboardFrame(ContentFrame):
         ttk.Label(block_time_frame, text=":").pack(side='left')
         ttk.Spinbox(block_time_frame, from_=0, to=59, width=5, textvariable=self.block_end_minute).pack(side='left', padx=(5, 0))
         
+        self.block_whole_day = tk.BooleanVar(value=False)
+        ttk.Checkbutton(block_frame, text="Journée entière (absence)", variable=self.block_whole_day).pack(anchor='w')
+        
         ttk.Button(block_frame, text="Bloquer Créneaux", command=self.block_time_slots).pack(pady=(10, 0))
         
         schedule_display_frame = ttk.LabelFrame(self.schedule_frame, text="Planning Actuel", padding=10)
@@ -506,6 +548,7 @@ class DoctorDashboardFrame(ContentFrame):
         
         schedule_columns = ("Date", "Heure Début", "Heure Fin", "Statut")
         self.schedule_tree = ttk.Treeview(schedule_display_frame, columns=schedule_columns, show='headings', height=10)
+        self.schedule_binder = TreeviewBinder(self.schedule_tree)
         
         for col in schedule_columns:
             self.schedule_tree.heading(col, text=col)
@@ -599,9 +642,9 @@ class DoctorDashboardFrame(ContentFrame):
         buttons_frame = ttk.Frame(create_frame)
         buttons_frame.pack(fill='x', pady=(10, 0))
         
-        create_btn = ttk.Button(buttons_frame, text="Créer Ordonnance", 
-                               command=self.create_prescription)
-        create_btn.pack(side='left', padx=(0, 10))
+        self.create_prescription_btn = ttk.Button(buttons_frame, text="Créer Ordonnance", 
+                                                  command=self.create_prescription)
+        self.create_prescription_btn.pack(side='left', padx=(0, 10))
         
         clear_btn = ttk.Button(buttons_frame, text="Effacer Formulaire", 
                               command=self.clear_prescription_form)
@@ -629,6 +672,7 @@ class DoctorDashboardFrame(ContentFrame):
         # Treeview pour les ordonnances
         columns = ("ID", "Patient", "Date", "Médicaments", "Instructions")
         self.prescriptions_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=10)
+        self.prescriptions_binder = TreeviewBinder(self.prescriptions_tree)
         
         for col in columns:
             self.prescriptions_tree.heading(col, text=col)
@@ -653,55 +697,44 @@ class DoctorDashboardFrame(ContentFrame):
         self.temp_medications = []
 
     def load_doctor_appointments(self):
-        for item in self.appointments_tree.get_children():
-            self.appointments_tree.delete(item)
-        
         appointments = self.appointment_manager.get_appointments_for_doctor(self.doctor_id)
         
-        patients = {user['patient_id']: f"{user['first_name']} {user['last_name']}" 
-                   for user in self.user_manager.users if user['role'] == 'Patient'}
-        
         status_filter = self.status_filter.get()
         
-        for app in appointments:
-            if status_filter != "Tous" and app['status'] != status_filter:
-                continue
-                
-            patient_name = patients.get(app['patient_id'], f"Patient {app['patient_id']}")
-            start_time = datetime.fromisoformat(app['start_time'])
-            
-            self.appointments_tree.insert("", "end", values=(
-                app['appointment_id'],
-                patient_name,
-                start_time.strftime('%Y-%m-%d'),
-                start_time.strftime('%H:%M'),
-                app['status'],
-                app['reason']
-            ))
+        # diff avec les lignes affichées : la sélection est conservée
+        self.appointments_binder.bind(
+            (app['appointment_id'], self._appointment_values(app))
+            for app in appointments
+            if status_filter == "Tous" or app['status'] == status_filter)
+    
+    def _appointment_values(self, app):
+        patient = self.user_manager.find_user_by_patient_id(app['patient_id'])
+        patient_name = f"{patient['first_name']} {patient['last_name']}" if patient else f"Patient {app['patient_id']}"
+        return (
+            app['appointment_id'],
+            patient_name,
+            format_iso(app['start_time'], '%Y-%m-%d'),
+            format_iso(app['start_time'], '%H:%M'),
+            app['status'],
+            app['reason']
+        )
     
     def load_doctor_schedule(self):
-        for item in self.schedule_tree.get_children():
-            self.schedule_tree.delete(item)
-        
         schedule = self.schedule_manager.get_doctor_schedule(self.doctor_id)
         
-        for slot in schedule:
-            start_time = datetime.fromisoformat(slot['start_time'])
-            end_time = datetime.fromisoformat(slot['end_time'])
-            status = "Réservé" if slot['is_reserved'] else "Disponible"
-            
-            self.schedule_tree.insert("", "end", values=(
-                start_time.strftime('%Y-%m-%d'),
-                start_time.strftime('%H:%M'),
-                end_time.strftime('%H:%M'),
-                status
+        # clé : début du créneau (les créneaux récurrents n'ont pas d'id)
+        self.schedule_binder.bind(
+            (slot['start_time'], (
+                format_iso(slot['start_time'], '%Y-%m-%d'),
+                format_iso(slot['start_time'], '%H:%M'),
+                format_iso(slot['end_time'], '%H:%M'),
+                "Réservé" if slot['is_reserved'] else "Disponible"
             ))
+            for slot in schedule)
     
     def load_doctor_prescriptions(self):
         """Charge la liste des ordonnances du médecin."""
-        for item in self.prescriptions_tree.get_children():
-            self.prescriptions_tree.delete(item)
-        
+        rows = []
         prescriptions = self.prescription_manager.get_prescriptions_for_doctor(self.doctor_id)
         patients = {user['patient_id']: f"{user['first_name']} {user['last_name']}" 
                    for user in self.user_manager.users if user['role'] == 'Patient'}
@@ -724,13 +757,15 @@ class DoctorDashboardFrame(ContentFrame):
             # Tronquer les instructions si trop longues
             instructions = prescription.instructions[:50] + "..." if len(prescription.instructions) > 50 else prescription.instructions
             
-            self.prescriptions_tree.insert('', 'end', values=(
+            rows.append((prescription.prescription_id, (
                 prescription.prescription_id,
                 patient_name,
-                prescription.get_formatted_date(),
+                format_iso(prescription.date, '%d/%m/%Y'),
                 meds_text,
                 instructions
-            ))
+            )))
+        
+        self.prescriptions_binder.bind(rows)
     
     def add_medication_to_list(self):
         """Ajoute un médicament à la liste temporaire."""
@@ -794,14 +829,23 @@ class DoctorDashboardFrame(ContentFrame):
         # Récupérer les instructions
         instructions = self.instructions_text.get("1.0", tk.END).strip()
         
-        # Créer l'ordonnance
-        success, message = self.prescription_manager.create_prescription(
-            patient['patient_id'], 
-            self.doctor_id, 
-            list(self.temp_medications),  # copie de la liste !
-            instructions
+        # Créer l'ordonnance (en arrière-plan : la sauvegarde peut être lente)
+        patient_id = patient['patient_id']
+        medications = list(self.temp_medications)  # copie de la liste !
+        self.controller.tasks.submit(
+            lambda task: self.prescription_manager.create_prescription(
+                patient_id, 
+                self.doctor_id, 
+                medications,
+                instructions
+            ),
+            on_done=self._on_prescription_created,
+            on_error=lambda e: messagebox.showerror("Erreur", f"Erreur lors de la création: {e}"),
+            widgets=[self.create_prescription_btn]
         )
-        
+    
+    def _on_prescription_created(self, result):
+        success, message = result
         if success:
             messagebox.showinfo("Succès", message)
             self.clear_prescription_form()
@@ -917,16 +961,15 @@ class DoctorDashboardFrame(ContentFrame):
         
         appointment_id = self.appointments_tree.item(selected[0])['values'][0]
         
-        for app in self.appointment_manager.appointments:
-            if app['appointment_id'] == appointment_id:
-                if app['status'] == 'Planifié':
-                    app['status'] = 'Terminé'
-                    self.appointment_manager._save_appointments()
-                    messagebox.showinfo("Succès", f"Rendez-vous {appointment_id} marqué comme terminé.")
-                    self.load_doctor_appointments()
-                else:
-                    messagebox.showwarning("Attention", f"Le rendez-vous {appointment_id} est déjà {app['status']}.")
-                return
+        app = self.appointment_manager.get_appointment(appointment_id)
+        if app:
+            if app['status'] == 'Planifié':
+                self.appointment_manager.update_appointment_status(appointment_id, 'Terminé')
+                messagebox.showinfo("Succès", f"Rendez-vous {appointment_id} marqué comme terminé.")
+                self.load_doctor_appointments()
+            else:
+                messagebox.showwarning("Attention", f"Le rendez-vous {appointment_id} est déjà {app['status']}.")
+            return
         
         messagebox.showerror("Erreur", "Rendez-vous introuvable.")
     
@@ -939,22 +982,22 @@ class DoctorDashboardFrame(ContentFrame):
         values = self.appointments_tree.item(selected[0])['values']
         appointment_id = values[0]
         
-        for app in self.appointment_manager.appointments:
-            if app['appointment_id'] == appointment_id:
-                start_time = datetime.fromisoformat(app['start_time'])
-                end_time = datetime.fromisoformat(app['end_time'])
-                
-                details = f"""Détails du Rendez-vous:
-                
+        app = self.appointment_manager.get_appointment(appointment_id)
+        if app:
+            start_time = datetime.fromisoformat(app['start_time'])
+            end_time = datetime.fromisoformat(app['end_time'])
+            
+            details = f"""Détails du Rendez-vous:
+            
 ID: {app['appointment_id']}
 ID Patient: {app['patient_id']}
 Date: {start_time.strftime('%Y-%m-%d')}
 Heure: {start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}
 Statut: {app['status']}
 Raison: {app['reason']}"""
-                
-                messagebox.showinfo("Détails du Rendez-vous", details)
-                return
+            
+            messagebox.showinfo("Détails du Rendez-vous", details)
+            return
         
         messagebox.showerror("Erreur", "Rendez-vous introuvable.")
     
@@ -978,16 +1021,20 @@ Raison: {app['reason']}"""
                 messagebox.showerror("Erreur", "L'heure de début doit être avant l'heure de fin.")
                 return
             
-            current_time = start_time
-            slots_added = 0
+            if self.repeat_weekly.get():
+                # une seule règle stockée, les créneaux sont calculés à la demande
+                self.schedule_manager.add_recurring_availability(
+                    self.doctor_id, selected_date.weekday(), start_time.time(), end_time.time(),
+                    valid_from=selected_date
+                )
+                messagebox.showinfo("Succès", f"Disponibilité ajoutée chaque {self.WEEKDAYS[selected_date.weekday()]} "
+                                              f"à partir du {selected_date.strftime('%Y-%m-%d')}.")
+                self.load_doctor_schedule()
+                return
             
-            while current_time < end_time:
-                slot_end = current_time + timedelta(hours=1)
-                if slot_end <= end_time:
-                    result = self.schedule_manager.add_availability(self.doctor_id, current_time, slot_end)
-                    if result:
-                        slots_added += 1
-                current_time = slot_end
+            slots_added = len(self.schedule_manager.add_availability_range(
+                self.doctor_id, selected_date, selected_date, start_time.time(), end_time.time()
+            ))
             
             messagebox.showinfo("Succès", f"Ajouté {slots_added} créneaux de disponibilité pour {selected_date.strftime('%Y-%m-%d')}.")
             self.load_doctor_schedule()
@@ -1000,6 +1047,11 @@ Raison: {app['reason']}"""
     def block_time_slots(self):
         try:
             selected_date = self.block_date.get_date()
+            if self.block_whole_day.get():
+                self.schedule_manager.add_availability_exception(self.doctor_id, selected_date, reason="Absence")
+                messagebox.showinfo("Succès", f"Absence enregistrée pour le {selected_date.strftime('%Y-%m-%d')}.")
+                self.load_doctor_schedule()
+                return
             start_hour = int(self.block_start_hour.get())
             start_minute = int(self.block_start_minute.get())
             end_hour = int(self.block_end_hour.get())
@@ -1017,15 +1069,9 @@ Raison: {app['reason']}"""
                 messagebox.showerror("Erreur", "L'heure de début doit être avant l'heure de fin.")
                 return
             
-            current_time = start_time
-            slots_blocked = 0
-            
-            while current_time < end_time:
-                slot_end = current_time + timedelta(hours=1)
-                if slot_end <= end_time:
-                    if self.schedule_manager.block_timeslot(self.doctor_id, current_time, slot_end):
-                        slots_blocked += 1
-                current_time = slot_end
+            slots_blocked = self.schedule_manager.block_range(
+                self.doctor_id, selected_date, selected_date, start_time.time(), end_time.time()
+            )
             
             if slots_blocked > 0:
                 messagebox.showinfo("Succès", f"Bloqué {slots_blocked} créneaux pour {selected_date.strftime('%Y-%m-%d')}.")
@@ -1048,7 +1094,8 @@ Raison: {app['reason']}"""
         date_str = values[0]
         start_time_str = values[1]
         
-        schedule = self.schedule_manager.get_doctor_schedule(self.doctor_id)
+        slot_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        schedule = self.schedule_manager.get_doctor_schedule(self.doctor_id, slot_date)
         for slot in schedule:
             start_time = datetime.fromisoformat(slot['start_time'])
             if (start_time.strftime('%Y-%m-%d') == date_str and 
@@ -1076,7 +1123,8 @@ Raison: {app['reason']}"""
         date_str = values[0]
         start_time_str = values[1]
         
-        schedule = self.schedule_manager.get_doctor_schedule(self.doctor_id)
+        slot_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        schedule = self.schedule_manager.get_doctor_schedule(self.doctor_id, slot_date)
         for slot in schedule:
             start_time = datetime.fromisoformat(slot['start_time'])
             if (start_time.strftime('%Y-%m-%d') == date_str and 
@@ -1115,8 +1163,8 @@ class SecretaryDashboardFrame(tk.Frame):
         self.configure(bg='#1a1a2e')
         
         # Initialize managers
-        self.user_manager = UserManager(StorageManager())
-        self.appointment_manager = AppointmentManager(StorageManager())
+        self.user_manager = self.main_app.context.user_manager
+        self.appointment_manager = self.main_app.context.appointment_manager
         
         # Load and display Yoda background image
         self.setup_yoda_background()
@@ -1221,7 +1269,14 @@ class SecretaryDashboardFrame(tk.Frame):
             if not all([first_name, last_name, email, phone, dob, ssn, password]):
                 messagebox.showerror("Erreur", "Tous les champs sont obligatoires.")
                 return
-            result = self.user_manager.register_patient(first_name, last_name, email, phone, password, dob, ssn)
+            # Register in the background; the button stays disabled until it is done
+            self.main_app.tasks.submit(
+                lambda task: self.user_manager.register_patient(first_name, last_name, email, phone, password, dob, ssn),
+                on_done=on_patient_created,
+                on_error=lambda e: messagebox.showerror("Erreur", f"Erreur lors de la création du patient: {e}"),
+                widgets=[create_btn])
+        
+        def on_patient_created(result):
             if result:
                 messagebox.showinfo("Succès", "Patient créé avec succès !")
                 win.destroy()
@@ -1231,7 +1286,8 @@ class SecretaryDashboardFrame(tk.Frame):
             else:
                 messagebox.showerror("Erreur", "Erreur lors de la création du patient.")
         
-        tk.Button(win, text="Créer", command=create_patient, font=('Helvetica', 12, 'bold'), bg='#44ff44', fg='#1a1a2e').pack(pady=20)
+        create_btn = tk.Button(win, text="Créer", command=create_patient, font=('Helvetica', 12, 'bold'), bg='#44ff44', fg='#1a1a2e')
+        create_btn.pack(pady=20)
 
 class SecretaryAppointmentsFrame(tk.Frame):
     def __init__(self, parent, main_app):
@@ -1240,8 +1296,8 @@ class SecretaryAppointmentsFrame(tk.Frame):
         self.configure(bg='#1a1a2e')
         
         # Initialize managers
-        self.user_manager = UserManager(StorageManager())
-        self.appointment_manager = AppointmentManager(StorageManager())
+        self.user_manager = self.main_app.context.user_manager
+        self.appointment_manager = self.main_app.context.appointment_manager
         
         # Title
         title_label = tk.Label(self, text="Gestion des Rendez-vous", 
@@ -1274,21 +1330,12 @@ class SecretaryAppointmentsFrame(tk.Frame):
         list_frame = tk.Frame(self, bg='#1a1a2e')
         list_frame.pack(pady=10, fill='both', expand=True, padx=20)
         
-        # Create Treeview for appointments
+        # Windowed list: only the visible rows are in the Treeview, pages come from the manager
         columns = ('ID', 'Patient', 'Médecin', 'Date', 'Heure', 'Statut', 'Raison')
-        self.appointments_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
-        
-        # Configure columns
-        for col in columns:
-            self.appointments_tree.heading(col, text=col)
-            self.appointments_tree.column(col, width=120)
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.appointments_tree.yview)
-        self.appointments_tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.appointments_tree.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        self.appointments_list = VirtualList(list_frame, columns, self._fetch_appointments_page,
+                                             height=15, bg='#1a1a2e')
+        self.appointments_tree = self.appointments_list.tree
+        self.appointments_list.pack(fill='both', expand=True)
         
         # Action buttons frame
         actions_frame = tk.Frame(self, bg='#1a1a2e')
@@ -1302,64 +1349,66 @@ class SecretaryAppointmentsFrame(tk.Frame):
             (" Nouveau RDV", self.create_new_appointment, "#ffd700")
         ]
         
+        # Disabled together while a background action runs
+        self.action_buttons = []
         for text, command, color in actions:
             btn = tk.Button(actions_frame, text=text, 
                            font=('Helvetica', 12, 'bold'),
                            bg=color, fg='#1a1a2e',
                            command=command, width=15, height=2)
             btn.pack(side='left', padx=10)
+            self.action_buttons.append(btn)
         
         # Load appointments
         self.refresh_appointments()
+        # Keep the list live: apply each published change instead of reloading
+        self.main_app.dispatcher.subscribe(APPOINTMENT_EVENTS, self.on_appointment_event)
 
-    def refresh_appointments(self, event=None):
-        """Actualise la liste des rendez-vous."""
-        # Reload users data to ensure we have the latest
-        self.user_manager.users = self.user_manager._load_users()
-        self.appointment_manager.appointments = self.appointment_manager._load_appointments()
-        
-        # Clear existing items
-        for item in self.appointments_tree.get_children():
-            self.appointments_tree.delete(item)
+    def _appointment_values(self, appointment):
+        """Builds the Treeview row of an appointment."""
+        # Get patient and doctor names using role IDs
+        patient = self.user_manager.find_user_by_role_id(appointment['patient_id'])
+        doctor = self.user_manager.find_user_by_role_id(appointment['doctor_id'])
         
-        # Get appointments
-        appointments = self.appointment_manager.get_all_appointments()
+        patient_name = f"{patient['first_name']} {patient['last_name']}" if patient else "Inconnu"
+        doctor_name = f"Dr. {doctor['last_name']}" if doctor else "Inconnu"
+        
+        # Format date and time (cached per ISO string)
+        date_str = format_iso(appointment['start_time'], "%d/%m/%Y")
+        time_str = format_iso(appointment['start_time'], "%H:%M")
+        
+        return (
+            appointment['appointment_id'],
+            patient_name,
+            doctor_name,
+            date_str,
+            time_str,
+            appointment['status'],
+            appointment['reason']
+        )
+
+    def _fetch_appointments_page(self, offset, limit):
+        """Fetches one page of rows for the windowed list (filtered by status if needed)."""
         status_filter = self.status_var.get()
-        
-        # Filter by status if needed
-        if status_filter != "all":
-            appointments = [a for a in appointments if a['status'] == status_filter]
-        
-        # Add appointments to treeview
-        for appointment in appointments:
-            # Get patient and doctor names using role IDs
-            patient = self.user_manager.find_user_by_role_id(appointment['patient_id'])
-            doctor = self.user_manager.find_user_by_role_id(appointment['doctor_id'])
-            
-            patient_name = f"{patient['first_name']} {patient['last_name']}" if patient else "Inconnu"
-            doctor_name = f"Dr. {doctor['last_name']}" if doctor else "Inconnu"
-            
-            # Format date and time
-            start_time = datetime.fromisoformat(appointment['start_time'])
-            date_str = start_time.strftime("%d/%m/%Y")
-            time_str = start_time.strftime("%H:%M")
-            
-            # Status color mapping
-            status_colors = {
-                'pending': 'orange',
-                'confirmed': 'green',
-                'cancelled': 'red'
-            }
-            
-            self.appointments_tree.insert('', 'end', values=(
-                appointment['appointment_id'],
-                patient_name,
-                doctor_name,
-                date_str,
-                time_str,
-                appointment['status'],
-                appointment['reason']
-            ))
+        appointments, total = self.appointment_manager.get_appointments_page(
+            None if status_filter == "all" else status_filter, offset, limit)
+        rows = [(appointment['appointment_id'], self._appointment_values(appointment))
+                for appointment in appointments]
+        return rows, total
+
+    def on_appointment_event(self, event_type, payload):
+        """Re-reads the visible window after an appointment change (Tk thread)."""
+        # Rows may move or the total change: refetch the current page once per burst
+        self.appointments_list.schedule_refresh()
+
+    def refresh_appointments(self, event=None):
+        """Actualise la liste des rendez-vous."""
+        # Users and appointments are shared in memory and kept live by events:
+        # no need to re-read the files here
+        if event is not None:
+            # New status filter: start again from the top
+            self.appointments_list.first = 0
+        self.appointments_list.refresh()
 
     def confirm_appointment(self):
         """Confirme le rendez-vous sélectionné."""
@@ -1369,11 +1418,18 @@ class SecretaryAppointmentsFrame(tk.Frame):
             return
         
         appointment_id = self.appointments_tree.item(selection[0])['values'][0]
-        success, message = self.appointment_manager.validate_appointment(appointment_id)
-        
+        # Validate in the background (saves + notifications); the list updates through events
+        self.main_app.tasks.submit(
+            lambda task: self.appointment_manager.validate_appointment(appointment_id),
+            on_done=self._show_result,
+            on_error=lambda e: messagebox.showerror("Erreur", f"Erreur lors de la validation: {e}"),
+            widgets=self.action_buttons)
+
+    def _show_result(self, result):
+        """Shows the (success, message) result of a background action."""
+        success, message = result
         if success:
             messagebox.showinfo("Succès", message)
-            self.refresh_appointments()
         else:
             messagebox.showerror("Erreur", message)
 
@@ -1391,7 +1447,6 @@ class SecretaryAppointmentsFrame(tk.Frame):
             
             if success:
                 messagebox.showinfo("Succès", message)
-                self.refresh_appointments()
             else:
                 messagebox.showerror("Erreur", message)
 
@@ -1412,12 +1467,7 @@ class SecretaryAppointmentsFrame(tk.Frame):
     def show_appointment_details_window(self, appointment_id):
         """Affiche une fenêtre avec les détails du rendez-vous."""
         # Find appointment
-        appointments = self.appointment_manager.get_all_appointments()
-        appointment = None
-        for app in appointments:
-            if app['appointment_id'] == appointment_id:
-                appointment = app
-                break
+        appointment = self.appointment_manager.get_appointment(appointment_id)
         
         if not appointment:
             messagebox.showerror("Erreur", "Rendez-vous non trouvé.")
@@ -1484,7 +1534,6 @@ class SecretaryAppointmentsFrame(tk.Frame):
             
             if success:
                 messagebox.showinfo("Succès", message)
-                self.refresh_appointments()
             else:
                 messagebox.showerror("Erreur", message)
 
@@ -1495,7 +1544,7 @@ class SecretaryPatientsFrame(tk.Frame):
         self.configure(bg='#1a1a2e')
         
         # Initialize managers
-        self.user_manager = UserManager(StorageManager())
+        self.user_manager = self.main_app.context.user_manager
         
         # Title
         title_label = tk.Label(self, text="Liste des Patients", 
@@ -1511,21 +1560,12 @@ class SecretaryPatientsFrame(tk.Frame):
         list_frame = tk.Frame(self, bg='#1a1a2e')
         list_frame.pack(pady=10, fill='both', expand=True, padx=20)
         
-        # Create Treeview for patients
+        # Windowed list: only the visible rows are in the Treeview, pages come from the manager
         columns = ('ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Date Naissance', 'Sécurité Sociale')
-        self.patients_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
-        
-        # Configure columns
-        for col in columns:
-            self.patients_tree.heading(col, text=col)
-            self.patients_tree.column(col, width=120)
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.patients_tree.yview)
-        self.patients_tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.patients_tree.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        self.patients_list = VirtualList(list_frame, columns, self._fetch_patients_page,
+                                         height=15, bg='#1a1a2e')
+        self.patients_tree = self.patients_list.tree
+        self.patients_list.pack(fill='both', expand=True)
         
         # Load patients
         self.load_patients()
@@ -1533,26 +1573,24 @@ class SecretaryPatientsFrame(tk.Frame):
     def load_patients(self):
         """Charge la liste des patients."""
         # Recharger les données depuis le fichier
-        self.user_manager.users = self.user_manager._load_users()
-        
-        # Clear existing items
-        for item in self.patients_tree.get_children():
-            self.patients_tree.delete(item)
+        self.user_manager.reload_users()
         
-        # Get patients
-        patients = [u for u in self.user_manager.users if u['role'] == 'Patient']
-        
-        # Add patients to treeview
-        for patient in patients:
-            self.patients_tree.insert('', 'end', values=(
-                patient['patient_id'],
-                patient['last_name'],
-                patient['first_name'],
-                patient['email'],
-                patient['phone'],
-                patient.get('date_of_birth', 'N/A'),
-                patient.get('social_security_number', 'N/A')
-            ))
+        # Re-read the visible window only (keeps the scroll position)
+        self.patients_list.refresh()
+
+    def _fetch_patients_page(self, offset, limit):
+        """Fetches one page of patients, sorted by last name."""
+        patients, total = self.user_manager.get_users_page('Patient', offset, limit)
+        rows = [(patient['patient_id'], (
+            patient['patient_id'],
+            patient['last_name'],
+            patient['first_name'],
+            patient['email'],
+            patient['phone'],
+            patient.get('date_of_birth', 'N/A'),
+            patient.get('social_security_number', 'N/A')
+        )) for patient in patients]
+        return rows, total
 
 class SecretaryDoctorsFrame(tk.Frame):
     def __init__(self, parent, main_app):
@@ -1561,7 +1599,7 @@ class SecretaryDoctorsFrame(tk.Frame):
         self.configure(bg='#1a1a2e')
         
         # Initialize managers
-        self.user_manager = UserManager(StorageManager())
+        self.user_manager = self.main_app.context.user_manager
         
         # Title
         title_label = tk.Label(self, text="Liste des Médecins", 
@@ -1576,6 +1614,7 @@ class SecretaryDoctorsFrame(tk.Frame):
         # Create Treeview for doctors
         columns = ('ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Spécialité')
         self.doctors_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
+        self.doctors_binder = TreeviewBinder(self.doctors_tree)
         
         # Configure columns
         for col in columns:
@@ -1594,23 +1633,18 @@ class SecretaryDoctorsFrame(tk.Frame):
 
     def load_doctors(self):
         """Charge la liste des médecins."""
-        # Clear existing items
-        for item in self.doctors_tree.get_children():
-            self.doctors_tree.delete(item)
-        
         # Get doctors
         doctors = [u for u in self.user_manager.users if u['role'] == 'Doctor']
         
-        # Add doctors to treeview
-        for doctor in doctors:
-            self.doctors_tree.insert('', 'end', values=(
-                doctor['doctor_id'],
-                doctor['last_name'],
-                doctor['first_name'],
-                doctor['email'],
-                doctor['phone'],
-                doctor.get('specialty', 'N/A')
-            ))
+        # Diff against the displayed rows (keeps selection and scroll position)
+        self.doctors_binder.bind((doctor['doctor_id'], (
+            doctor['doctor_id'],
+            doctor['last_name'],
+            doctor['first_name'],
+            doctor['email'],
+            doctor['phone'],
+            doctor.get('specialty', 'N/A')
+        )) for doctor in doctors)
 
 class SecretaryNewAppointmentFrame(tk.Frame):
     def __init__(self, parent, main_app):
@@ -1619,8 +1653,8 @@ class SecretaryNewAppointmentFrame(tk.Frame):
         self.configure(bg='#1a1a2e')
         
         # Initialize managers
-        self.user_manager = UserManager(StorageManager())
-        self.appointment_manager = AppointmentManager(StorageManager())
+        self.user_manager = self.main_app.context.user_manager
+        self.appointment_manager = self.main_app.context.appointment_manager
         
         # Title
         title_label = tk.Label(self, text="Nouveau Rendez-vous", 
@@ -1684,11 +1718,11 @@ class SecretaryNewAppointmentFrame(tk.Frame):
         buttons_frame.pack(pady=20)
         
         # Create button
-        create_btn = tk.Button(buttons_frame, text="Créer Rendez-vous", 
-                              font=('Helvetica', 12, 'bold'),
-                              bg='#44ff44', fg='#1a1a2e',
-                              command=self.create_appointment, width=20, height=2)
-        create_btn.pack(side='left', padx=10)
+        self.create_btn = tk.Button(buttons_frame, text="Créer Rendez-vous", 
+                                   font=('Helvetica', 12, 'bold'),
+                                   bg='#44ff44', fg='#1a1a2e',
+                                   command=self.create_appointment, width=20, height=2)
+        self.create_btn.pack(side='left', padx=10)
         
         # Cancel button
         cancel_btn = tk.Button(buttons_frame, text="Annuler", 
@@ -1749,17 +1783,25 @@ class SecretaryNewAppointmentFrame(tk.Frame):
                 messagebox.showerror("Erreur", "Veuillez saisir une raison.")
                 return
             
-            # Create appointment
-            success, message = self.appointment_manager.book_appointment(
-                patient['patient_id'], doctor['doctor_id'], start_time, end_time, reason, auto_confirm=False
+            # Create appointment in the background
+            self.main_app.tasks.submit(
+                lambda task: self.appointment_manager.book_appointment(
+                    patient['patient_id'], doctor['doctor_id'], start_time, end_time, reason, auto_confirm=False,
+                    check_patient_overlap=True
+                ),
+                on_done=self._on_appointment_created,
+                on_error=lambda e: messagebox.showerror("Erreur", f"Erreur lors de la création: {str(e)}"),
+                widgets=[self.create_btn]
             )
-            
-            if success:
-                messagebox.showinfo("Succès", message)
-                self.main_app.show_content("PatientAppointmentsFrame")
-            else:
-                messagebox.showerror("Erreur", message)
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la création: {str(e)}")
 
+    def _on_appointment_created(self, result):
+        success, message = result
+        if success:
+            messagebox.showinfo("Succès", message)
+            self.main_app.show_content("PatientAppointmentsFrame")
+        else:
+            messagebox.showerror("Erreur", message)
+
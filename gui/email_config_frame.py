@@ -1,15 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import logging
-from managers.email_manager import EmailManager
-from managers.reminder_manager import ReminderManager
 
 class EmailConfigFrame(ttk.Frame):
     def __init__(self, parent, main_app):
         super().__init__(parent)
         self.main_app = main_app
-        self.reminder_manager = main_app.appointment_manager.reminder_manager
-        self.email_manager = EmailManager()
+        self.reminder_manager = main_app.context.reminder_manager
+        self.email_manager = main_app.context.email_manager
         self.setup_ui()
         
     def setup_ui(self):
@@ -57,13 +55,23 @@ class EmailConfigFrame(ttk.Frame):
         button_frame.pack(pady=20)
         
         # Bouton pour envoyer les rappels de demain
-        send_reminders_btn = ttk.Button(
+        self.send_reminders_btn = ttk.Button(
             button_frame, 
             text="Envoyer les rappels pour demain", 
             command=self.send_tomorrow_reminders,
             style="Action.TButton"
         )
-        send_reminders_btn.pack(side="left", padx=5, pady=10)
+        self.send_reminders_btn.pack(side="left", padx=5, pady=10)
+        
+        # Bouton d'annulation (actif seulement pendant un envoi)
+        self.cancel_reminders_btn = ttk.Button(
+            button_frame, 
+            text="Annuler l'envoi", 
+            command=self.cancel_reminders,
+            state="disabled"
+        )
+        self.cancel_reminders_btn.pack(side="left", padx=5, pady=10)
+        self.reminders_task = None
         
         # Bouton de sauvegarde
         save_btn = ttk.Button(
@@ -96,6 +104,8 @@ class EmailConfigFrame(ttk.Frame):
             
             # Configurer le reminder manager
             self.reminder_manager.email_manager = self.email_manager
+            # les emails en file attendaient la configuration
+            self.reminder_manager.outbox.wake()
             
             messagebox.showinfo("Succès", "Configuration sauvegardée avec succès !")
             self.status_label.config(text="✅ Configuration sauvegardée", foreground="green")
@@ -105,33 +115,59 @@ class EmailConfigFrame(ttk.Frame):
             self.status_label.config(text="❌ Erreur de sauvegarde", foreground="red")
             
     def send_tomorrow_reminders(self):
-        """Envoie manuellement les rappels pour les rendez-vous de demain"""
-        try:
-            # Vérifier si l'email est configuré
-            if not self.email_manager.is_configured:
-                messagebox.showwarning("Configuration requise", 
-                                     "Veuillez d'abord configurer l'email avant d'envoyer des rappels.")
-                return
-                
-            # Envoyer les rappels
-            result = self.reminder_manager.send_manual_reminders_for_tomorrow()
+        """Envoie manuellement les rappels pour les rendez-vous de demain (en arrière-plan)"""
+        # Vérifier si l'email est configuré
+        if not self.email_manager.is_configured:
+            messagebox.showwarning("Configuration requise", 
+                                 "Veuillez d'abord configurer l'email avant d'envoyer des rappels.")
+            return
             
-            if result["success"]:
-                if result['count'] > 0:
-                    messagebox.showinfo("Rappels envoyés", 
-                                      f"Rappels envoyés avec succès !\n\n{result['message']}\n\n"
-                                      f"Nombre de rappels envoyés: {result['count']}")
-                    self.status_label.config(text=f"✅ {result['count']} rappels envoyés", foreground="green")
-                else:
-                    messagebox.showinfo("Information", "Aucun rappel à envoyer pour demain.")
-                    self.status_label.config(text="ℹ️ Aucun rappel à envoyer", foreground="blue")
+        # Envoyer les rappels hors du thread Tk : SMTP peut être lent
+        self.status_label.config(text="⏳ Envoi des rappels en cours...", foreground="blue")
+        self.cancel_reminders_btn.config(state="normal")
+        self.reminders_task = self.main_app.tasks.submit(
+            lambda task: self.reminder_manager.send_manual_reminders_for_tomorrow(
+                progress=task.report, cancelled=lambda: task.cancelled),
+            on_done=self._on_reminders_sent,
+            on_error=self._on_reminders_error,
+            on_progress=self._on_reminders_progress,
+            widgets=[self.send_reminders_btn]
+        )
+
+    def cancel_reminders(self):
+        """Annule l'envoi en cours (les rappels déjà partis restent envoyés)"""
+        if self.reminders_task is not None:
+            self.reminders_task.cancel()
+            self.status_label.config(text="⏹️ Envoi annulé", foreground="orange")
+            self._reminders_finished()
+
+    def _reminders_finished(self):
+        self.reminders_task = None
+        self.cancel_reminders_btn.config(state="disabled")
+
+    def _on_reminders_progress(self, done, total):
+        self.status_label.config(text=f"⏳ {done}/{total} rappels traités...", foreground="blue")
+
+    def _on_reminders_sent(self, result):
+        """Affiche le résultat de l'envoi (thread Tk)"""
+        self._reminders_finished()
+        if result["success"]:
+            if result['count'] > 0:
+                messagebox.showinfo("Rappels envoyés", 
+                                  f"Rappels envoyés avec succès !\n\n{result['message']}\n\n"
+                                  f"Nombre de rappels envoyés: {result['count']}")
+                self.status_label.config(text=f"✅ {result['count']} rappels envoyés", foreground="green")
             else:
-                messagebox.showerror("Erreur d'envoi",
-                                   f"Impossible d'envoyer les rappels.\n\n"
-                                   f"Détail : {result['message']}")
-                self.status_label.config(text=f"❌ Échec de l'envoi des rappels", foreground="red")
+                messagebox.showinfo("Information", f"{result['message']}.")
+                self.status_label.config(text="ℹ️ Aucun rappel à envoyer", foreground="blue")
+        else:
+            messagebox.showerror("Erreur d'envoi",
+                               f"Impossible d'envoyer les rappels.\n\n"
+                               f"Détail : {result['message']}")
+            self.status_label.config(text=f"❌ Échec de l'envoi des rappels", foreground="red")
 
-        except Exception as e:
-            logging.error(f"Erreur lors de l'envoi manuel des rappels: {e}")
-            messagebox.showerror("Erreur Critique", f"Une erreur critique est survenue: {e}")
-            self.status_label.config(text="❌ Erreur critique", foreground="red") 
\ No newline at end of file
+    def _on_reminders_error(self, e):
+        self._reminders_finished()
+        logging.error(f"Erreur lors de l'envoi manuel des rappels: {e}")
+        messagebox.showerror("Erreur Critique", f"Une erreur critique est survenue: {e}")
+        self.status_label.config(text="❌ Erreur critique", foreground="red")
@@ -1,14 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from managers.user_manager import UserManager
-from managers.storage_manager import StorageManager
 import re
 
 class LoginFrame(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
-        self.user_manager = UserManager(StorageManager())
+        self.user_manager = controller.context.user_manager
         
         # Configure frame with Star Wars colors
         self.configure(bg='#1a1a2e', padx=40, pady=40)
@@ -2,9 +2,9 @@ import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 
-from managers.user_manager import UserManager
-from managers.storage_manager import StorageManager
-from managers.appointment_manager import AppointmentManager
+from managers.app_context import get_app_context
+from gui.tk_dispatcher import TkDispatcher
+from gui.task_runner import TaskRunner
 from gui.login_frame import LoginFrame
 from gui.register_frame import RegisterFrame
 from gui.sidebar_frame import SidebarFrame
@@ -23,10 +23,16 @@ class MainApplication(tk.Frame):
         parent.title("Centre Médical Coruscant - Services de Santé de la République")
         parent.geometry("1024x768")
         
-        # Initialize managers
-        self.storage_manager = StorageManager()
-        self.user_manager = UserManager(self.storage_manager)
-        self.appointment_manager = AppointmentManager(self.storage_manager)
+        # Initialize managers (shared by every frame)
+        self.context = get_app_context()
+        self.storage_manager = self.context.storage_manager
+        self.user_manager = self.context.user_manager
+        self.appointment_manager = self.context.appointment_manager
+        # events published by the managers are handled on the Tk thread
+        self.dispatcher = TkDispatcher(parent, self.context.event_bus)
+        # slow manager calls (SMTP, disk) run off the Tk thread
+        self.tasks = TaskRunner(parent)
+        parent.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # --- Background Image ---
         try:
@@ -165,11 +171,22 @@ class MainApplication(tk.Frame):
     def logout(self):
         """Logs out and returns to the login screen."""
         self.user = None
+        # the frames subscribed to events are about to be destroyed
+        self.dispatcher.unsubscribe_all()
+        self.tasks.cancel_all()
         if self.main_frame:
             self.main_frame.destroy()
         self.auth_container.place(relx=0.5, rely=0.5, anchor='center') # Re-show auth container
         self.show_login_frame() 
 
+    def on_close(self):
+        """Writes pending data to disk before closing the window."""
+        # let a running task finish its write before the final flush
+        self.tasks.stop()
+        self.dispatcher.stop()
+        self.context.shutdown()
+        self.parent.destroy()
+
     def open_new_patient_window(self):
         if hasattr(self, 'frames') and 'SecretaryDashboardFrame' in self.frames:
             self.frames['SecretaryDashboardFrame'].open_new_patient_window() 
\ No newline at end of file
@@ -1,17 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
-from managers.notification_manager import NotificationManager
-from managers.storage_manager import StorageManager
+from managers import event_bus as events
+from gui.treeview_binder import TreeviewBinder
 
 class NotificationFrame(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        self.notification_manager = NotificationManager(StorageManager())
+        self.notification_manager = controller.context.notification_manager
         self.user_id = None
         self.setup_ui()
         self.bind("<<ShowFrame>>", self.on_show_frame)
+        controller.dispatcher.subscribe(
+            (events.NOTIFICATIONS_CREATED, events.NOTIFICATIONS_UPDATED, events.NOTIFICATIONS_DELETED),
+            self.on_notification_event)
     
     def on_show_frame(self, event):
         """Mettre à jour les notifications lorsque le frame est affiché."""
@@ -57,6 +60,7 @@ class NotificationFrame(ttk.Frame):
         # Treeview pour les notifications
         columns = ("Date", "Type", "Message", "Statut")
         self.notifications_tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
+        self.notifications_binder = TreeviewBinder(self.notifications_tree)
         
         self.notifications_tree.heading('Date', text='Date')
         self.notifications_tree.column('Date', width=120, anchor='w')
@@ -84,57 +88,79 @@ class NotificationFrame(ttk.Frame):
     
     def load_notifications(self):
         """Charge les notifications dans la liste"""
-        for item in self.notifications_tree.get_children():
-            self.notifications_tree.delete(item)
-        
         if not self.user_id:
+            self.notifications_binder.clear()
             return
 
         # Récupérer les notifications selon le filtre
-        filter_value = self.filter_var.get()
-        
+        # (déjà triées par le manager, plus récentes en premier)
         notifications = self.notification_manager.get_notifications_for_user(self.user_id)
 
+        # Mettre à jour la liste : seules les lignes qui changent touchent le Treeview
+        self.notifications_binder.bind(
+            (notif.notification_id, *self._row(notif))
+            for notif in notifications if self._matches_filter(notif))
+        
+        self.notifications_tree.tag_configure("unread", font=('Helvetica', 9, 'bold'))
+    
+    def _matches_filter(self, notif):
+        """Vrai si la notification passe le filtre sélectionné"""
+        filter_value = self.filter_var.get()
         if filter_value == "Non lues":
-            notifications = [n for n in notifications if n.status == "unread"]
+            return notif.status == "unread"
         elif filter_value == "Confirmations":
-            notifications = [n for n in notifications if "confirm" in n.notification_type]
+            return "confirm" in notif.notification_type
         elif filter_value == "Annulations":
-            notifications = [n for n in notifications if "cancel" in n.notification_type]
+            return "cancel" in notif.notification_type
         elif filter_value == "Changement":
-            notifications = [n for n in notifications if "change" in n.notification_type]
+            return "change" in notif.notification_type
         elif filter_value == "Système":
-            notifications = [n for n in notifications if n.notification_type == "system"]
+            return notif.notification_type == "system"
+        return True
+    
+    def _row(self, notif):
+        """Valeurs et tags de la ligne d'une notification"""
+        date_str = notif.created_at.strftime('%d/%m/%Y %H:%M')
         
-        # Trier par date (plus récent en premier)
-        notifications.sort(key=lambda n: n.created_at, reverse=True)
-
-        # Ajouter les notifications à la liste
-        for notif in notifications:
-            date_str = notif.created_at.strftime('%d/%m/%Y %H:%M')
-            
-            tags = ()
-            if notif.status == "unread":
-                tags = ("unread",)
-            
-            type_map = {
-                "appointment_confirmation": "Confirmation",
-                "appointment_cancellation": "Annulation",
-                "appointment_validation": "Validation",
-                "appointment_deletion": "Suppression",
-                "status_change": "Changement",
-                "system": "Système"
-            }
-            type_str = type_map.get(notif.notification_type, notif.notification_type.replace('_', ' ').title())
-            
-            self.notifications_tree.insert("", "end", values=(
-                date_str,
-                type_str,
-                notif.message,
-                "Non lu" if notif.status == "unread" else "Lu"
-            ), tags=tags, iid=notif.notification_id)
+        tags = ()
+        if notif.status == "unread":
+            tags = ("unread",)
         
-        self.notifications_tree.tag_configure("unread", font=('Helvetica', 9, 'bold'))
+        type_map = {
+            "appointment_confirmation": "Confirmation",
+            "appointment_cancellation": "Annulation",
+            "appointment_validation": "Validation",
+            "appointment_deletion": "Suppression",
+            "status_change": "Changement",
+            "system": "Système"
+        }
+        type_str = type_map.get(notif.notification_type, notif.notification_type.replace('_', ' ').title())
+        
+        return (
+            date_str,
+            type_str,
+            notif.message,
+            "Non lu" if notif.status == "unread" else "Lu"
+        ), tags
+    
+    def on_notification_event(self, event_type, payload):
+        """Applique les notifications créées, modifiées ou supprimées à la liste (thread Tk)"""
+        binder = self.notifications_binder
+        for notif in payload['notifications']:
+            if notif.user_id != self.user_id:
+                continue
+            iid = notif.notification_id
+            if event_type == events.NOTIFICATIONS_DELETED or not self._matches_filter(notif):
+                binder.remove(iid)
+                continue
+            values, tags = self._row(notif)
+            if iid in binder or event_type == events.NOTIFICATIONS_CREATED:
+                # une nouvelle notif est la plus récente : en tête de liste
+                binder.upsert(iid, values, tags, index=0)
+            else:
+                # réapparaît dans le filtre : la position dépend de sa date
+                self.load_notifications()
+                return
     
     def mark_selected_as_read(self):
         """Marque la notification sélectionnée comme lue"""
@@ -144,23 +170,16 @@ class NotificationFrame(ttk.Frame):
             return
         
         notification_id = selected[0]
-        if self.notification_manager.mark_notification_as_read(notification_id):
-            self.load_notifications()
-        else:
+        if not self.notification_manager.mark_notification_as_read(notification_id):
             messagebox.showerror("Erreur", "Impossible de marquer la notification comme lue")
     
     def mark_all_as_read(self):
         """Marque toutes les notifications comme lues"""
         if not self.user_id:
             return
-        notifications = self.notification_manager.get_notifications_for_user(self.user_id, status="unread")
-        count = 0
-        
-        for notif in notifications:
-            if self.notification_manager.mark_notification_as_read(notif.notification_id):
-                count += 1
+        # une seule sauvegarde pour toutes les notifs
+        count = self.notification_manager.mark_all_read(self.user_id)
         
-        self.load_notifications()
         messagebox.showinfo("Succès", f"{count} notification(s) marquée(s) comme lue(s)")
     
     def delete_selected(self):
@@ -173,7 +192,6 @@ class NotificationFrame(ttk.Frame):
         notification_id = selected[0]
         if messagebox.askyesno("Confirmation", "Voulez-vous vraiment supprimer cette notification ?"):
             if self.notification_manager.delete_notification(notification_id):
-                self.load_notifications()
                 messagebox.showinfo("Succès", "Notification supprimée")
             else:
                 messagebox.showerror("Erreur", "Impossible de supprimer la notification")
@@ -191,18 +209,12 @@ class NotificationFrame(ttk.Frame):
             return
 
         # Trouver la notification
-        notifications = self.notification_manager.get_notifications_for_user(self.user_id)
-        notification = None
-        for notif in notifications:
-            if notif.notification_id == notification_id:
-                notification = notif
-                break
+        notification = self.notification_manager.get_notification(notification_id)
         
-        if notification:
+        if notification and notification.user_id == self.user_id:
             # Marquer comme lue en l'ouvrant
             if notification.status == 'unread':
                 self.notification_manager.mark_notification_as_read(notification.notification_id)
-                self.load_notifications() # Rafraîchir la liste
 
             # Créer une fenêtre de détails
             details_window = tk.Toplevel(self)
@@ -1,7 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from managers.user_manager import UserManager
-from managers.storage_manager import StorageManager
 import re
 from datetime import datetime
 
@@ -9,7 +7,7 @@ class RegisterFrame(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
-        self.user_manager = UserManager(StorageManager())
+        self.user_manager = controller.context.user_manager
 
         style = ttk.Style()
         style.configure('TLabel', font=('Helvetica', 12))
@@ -54,8 +52,8 @@ class RegisterFrame(tk.Frame):
         self.password_entry.grid(row=7, column=1, sticky="ew", padx=5, pady=5)
 
         # --- Buttons ---
-        register_button = ttk.Button(main_frame, text="Créer le compte", command=self.register)
-        register_button.grid(row=8, column=1, sticky="e", pady=20)
+        self.register_button = ttk.Button(main_frame, text="Créer le compte", command=self.register)
+        self.register_button.grid(row=8, column=1, sticky="e", pady=20)
 
         back_button = ttk.Button(main_frame, text="Retour à la connexion", command=lambda: self.controller.show_login_frame())
         back_button.grid(row=8, column=0, sticky="w", pady=20)
@@ -136,9 +134,18 @@ class RegisterFrame(tk.Frame):
             messagebox.showerror("Erreur", "Format de numéro de sécurité sociale invalide.")
             self.ssn_entry.focus()
             return
-        user = self.user_manager.register_patient(
-            first_name, last_name, email, phone, password, dob, ssn
+        # Register in the background; the button stays disabled until it is done
+        self.controller.tasks.submit(
+            lambda task: self.user_manager.register_patient(
+                first_name, last_name, email, phone, password, dob, ssn
+            ),
+            on_done=lambda user: self._on_registered(user, first_name),
+            on_error=lambda e: messagebox.showerror("Erreur", f"Erreur lors de la création du compte: {e}"),
+            widgets=[self.register_button]
         )
+
+    def _on_registered(self, user, first_name):
+        """Shows the registration result (Tk thread)."""
         if user:
             messagebox.showinfo("Succès", f"Compte créé avec succès ! Bienvenue, {first_name} !")
             self._clear_fields()
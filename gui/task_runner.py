@@ -0,0 +1,150 @@
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class Task:
+    """Tâche soumise au TaskRunner : progression et annulation.
+
+    work(task) s'exécute dans un thread du pool ; il peut appeler
+    task.report(...) pour remonter une progression et consulter
+    task.cancelled pour s'arrêter tôt.
+    """
+
+    def __init__(self, runner, on_done, on_error, on_progress, widgets):
+        self._runner = runner
+        self._cancel_event = threading.Event()
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.widgets = widgets
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """demande l'arrêt ; une tâche pas encore démarrée ne s'exécute pas"""
+        self._cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            # _run ne sera jamais appelé : libérer l'état occupé quand même
+            self._runner._results.put((self, 'cancelled', None))
+
+    def report(self, *args):
+        """remonte une progression, reçue par on_progress(*args) dans le thread Tk"""
+        if self.on_progress is not None and not self.cancelled:
+            self._runner._results.put((self, 'progress', args))
+
+class TaskRunner:
+    """Exécute les appels lents aux managers hors du thread Tk.
+
+    submit() lance work(task) dans un pool de threads ; le résultat (ou
+    l'exception) revient par une file vidée toutes les poll_ms par after() :
+    on_done, on_error et on_progress s'exécutent donc dans le thread Tk.
+    Pendant la tâche, les widgets passés sont désactivés et le curseur est
+    en attente : la fenêtre reste utilisable.
+
+    Chaque manager protège ses index par un verrou (managers.locking) : le
+    thread Tk peut lire pendant qu'une tâche écrit. Par défaut un seul
+    worker : les tâches s'exécutent une par une dans l'ordre de soumission.
+    """
+
+    def __init__(self, root, max_workers=1, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self._results = queue.Queue()
+        self._tasks = set()  # tâches en cours (thread Tk uniquement)
+        self._after_id = None
+        self._poll()
+
+    @property
+    def busy(self):
+        return bool(self._tasks)
+
+    def submit(self, work, on_done=None, on_error=None, on_progress=None, widgets=()):
+        """lance work(task) en arrière-plan ; retourne la Task (annulation)
+
+        on_done(résultat) / on_error(exception) : appelés dans le thread Tk.
+        Sans on_error, l'exception est journalisée.
+        """
+        task = Task(self, on_done, on_error, on_progress, tuple(widgets))
+        self._set_busy(task, True)
+        task.future = self._executor.submit(self._run, task, work)
+        return task
+
+    def _run(self, task, work):
+        """exécuté dans le pool : le résultat part dans la file"""
+        if task.cancelled:
+            self._results.put((task, 'cancelled', None))
+            return
+        try:
+            self._results.put((task, 'done', work(task)))
+        except Exception as e:
+            self._results.put((task, 'error', e))
+
+    def _set_busy(self, task, busy):
+        if busy:
+            self._tasks.add(task)
+        else:
+            self._tasks.discard(task)
+        for widget in task.widgets:
+            try:
+                widget.config(state='disabled' if busy else 'normal')
+            except Exception:
+                pass  # widget détruit entre-temps (déconnexion)
+        try:
+            self.root.config(cursor='watch' if self._tasks else '')
+        except Exception:
+            pass
+
+    def _poll(self):
+        """traite les résultats en attente puis se reprogramme"""
+        while True:
+            try:
+                task, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self._call(task.on_progress, *value)
+                continue
+            self._set_busy(task, False)
+            if kind == 'done' and not task.cancelled:
+                self._call(task.on_done, value)
+            elif kind == 'error':
+                if task.on_error is not None and not task.cancelled:
+                    self._call(task.on_error, value)
+                else:
+                    logging.error(f"Erreur dans une tâche d'arrière-plan: {value}")
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    @staticmethod
+    def _call(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.error(f"Erreur dans le callback d'une tâche: {e}")
+
+    def cancel_all(self):
+        """annule les tâches en cours (ex. à la déconnexion : leurs écrans vont être détruits)"""
+        for task in list(self._tasks):
+            task.cancel()
+        # les tâches déjà terminées n'ont plus d'écran à prévenir
+        while True:
+            try:
+                task, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind != 'progress':
+                self._set_busy(task, False)
+
+    def stop(self):
+        """arrête le runner (fermeture de la fenêtre) : attend la tâche en cours pour ne pas couper une écriture"""
+        self.cancel_all()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,60 @@
+import queue
+import logging
+
+class TkDispatcher:
+    """Relaie les événements de l'EventBus vers le thread Tk.
+
+    Les managers publient depuis n'importe quel thread (worker de rappels,
+    passe de rétention...) ; Tk n'est pas thread-safe. Les événements sont
+    donc mis dans une file, vidée toutes les poll_ms par after() : les
+    handlers des écrans s'exécutent toujours dans le thread Tk.
+    """
+
+    def __init__(self, root, event_bus, poll_ms=50):
+        self.root = root
+        self.event_bus = event_bus
+        self.poll_ms = poll_ms
+        self._queue = queue.Queue()
+        self._unsubscribers = []
+        self._after_id = None
+        self._poll()
+
+    def subscribe(self, event_types, handler):
+        """abonne handler(event_type, payload), appelé dans le thread Tk ; event_types : un type ou une liste"""
+        if isinstance(event_types, str):
+            event_types = [event_types]
+        for event_type in event_types:
+            relay = lambda event_type, payload, handler=handler: self._queue.put((handler, event_type, payload))
+            self._unsubscribers.append(self.event_bus.subscribe(event_type, relay))
+
+    def unsubscribe_all(self):
+        """désabonne tous les handlers (ex. à la déconnexion, avant de détruire les écrans)"""
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+        # les événements déjà en file visaient des écrans détruits
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _poll(self):
+        """traite les événements en attente puis se reprogramme"""
+        while True:
+            try:
+                handler, event_type, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                handler(event_type, payload)
+            except Exception as e:
+                logging.error(f"Erreur lors du traitement de {event_type}: {e}")
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        """arrête le relais (fermeture de la fenêtre)"""
+        self.unsubscribe_all()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
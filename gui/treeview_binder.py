@@ -0,0 +1,71 @@
+from datetime import datetime
+from functools import lru_cache
+
+@lru_cache(maxsize=8192)
+def format_iso(iso_string, fmt):
+    """formate une date ISO (mise en cache : les mêmes dates reviennent à chaque rafraîchissement)"""
+    return datetime.fromisoformat(iso_string).strftime(fmt)
+
+class TreeviewBinder:
+    """Synchronise un ttk.Treeview avec une liste de lignes identifiées par une clé.
+
+    bind() compare les nouvelles lignes aux éléments affichés : seules les
+    lignes ajoutées, modifiées, supprimées ou déplacées touchent Tk. Les
+    éléments restants ne sont pas recréés : la sélection et la position de
+    défilement sont conservées.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows = {}  # iid -> (values, tags) affichés
+
+    def bind(self, rows):
+        """affiche exactement rows : itérable de (iid, values) ou (iid, values, tags), dans l'ordre voulu"""
+        tree = self.tree
+        order = []
+        new_rows = {}
+        for row in rows:
+            iid, values = str(row[0]), tuple(row[1])
+            tags = tuple(row[2]) if len(row) > 2 else ()
+            if iid in new_rows:
+                continue  # clé en double : la première ligne l'emporte
+            order.append(iid)
+            new_rows[iid] = (values, tags)
+
+        removed = [iid for iid in self._rows if iid not in new_rows]
+        if removed:
+            tree.delete(*removed)
+        for iid, row in new_rows.items():
+            current = self._rows.get(iid)
+            if current is None:
+                tree.insert('', 'end', iid=iid, values=row[0], tags=row[1])
+            elif current != row:
+                tree.item(iid, values=row[0], tags=row[1])
+        self._rows = new_rows
+
+        # un seul appel Tk pour réordonner, et seulement si l'ordre a changé
+        if list(tree.get_children()) != order:
+            tree.set_children('', *order)
+
+    def upsert(self, iid, values, tags=(), index='end'):
+        """ajoute ou met à jour une seule ligne (index : position d'insertion d'une nouvelle ligne)"""
+        iid, row = str(iid), (tuple(values), tuple(tags))
+        current = self._rows.get(iid)
+        if current is None:
+            self.tree.insert('', index, iid=iid, values=row[0], tags=row[1])
+        elif current != row:
+            self.tree.item(iid, values=row[0], tags=row[1])
+        self._rows[iid] = row
+
+    def remove(self, iid):
+        """retire une ligne si elle est affichée"""
+        iid = str(iid)
+        if self._rows.pop(iid, None) is not None:
+            self.tree.delete(iid)
+
+    def __contains__(self, iid):
+        return str(iid) in self._rows
+
+    def clear(self):
+        """vide la liste"""
+        self.bind(())
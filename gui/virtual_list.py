@@ -0,0 +1,146 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+from gui.treeview_binder import TreeviewBinder
+
+class VirtualList(tk.Frame):
+    """Liste fenêtrée pour les grandes tables (patients, rdv...).
+
+    Le Treeview ne contient que les lignes visibles : la barre de défilement
+    est gérée ici à partir du total, et les lignes sont demandées par pages à
+    fetch_page(offset, limit) -> (lignes, total), où une ligne est
+    (iid, values) ou (iid, values, tags). Les dernières pages lues sont
+    gardées en cache (tampon autour de la fenêtre) ; mémoire et temps
+    d'affichage ne dépendent donc pas de la taille de la table.
+    """
+
+    def __init__(self, parent, columns, fetch_page, height=15, page_size=100, max_pages=5,
+                 column_width=120, **kwargs):
+        tk.Frame.__init__(self, parent, **kwargs)
+        self.fetch_page = fetch_page
+        self.height = height          # lignes affichées
+        self.page_size = max(page_size, height)
+        self.max_pages = max_pages    # pages gardées en cache
+        self.total = 0
+        self.first = 0                # index de la première ligne affichée
+        self._pages = OrderedDict()   # n° de page -> lignes, du moins au plus récemment lu
+        self._refresh_id = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height)
+        self.binder = TreeviewBinder(self.tree)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=column_width)
+
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self._scroll_by(3))
+        self.tree.bind('<Up>', lambda event: self._move_focus(-1))
+        self.tree.bind('<Down>', lambda event: self._move_focus(1))
+        self.tree.bind('<Prior>', lambda event: self._move_focus(-self.height))
+        self.tree.bind('<Next>', lambda event: self._move_focus(self.height))
+        self.tree.bind('<Configure>', self._on_configure)
+
+    def refresh(self):
+        """vide le cache de pages puis réaffiche la fenêtre courante (total recalculé)"""
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        self._pages.clear()
+        self._page(self.first // self.page_size)  # met à jour le total
+        self.scroll_to(self.first)
+
+    def schedule_refresh(self):
+        """refresh() au prochain passage idle : une rafale d'événements ne relit qu'une fois"""
+        if self._refresh_id is None:
+            self._refresh_id = self.after_idle(self.refresh)
+
+    def scroll_to(self, index):
+        """affiche la fenêtre qui commence à la ligne index"""
+        self.first = max(0, min(int(index), self.total - self.height))
+        self._render()
+
+    def _page(self, number):
+        """lignes d'une page, depuis le cache ou fetch_page"""
+        rows = self._pages.get(number)
+        if rows is not None:
+            self._pages.move_to_end(number)
+            return rows
+        rows, self.total = self.fetch_page(number * self.page_size, self.page_size)
+        rows = list(rows)
+        self._pages[number] = rows
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def _window_rows(self):
+        """lignes [first, first + height[ (au plus deux pages lues)"""
+        end = min(self.first + self.height, self.total)
+        if end <= self.first:
+            return []
+        rows = []
+        first_page = self.first // self.page_size
+        for number in range(first_page, (end - 1) // self.page_size + 1):
+            rows.extend(self._page(number))
+        offset = self.first - first_page * self.page_size
+        return rows[offset:offset + end - self.first]
+
+    def _render(self):
+        self.binder.bind(self._window_rows())
+        if self.total > 0:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + self.height) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_by(self, rows):
+        self.scroll_to(self.first + rows)
+        return 'break'
+
+    def _on_scrollbar(self, action, value, unit=None):
+        """même protocole que Treeview.yview : ('moveto', fraction) ou ('scroll', n, 'units'|'pages')"""
+        if action == 'moveto':
+            self.scroll_to(float(value) * self.total)
+        elif action == 'scroll':
+            self._scroll_by(int(value) * (self.height if unit == 'pages' else 1))
+
+    def _on_mousewheel(self, event):
+        # Windows : multiples de 120 ; macOS : petites valeurs
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * steps)
+
+    def _move_focus(self, delta):
+        """clavier : fait défiler la fenêtre quand la ligne focus en sort"""
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if focus not in children:
+            return None
+        index = children.index(focus)
+        if 0 <= index + delta < len(children):
+            return None  # déplacement dans la fenêtre : comportement normal du Treeview
+        target = max(0, min(self.first + index + delta, self.total - 1))
+        self.scroll_to(target - index)
+        children = self.tree.get_children()
+        position = target - self.first
+        if 0 <= position < len(children):
+            self.tree.focus(children[position])
+            self.tree.selection_set(children[position])
+            self.tree.see(children[position])
+        return 'break'
+
+    def _on_configure(self, event):
+        """ajuste le nombre de lignes affichées à la hauteur réelle du Treeview"""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if not bbox:
+            return
+        header, row_height = bbox[1], bbox[3]
+        height = max(1, (event.height - header) // max(1, row_height))
+        if height != self.height:
+            self.height = height
+            self.page_size = max(self.page_size, height)
+            self._pages.clear()
+            self.scroll_to(self.first)
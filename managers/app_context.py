@@ -0,0 +1,86 @@
+import config
+from managers.storage_manager import StorageManager
+from managers.event_bus import EventBus
+from managers.sqlite_storage_manager import SQLiteStorageManager
+from managers.user_manager import UserManager
+from managers.schedule_manager import ScheduleManager
+from managers.notification_manager import NotificationManager
+from managers.prescription_manager import PrescriptionManager
+from managers.appointment_manager import AppointmentManager
+
+class AppContext:
+    """Registre des managers partagés par toutes les frames de l'application.
+
+    Chaque dataset est chargé une seule fois ; invalidate() le recharge pour
+    tous les écrans en même temps.
+    """
+
+    def __init__(self, storage_manager=None):
+        self.storage_manager = storage_manager or self._create_storage()
+        # les managers y publient leurs changements, les écrans s'y abonnent
+        self.event_bus = EventBus()
+        self.user_manager = UserManager(self.storage_manager)
+        self.schedule_manager = ScheduleManager(self.storage_manager, self.event_bus)
+        self.notification_manager = NotificationManager(self.storage_manager, event_bus=self.event_bus)
+        self.prescription_manager = PrescriptionManager(self.storage_manager, self.event_bus)
+        self.appointment_manager = AppointmentManager(
+            self.storage_manager,
+            schedule_manager=self.schedule_manager,
+            notification_manager=self.notification_manager,
+            user_manager=self.user_manager,
+            event_bus=self.event_bus,
+            reminder_lead_times=config.REMINDER_LEAD_TIMES
+        )
+        self.reminder_manager = self.appointment_manager.reminder_manager
+        self.email_manager = self.reminder_manager.email_manager
+        self.outbox_manager = self.reminder_manager.outbox
+        # reprend les emails restés en file à la dernière fermeture
+        self.outbox_manager.start()
+        # archivage des vieilles notifs en arrière-plan
+        self.notification_manager.start_retention_service()
+
+    @staticmethod
+    def _create_storage():
+        """instancie le backend de stockage choisi dans config.py"""
+        if config.STORAGE_BACKEND == 'sqlite':
+            # premier lancement : import automatique des fichiers JSON existants
+            return SQLiteStorageManager(config.SQLITE_FILE)
+        # écritures en arrière-plan : les handlers Tk ne bloquent pas sur le disque
+        return StorageManager(write_behind=True)
+
+    def invalidate(self, filename=None):
+        """Recharge un dataset (ou tous) depuis le disque pour tous les managers."""
+        # vide le cache de lecture pour forcer une vraie relecture
+        self.storage_manager.invalidate(filename)
+        reloaders = {
+            'users.json': self.user_manager.reload_users,
+            'timeslots.json': self.schedule_manager.reload_timeslots,
+            'availability_rules.json': self.schedule_manager.reload_timeslots,
+            'availability_exceptions.json': self.schedule_manager.reload_timeslots,
+            'notifications.json': self.notification_manager.load_notifications,
+            'prescriptions.json': self.prescription_manager.reload_prescriptions,
+            'appointments.json': self.appointment_manager.reload_appointments
+        }
+        if filename is None:
+            # dict.fromkeys : un même reloader n'est appelé qu'une fois
+            for reload in dict.fromkeys(reloaders.values()):
+                reload()
+        elif filename in reloaders:
+            reloaders[filename]()
+
+    def shutdown(self):
+        """Arrête les services et écrit les données en attente sur le disque."""
+        self.reminder_manager.stop_reminder_service()
+        self.outbox_manager.stop()
+        self.notification_manager.stop_retention_service()
+        self.email_manager.close()
+        self.storage_manager.close()
+
+_app_context = None
+
+def get_app_context():
+    """Retourne le contexte applicatif unique du processus (créé au premier appel)."""
+    global _app_context
+    if _app_context is None:
+        _app_context = AppContext()
+    return _app_context
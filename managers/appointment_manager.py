@@ -3,20 +3,40 @@ from managers.schedule_manager import ScheduleManager
 from managers.notification_manager import NotificationManager
 from managers.user_manager import UserManager
 from managers.reminder_manager import ReminderManager
+from managers.interval_index import IntervalIndex
+from managers.id_allocator import IdAllocator
+from managers import event_bus as events
+from managers.event_bus import EventBus
 from models.appointment import Appointment
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from bisect import bisect_left, bisect_right, insort
 import logging
 from typing import List, Dict
+import threading
+from managers.locking import synchronized
 
 class AppointmentManager:
-    def __init__(self, storage_manager):
+    # statuts qui occupent un créneau
+    ACTIVE_STATUSES = ('pending', 'planned')
+
+    def __init__(self, storage_manager, schedule_manager=None, notification_manager=None, user_manager=None,
+                 event_bus=None, reminder_lead_times=None):
+        # appelé depuis le thread Tk et le TaskRunner : index protégés par ce verrou
+        self._lock = threading.RLock()
         self.storage_manager = storage_manager
-        self.schedule_manager = ScheduleManager(storage_manager)
-        self.notification_manager = NotificationManager(storage_manager)
-        self.user_manager = UserManager(storage_manager)
-        self.reminder_manager = ReminderManager(self, self.user_manager)
+        self.event_bus = event_bus or EventBus()
+        # les managers partagés (AppContext) sont réutilisés, sinon on crée les nôtres
+        self.schedule_manager = schedule_manager or ScheduleManager(storage_manager, self.event_bus)
+        self.notification_manager = notification_manager or NotificationManager(storage_manager, event_bus=self.event_bus)
+        self.user_manager = user_manager or UserManager(storage_manager)
+        # délais de rappel : config.REMINDER_LEAD_TIMES sauf si fournis
+        self.reminder_manager = ReminderManager(self, self.user_manager, lead_times=reminder_lead_times)
         self.appointments_file = 'appointments.json'
         self.appointments = self._load_appointments()
+        self._build_indexes()
+        self.id_allocator = IdAllocator.shared(storage_manager)
+        self.id_allocator.seed('appointment', lambda: IdAllocator.max_numeric_id(
+            app.get('appointment_id', 0) for app in self.appointments))
 
     def _load_appointments(self):
         """Loads appointments from the JSON file."""
@@ -26,9 +46,87 @@ class AppointmentManager:
         """Saves the current list of appointments to the JSON file."""
         self.storage_manager.save_data(self.appointments_file, self.appointments)
 
+    @synchronized
     def reload_appointments(self):
         """Reloads appointments from the JSON file."""
-        self.appointments = self._load_appointments()
+        appointments = self._load_appointments()
+        if appointments is self.appointments:
+            # fichier inchangé (cache du storage) : les index sont à jour
+            return
+        self.appointments = appointments
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """reconstruit tous les index des rdv"""
+        self._doctor_intervals = IntervalIndex()
+        self._patient_intervals = IntervalIndex()
+        self._by_id = {}
+        self._by_patient = {}  # patient_id -> {appointment_id: rdv}
+        self._by_doctor = {}   # doctor_id -> {appointment_id: rdv}
+        self._by_status = {}   # statut -> {appointment_id: rdv}
+        self._by_day = {}      # 'YYYY-MM-DD' -> {appointment_id: rdv}
+        self._days = []        # jours indexés, triés
+        self._sorted_pages = {}  # (statut, ordre) -> rdv triés, pour get_appointments_page
+        for appt in self.appointments:
+            self._index_appointment(appt)
+
+    def _index_appointment(self, appointment):
+        """ajoute un rdv à tous les index"""
+        self._sorted_pages.clear()
+        appointment_id = appointment['appointment_id']
+        # en cas de doublon on garde le premier, comme l'ancien _find
+        self._by_id.setdefault(appointment_id, appointment)
+        self._by_patient.setdefault(appointment['patient_id'], {})[appointment_id] = appointment
+        self._by_doctor.setdefault(appointment['doctor_id'], {})[appointment_id] = appointment
+        self._by_status.setdefault(appointment['status'], {})[appointment_id] = appointment
+        day = str(appointment.get('start_time', ''))[:10]
+        if day:
+            if day not in self._by_day:
+                insort(self._days, day)
+                self._by_day[day] = {}
+            self._by_day[day][appointment_id] = appointment
+        self._index_interval(appointment)
+
+    def _unindex_appointment(self, appointment):
+        """retire un rdv de tous les index"""
+        self._sorted_pages.clear()
+        appointment_id = appointment['appointment_id']
+        if self._by_id.get(appointment_id) is appointment:
+            del self._by_id[appointment_id]
+        self._by_patient.get(appointment['patient_id'], {}).pop(appointment_id, None)
+        self._by_doctor.get(appointment['doctor_id'], {}).pop(appointment_id, None)
+        self._by_status.get(appointment['status'], {}).pop(appointment_id, None)
+        self._by_day.get(str(appointment.get('start_time', ''))[:10], {}).pop(appointment_id, None)
+        self._unindex_interval(appointment)
+
+    def _index_interval(self, appointment):
+        """indexe l'intervalle d'un rdv s'il occupe un créneau (pending/planned)"""
+        if appointment.get('status') not in self.ACTIVE_STATUSES:
+            return
+        try:
+            start = datetime.fromisoformat(appointment['start_time'])
+            end = datetime.fromisoformat(appointment['end_time'])
+        except (KeyError, TypeError, ValueError):
+            logging.warning(f"Rdv {appointment.get('appointment_id')} ignoré: dates invalides")
+            return
+        appointment_id = appointment['appointment_id']
+        self._doctor_intervals.add(appointment['doctor_id'], start, end, appointment_id)
+        self._patient_intervals.add(appointment['patient_id'], start, end, appointment_id)
+
+    def _unindex_interval(self, appointment):
+        """retire un rdv des index d'intervalles"""
+        self._doctor_intervals.remove(appointment['appointment_id'])
+        self._patient_intervals.remove(appointment['appointment_id'])
+
+    def _set_status(self, appointment, status):
+        """change le statut d'un rdv en gardant les index à jour"""
+        self._sorted_pages.clear()
+        appointment_id = appointment['appointment_id']
+        self._by_status.get(appointment['status'], {}).pop(appointment_id, None)
+        appointment['status'] = status
+        self._by_status.setdefault(status, {})[appointment_id] = appointment
+        self._unindex_interval(appointment)
+        self._index_interval(appointment)
 
     def _check_time(self, start_time, end_time):
         """vérifie les contraintes de temps"""
@@ -48,43 +146,25 @@ class AppointmentManager:
         
         return True, "OK"
 
-    def _check_conflicts(self, doctor_id, start_time, end_time, exclude_id=None):
-        """vérifie les conflits de planning"""
-        for appt in self.appointments:
-            if exclude_id and appt['appointment_id'] == exclude_id:
-                continue
-                
-            if appt['doctor_id'] == doctor_id and appt['status'] in ['pending', 'planned']:
-                existing_start = datetime.fromisoformat(appt['start_time'])
-                existing_end = datetime.fromisoformat(appt['end_time'])
-                
-                if (start_time < existing_end and end_time > existing_start):
-                    return True, f"Conflit avec rdv {appt['appointment_id']}"
+    def _check_conflicts(self, doctor_id, start_time, end_time, exclude_id=None, patient_id=None):
+        """vérifie les conflits de planning (et ceux du patient si patient_id est donné)"""
+        conflict_id = self._doctor_intervals.find_overlap(doctor_id, start_time, end_time, exclude_id)
+        if conflict_id is not None:
+            return True, f"Conflit avec rdv {conflict_id}"
+        
+        if patient_id is not None:
+            conflict_id = self._patient_intervals.find_overlap(patient_id, start_time, end_time, exclude_id)
+            if conflict_id is not None:
+                return True, f"Le patient a déjà un rdv sur ce créneau ({conflict_id})"
         
         return False, "Pas de conflit"
 
     def _get_next_id(self):
-        """génère un nouvel id de rdv"""
-        if not self.appointments:
-            return "APT-1"
-        
-        max_id = 0
-        for app in self.appointments:
-            try:
-                app_id_str = str(app.get('appointment_id', 0))
-                if app_id_str.startswith('APT-'):
-                    app_id_num = int(app_id_str.split('-')[-1])
-                else:
-                    app_id_num = int(app_id_str)
-                
-                if app_id_num > max_id:
-                    max_id = app_id_num
-            except:
-                continue
-        
-        return f"APT-{max_id + 1}"
+        """génère un nouvel id de rdv (séquence partagée, jamais réutilisé)"""
+        return f"APT-{self.id_allocator.next_id('appointment')}"
 
-    def book_appointment(self, patient_id, doctor_id, start_time, end_time, reason, auto_confirm=False):
+    @synchronized
+    def book_appointment(self, patient_id, doctor_id, start_time, end_time, reason, auto_confirm=False, check_patient_overlap=False):
         """prend un nouveau rdv"""
         try:
             # validations
@@ -97,7 +177,10 @@ class AppointmentManager:
                 return False, msg
             
             # vérifier les conflits
-            has_conflict, conflict_msg = self._check_conflicts(doctor_id, start_time, end_time)
+            has_conflict, conflict_msg = self._check_conflicts(
+                doctor_id, start_time, end_time,
+                patient_id=patient_id if check_patient_overlap else None
+            )
             if has_conflict:
                 return False, conflict_msg
             
@@ -120,15 +203,23 @@ class AppointmentManager:
             if auto_confirm:
                 appointment['confirmed_at'] = datetime.now().isoformat()
             
-            self.appointments.append(appointment)
-            self._save_appointments()
-            
-            # créer les notifs
-            self._create_notifs(appointment)
+            # rdv + notifs écrits en un seul commit
+            with self.storage_manager.transaction():
+                self.appointments.append(appointment)
+                self._index_appointment(appointment)
+                self._save_appointments()
+                
+                # créer les notifs
+                with self.notification_manager.batch():  # une seule sauvegarde des notifs
+                    self._create_notifs(appointment)
+                
+                # email de confirmation mis en file dans le même commit
+                if auto_confirm:
+                    self.reminder_manager.send_confirmation_email(appointment)
             
-            # envoyer email si confirmé
-            if auto_confirm:
-                self.reminder_manager.send_confirmation_email(appointment)
+            # programmer les rappels (rdv confirmés uniquement)
+            self.reminder_manager.schedule_appointment(appointment)
+            self.event_bus.publish(events.APPOINTMENT_BOOKED, appointment=appointment)
             
             print(f"Rdv {appointment_id} pris avec succès")
             return True, f"Rendez-vous {appointment_id} pris avec succès"
@@ -180,6 +271,7 @@ class AppointmentManager:
         except Exception as e:
             print(f"Erreur création notifs: {e}")
 
+    @synchronized
     def cancel_appointment(self, appointment_id):
         """annule un rdv"""
         try:
@@ -188,12 +280,17 @@ class AppointmentManager:
                 return False, "Rdv non trouvé"
             
             old_status = appointment['status']
-            appointment['status'] = 'cancelled'
-            appointment['cancelled_at'] = datetime.now().isoformat()
-            self._save_appointments()
+            with self.storage_manager.transaction():
+                self._set_status(appointment, 'cancelled')
+                appointment['cancelled_at'] = datetime.now().isoformat()
+                self._save_appointments()
+                
+                # créer notifs d'annulation
+                with self.notification_manager.batch():
+                    self._create_cancel_notifs(appointment)
             
-            # créer notifs d'annulation
-            self._create_cancel_notifs(appointment)
+            self.reminder_manager.unschedule_appointment(appointment_id)
+            self.event_bus.publish(events.APPOINTMENT_CANCELLED, appointment=appointment, old_status=old_status)
             
             print(f"Rdv {appointment_id} annulé")
             return True, f"Rendez-vous {appointment_id} annulé"
@@ -232,6 +329,7 @@ class AppointmentManager:
         except Exception as e:
             print(f"Erreur notifs annulation: {e}")
 
+    @synchronized
     def delete_appointment(self, appointment_id):
         """supprime un rdv"""
         try:
@@ -239,12 +337,18 @@ class AppointmentManager:
             if not appointment:
                 return False, "Rdv non trouvé"
             
-            # créer notifs de suppression
-            self._create_delete_notifs(appointment)
+            with self.storage_manager.transaction():
+                # créer notifs de suppression
+                with self.notification_manager.batch():
+                    self._create_delete_notifs(appointment)
+                
+                # supprimer du fichier
+                self.appointments = [app for app in self.appointments if app['appointment_id'] != appointment_id]
+                self._unindex_appointment(appointment)
+                self._save_appointments()
             
-            # supprimer du fichier
-            self.appointments = [app for app in self.appointments if app['appointment_id'] != appointment_id]
-            self._save_appointments()
+            self.reminder_manager.unschedule_appointment(appointment_id)
+            self.event_bus.publish(events.APPOINTMENT_DELETED, appointment=appointment)
             
             print(f"Rdv {appointment_id} supprimé")
             return True, f"Rendez-vous {appointment_id} supprimé"
@@ -283,6 +387,7 @@ class AppointmentManager:
         except Exception as e:
             print(f"Erreur notifs suppression: {e}")
 
+    @synchronized
     def validate_appointment(self, appointment_id):
         """valide un rdv"""
         try:
@@ -293,15 +398,20 @@ class AppointmentManager:
             if appointment['status'] != 'pending':
                 return False, "Le rdv n'est pas en attente"
             
-            appointment['status'] = 'planned'
-            appointment['confirmed_at'] = datetime.now().isoformat()
-            self._save_appointments()
-            
-            # créer notifs de validation
-            self._create_validation_notifs(appointment)
+            with self.storage_manager.transaction():
+                self._set_status(appointment, 'planned')
+                appointment['confirmed_at'] = datetime.now().isoformat()
+                self._save_appointments()
+                
+                # créer notifs de validation
+                with self.notification_manager.batch():
+                    self._create_validation_notifs(appointment)
+                
+                # email de confirmation mis en file dans le même commit
+                self.reminder_manager.send_confirmation_email(appointment)
             
-            # envoyer email de confirmation
-            self.reminder_manager.send_confirmation_email(appointment)
+            self.reminder_manager.schedule_appointment(appointment)
+            self.event_bus.publish(events.APPOINTMENT_VALIDATED, appointment=appointment)
             
             print(f"Rdv {appointment_id} validé")
             return True, f"Rendez-vous {appointment_id} validé"
@@ -341,25 +451,101 @@ class AppointmentManager:
         except Exception as e:
             print(f"Erreur notifs validation: {e}")
 
+    @synchronized
     def get_appointments_for_patient(self, patient_id):
         """récupère les rdv d'un patient"""
-        return [app for app in self.appointments if app['patient_id'] == patient_id]
+        return list(self._by_patient.get(patient_id, {}).values())
 
+    @synchronized
     def get_appointments_for_doctor(self, doctor_id):
         """récupère les rdv d'un docteur"""
-        return [app for app in self.appointments if app['doctor_id'] == doctor_id]
+        return list(self._by_doctor.get(doctor_id, {}).values())
 
+    @synchronized
     def get_all_appointments(self):
         """récupère tous les rdv"""
-        return self.appointments
+        return list(self.appointments)  # copie : la liste change dans le TaskRunner
 
     def _find(self, appointment_id):
         """trouve un rdv par id"""
-        for app in self.appointments:
-            if app['appointment_id'] == appointment_id:
-                return app
-        return None
+        return self._by_id.get(appointment_id)
+
+    @synchronized
+    def get_appointment(self, appointment_id):
+        """récupère un rdv par id"""
+        return self._find(appointment_id)
 
+    @synchronized
     def get_appointments_by_status(self, status):
         """récupère les rdv par statut"""
-        return [app for app in self.appointments if app['status'] == status] 
\ No newline at end of file
+        return list(self._by_status.get(status, {}).values())
+
+    @staticmethod
+    def _day_key(day):
+        """clé 'YYYY-MM-DD' d'une date, d'un datetime ou d'une chaîne ISO"""
+        if isinstance(day, (date, datetime)):
+            return day.isoformat()[:10]
+        return str(day)[:10]
+
+    @synchronized
+    def get_appointments_by_date(self, day, status=None):
+        """récupère les rdv d'un jour (éventuellement filtrés par statut)"""
+        appointments = self._by_day.get(self._day_key(day), {}).values()
+        return [app for app in appointments if status is None or app['status'] == status]
+
+    @synchronized
+    def get_appointments_in_range(self, start, end, status=None, doctor_id=None, patient_id=None):
+        """récupère les rdv qui commencent dans [start, end[, triés par début"""
+        start_iso = start.isoformat() if isinstance(start, (date, datetime)) else str(start)
+        end_iso = end.isoformat() if isinstance(end, (date, datetime)) else str(end)
+        first = bisect_left(self._days, self._day_key(start))
+        last = bisect_right(self._days, self._day_key(end))
+        result = []
+        for day in self._days[first:last]:
+            for app in self._by_day[day].values():
+                if not (start_iso <= app['start_time'] < end_iso):
+                    continue
+                if status is not None and app['status'] != status:
+                    continue
+                if doctor_id is not None and app['doctor_id'] != doctor_id:
+                    continue
+                if patient_id is not None and app['patient_id'] != patient_id:
+                    continue
+                result.append(app)
+        return sorted(result, key=lambda app: app['start_time'])
+
+    @synchronized
+    def get_appointments_page(self, status=None, offset=0, limit=50, order_by='start_time'):
+        """une page de rdv triés (order_by : 'start_time' ou '-start_time')
+
+        Retourne (rdv, total) : total = nombre de rdv du statut, pour
+        dimensionner la liste sans tout charger. En SQLite la pagination se
+        fait en base ; en JSON la liste triée est gardée jusqu'au prochain
+        changement.
+        """
+        query = getattr(self.storage_manager, 'query_appointments', None)
+        if query is not None:
+            return (query(status=status, order_by=order_by, limit=limit, offset=offset),
+                    self.storage_manager.count_appointments(status=status))
+        key = (status, order_by)
+        appointments = self._sorted_pages.get(key)
+        if appointments is None:
+            source = self.appointments if status is None else self._by_status.get(status, {}).values()
+            appointments = sorted(source, key=lambda app: str(app.get('start_time', '')),
+                                  reverse=order_by.startswith('-'))
+            self._sorted_pages[key] = appointments
+        return appointments[offset:offset + limit], len(appointments)
+
+    @synchronized
+    def update_appointment_status(self, appointment_id, status):
+        """met à jour le statut d'un rdv et sauvegarde"""
+        appointment = self._find(appointment_id)
+        if not appointment:
+            return False
+        old_status = appointment['status']
+        self._set_status(appointment, status)
+        self._save_appointments()
+        # reprogramme ou annule les rappels selon le nouveau statut
+        self.reminder_manager.schedule_appointment(appointment)
+        self.event_bus.publish(events.APPOINTMENT_STATUS_CHANGED, appointment=appointment, old_status=old_status)
+        return True
@@ -1,20 +1,121 @@
 import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import logging
 import json
 import os
-from typing import Optional
+from typing import Optional, List, Tuple
+
+class SMTPConnectionPool:
+    """Pool de sessions SMTP déjà authentifiées (STARTTLS + login faits une fois)
+
+    Les sessions inutilisées depuis plus de idle_timeout sont fermées par un
+    timer en arrière-plan, armé tant qu'il reste des sessions inactives.
+    """
+
+    def __init__(self, connect, max_size=2, idle_timeout=60, noop_after=5):
+        self._connect = connect            # callable qui ouvre une session authentifiée
+        self.idle_timeout = idle_timeout   # une session inutilisée plus longtemps est fermée
+        self.noop_after = noop_after       # au-delà, NOOP avant de réutiliser une session
+        self._idle = []                    # [(session, dernière utilisation)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._reaper = None                # timer de fermeture des sessions inactives
+
+    @contextmanager
+    def connection(self):
+        """Prête une session ; elle est rendue au pool, ou fermée si elle a échoué"""
+        with self._slots:
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                # erreur de session : on ne la remet pas dans le pool
+                self._close(server)
+                raise
+            else:
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+                    self._schedule_reaper(self.idle_timeout)
+
+    def _checkout(self):
+        """Réutilise une session encore valide, sinon en ouvre une nouvelle"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(server)
+                continue
+            if idle_for > self.noop_after:
+                try:
+                    if server.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP refusé")
+                except (smtplib.SMTPException, OSError):
+                    self._close(server)
+                    continue
+            return server
+        return self._connect()
+
+    def _schedule_reaper(self, delay):
+        """arme le timer de fermeture s'il ne l'est pas déjà (appelé sous le verrou)"""
+        if self._reaper is None:
+            self._reaper = threading.Timer(delay, self._reap_idle)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap_idle(self):
+        """ferme les sessions inactives depuis plus de idle_timeout, puis se réarme s'il en reste"""
+        now = time.monotonic()
+        with self._lock:
+            self._reaper = None
+            expired = [server for server, last_used in self._idle if now - last_used > self.idle_timeout]
+            self._idle = [(server, last_used) for server, last_used in self._idle
+                          if now - last_used <= self.idle_timeout]
+            if self._idle:
+                oldest = min(last_used for _, last_used in self._idle)
+                self._schedule_reaper(max(0.0, oldest + self.idle_timeout - now) + 0.1)
+        for server in expired:
+            self._close(server)
+
+    @staticmethod
+    def _close(server):
+        """Ferme une session sans lever d'erreur"""
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                server.close()
+            except OSError:
+                pass
+
+    def close_all(self):
+        """Ferme toutes les sessions inactives (changement de config, arrêt)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for server, _ in idle:
+            self._close(server)
 
 class EmailManager:
     def __init__(self):
         self.smtp_server = "smtp.gmail.com"
         self.smtp_port = 587
+        self.smtp_timeout = 30
         self.sender_email = None
         self.sender_password = None
         self.is_configured = False
         self.config_file = "data/email_config.json"
+        self.pool = SMTPConnectionPool(self._open_connection, max_size=4)  # une session par worker de rappels
         self.load_configuration()
         
     def load_configuration(self):
@@ -55,11 +156,12 @@ class EmailManager:
         self.sender_email = sender_email
         self.sender_password = sender_password
         self.is_configured = True
+        self.pool.close_all()  # les sessions ouvertes utilisent les anciens identifiants
         self.save_configuration()  # Sauvegarder la configuration
         logging.info(f"Email manager configuré avec {sender_email}")
         
-    def send_appointment_confirmation(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str) -> bool:
-        """Envoie un email de confirmation de rendez-vous"""
+    def build_appointment_confirmation(self, appointment: dict, patient_name: str, doctor_name: str) -> Tuple[str, str]:
+        """Construit (sujet, corps) de l'email de confirmation"""
         # Formater la date et l'heure
         start_time = datetime.fromisoformat(appointment['start_time'])
         date_str = start_time.strftime('%d/%m/%Y')
@@ -89,10 +191,15 @@ class EmailManager:
         </html>
         """
         
+        return subject, body
+        
+    def send_appointment_confirmation(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str) -> bool:
+        """Envoie un email de confirmation de rendez-vous"""
+        subject, body = self.build_appointment_confirmation(appointment, patient_name, doctor_name)
         return self._send_email(to_email, subject, body)
         
-    def send_appointment_cancellation(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str) -> bool:
-        """Envoie un email d'annulation de rendez-vous"""
+    def build_appointment_cancellation(self, appointment: dict, patient_name: str, doctor_name: str) -> Tuple[str, str]:
+        """Construit (sujet, corps) de l'email d'annulation"""
         # Formater la date et l'heure
         start_time = datetime.fromisoformat(appointment['start_time'])
         date_str = start_time.strftime('%d/%m/%Y')
@@ -122,23 +229,29 @@ class EmailManager:
         </html>
         """
         
+        return subject, body
+        
+    def send_appointment_cancellation(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str) -> bool:
+        """Envoie un email d'annulation de rendez-vous"""
+        subject, body = self.build_appointment_cancellation(appointment, patient_name, doctor_name)
         return self._send_email(to_email, subject, body)
         
-    def send_reminder_email(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str) -> bool:
-        """Envoie un email de rappel de rendez-vous"""
+    def build_reminder_email(self, appointment: dict, patient_name: str, doctor_name: str,
+                             when: str = "demain") -> Tuple[str, str]:
+        """Construit (sujet, corps) de l'email de rappel"""
         # Formater la date et l'heure
         start_time = datetime.fromisoformat(appointment['start_time'])
         date_str = start_time.strftime('%d/%m/%Y')
         time_str = start_time.strftime('%H:%M')
         
-        subject = "Rappel de Rendez-vous - Demain"
+        subject = f"Rappel de Rendez-vous - {when[0].upper() + when[1:]}"
         body = f"""
         <html>
         <body>
             <h2>Rappel de Rendez-vous</h2>
             <p>Bonjour {patient_name},</p>
             
-            <p>Ceci est un rappel pour votre rendez-vous <strong>demain</strong> :</p>
+            <p>Ceci est un rappel pour votre rendez-vous <strong>{when}</strong> :</p>
             
             <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
                 <p><strong>Date :</strong> {date_str}</p>
@@ -155,6 +268,12 @@ class EmailManager:
         </html>
         """
         
+        return subject, body
+        
+    def send_reminder_email(self, to_email: str, appointment: dict, patient_name: str, doctor_name: str,
+                            when: str = "demain") -> bool:
+        """Envoie un email de rappel de rendez-vous"""
+        subject, body = self.build_reminder_email(appointment, patient_name, doctor_name, when)
         return self._send_email(to_email, subject, body)
         
     def send_test_email(self, to_email: str) -> bool:
@@ -175,35 +294,81 @@ class EmailManager:
         
         return self._send_email(to_email, subject, body)
         
+    def _open_connection(self):
+        """Ouvre une session SMTP authentifiée (utilisée par le pool)"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.smtp_timeout)
+        try:
+            server.starttls()
+            server.login(self.sender_email, self.sender_password)
+        except Exception:
+            SMTPConnectionPool._close(server)
+            raise
+        return server
+
+    def _build_message(self, to_email: str, subject: str, body: str) -> str:
+        """Construit le message MIME"""
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html'))
+        return msg.as_string()
+
     def _send_email(self, to_email: str, subject: str, body: str) -> bool:
         """Envoie un email"""
+        return self.send_many([(to_email, subject, body)])[0]
+
+    def send_many(self, messages: List[Tuple[str, str, str]]) -> List[bool]:
+        """Envoie plusieurs emails (destinataire, sujet, corps) sur une même session SMTP
+
+        Retourne un booléen par message. Si la session tombe, on se reconnecte
+        une fois et on reprend au message en cours ; si cette reconnexion
+        échoue aussi (serveur injoignable), le reste du lot est marqué en
+        échec sans retenter une connexion par message.
+        """
         if not self.is_configured or not self.sender_email or not self.sender_password:
             logging.error("Email manager not properly configured")
-            return False
-            
-        try:
-            # Créer le message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Ajouter le corps du message
-            msg.attach(MIMEText(body, 'html'))
-            
-            # Connexion au serveur SMTP
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
-            
-            # Envoyer l'email
-            text = msg.as_string()
-            server.sendmail(self.sender_email, to_email, text)
-            server.quit()
-            
-            logging.info(f"Email envoyé avec succès à {to_email}")
-            return True
-            
-        except Exception as e:
-            logging.error(f"Erreur lors de l'envoi de l'email: {e}")
-            return False 
\ No newline at end of file
+            return [False] * len(messages)
+
+        results = []
+        pending = deque(messages)
+        reconnected = False
+        while pending:
+            connected = False
+            try:
+                with self.pool.connection() as server:
+                    connected = True
+                    while pending:
+                        to_email, subject, body = pending[0]
+                        try:
+                            server.sendmail(self.sender_email, to_email, self._build_message(to_email, subject, body))
+                            logging.info(f"Email envoyé avec succès à {to_email}")
+                            results.append(True)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                            # refus propre à ce message : la session reste utilisable
+                            logging.error(f"Erreur lors de l'envoi de l'email à {to_email}: {e}")
+                            results.append(False)
+                        pending.popleft()
+                        reconnected = False
+            except smtplib.SMTPAuthenticationError as e:
+                logging.error(f"Erreur d'authentification SMTP: {e}")
+                results.extend([False] * len(pending))
+                break
+            except Exception as e:
+                if not reconnected:
+                    # session perdue (timeout serveur...) : une nouvelle tentative
+                    reconnected = True
+                    continue
+                if not connected:
+                    # serveur toujours injoignable : inutile d'attendre un timeout par message
+                    logging.error(f"Serveur SMTP injoignable, {len(pending)} email(s) non envoyé(s): {e}")
+                    results.extend([False] * len(pending))
+                    break
+                to_email = pending.popleft()[0]
+                logging.error(f"Erreur lors de l'envoi de l'email à {to_email}: {e}")
+                results.append(False)
+        return results
+
+    def close(self):
+        """Ferme les sessions SMTP du pool"""
+        self.pool.close_all()
@@ -0,0 +1,59 @@
+import threading
+import logging
+
+# Types d'événements publiés par les managers (payload entre parenthèses)
+APPOINTMENT_BOOKED = 'appointment.booked'            # (appointment)
+APPOINTMENT_VALIDATED = 'appointment.validated'      # (appointment)
+APPOINTMENT_CANCELLED = 'appointment.cancelled'      # (appointment, old_status)
+APPOINTMENT_DELETED = 'appointment.deleted'          # (appointment)
+APPOINTMENT_STATUS_CHANGED = 'appointment.status_changed'  # (appointment, old_status)
+SLOTS_ADDED = 'schedule.slots_added'                 # (doctor_id, count)
+SLOT_BLOCKED = 'schedule.slot_blocked'               # (doctor_id, start_time)
+SLOT_UNBLOCKED = 'schedule.slot_unblocked'           # (doctor_id, start_time)
+SLOT_RESERVED = 'schedule.slot_reserved'             # (doctor_id, start_time)
+SLOT_RELEASED = 'schedule.slot_released'             # (doctor_id, start_time)
+SCHEDULE_CHANGED = 'schedule.changed'                # (doctor_id) règles, absences, plages
+NOTIFICATIONS_CREATED = 'notification.created'       # (notifications)
+NOTIFICATIONS_UPDATED = 'notification.updated'       # (notifications)
+NOTIFICATIONS_DELETED = 'notification.deleted'       # (notifications)
+PRESCRIPTION_CREATED = 'prescription.created'        # (prescription)
+PRESCRIPTION_UPDATED = 'prescription.updated'        # (prescription)
+PRESCRIPTION_DELETED = 'prescription.deleted'        # (prescription)
+
+ALL_EVENTS = '*'
+
+class EventBus:
+    """Bus publish/subscribe en mémoire entre managers et écrans.
+
+    publish() appelle les abonnés de façon synchrone, dans le thread de
+    l'appelant (thread Tk, worker de rappels...) : côté GUI, passer par
+    gui.tk_dispatcher.TkDispatcher pour revenir sur le thread Tk. Une
+    exception d'un abonné est journalisée et n'interrompt pas les autres.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # type d'événement -> [handler(event_type, payload)]
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type, handler):
+        """abonne handler(event_type, payload) à un type (ou ALL_EVENTS) ; retourne une fonction de désabonnement"""
+        with self._lock:
+            self._subscribers.setdefault(event_type, []).append(handler)
+        return lambda: self.unsubscribe(event_type, handler)
+
+    def unsubscribe(self, event_type, handler):
+        """retire un abonné"""
+        with self._lock:
+            handlers = self._subscribers.get(event_type, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, event_type, **payload):
+        """publie un événement à ses abonnés puis aux abonnés de ALL_EVENTS"""
+        with self._lock:
+            handlers = list(self._subscribers.get(event_type, ())) + list(self._subscribers.get(ALL_EVENTS, ()))
+        for handler in handlers:
+            try:
+                handler(event_type, payload)
+            except Exception as e:
+                logging.error(f"Erreur d'un abonné à {event_type}: {e}")
@@ -0,0 +1,76 @@
+import os
+import threading
+
+class IdAllocator:
+    """Séquences d'identifiants persistées par entité (sequences.json).
+
+    Chaque entité (rdv, user, notif...) a son compteur : next_id() est en
+    O(1), ne réutilise jamais un id même après suppression, et
+    reserve_block() réserve plusieurs ids en une seule sauvegarde.
+    """
+
+    SEQUENCES_FILE = 'sequences.json'
+
+    _shared = {}  # dossier de données -> allocateur
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._sequences = {record['sequence']: record['last_value']
+                           for record in storage.load_data(self.SEQUENCES_FILE)}
+
+    @classmethod
+    def shared(cls, storage):
+        """retourne l'allocateur partagé par tous les managers d'un même dossier de données"""
+        key = os.path.abspath(storage.data_directory)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(storage)
+            return cls._shared[key]
+
+    @staticmethod
+    def max_numeric_id(values):
+        """plus grand suffixe numérique parmi des ids 12 / 'APT-12' (les autres sont ignorés)"""
+        max_id = 0
+        for value in values:
+            try:
+                number = int(str(value).rsplit('-', 1)[-1])
+            except ValueError:
+                continue
+            max_id = max(max_id, number)
+        return max_id
+
+    def seed(self, name, current_max):
+        """aligne une séquence sur les données ; current_max : callable qui retourne le plus grand id stocké
+
+        sequences.json est un fichier à part : après un crash (ou une sauvegarde
+        ratée), il peut être en retard sur les ids déjà écrits. Le compteur ne
+        descend jamais, mais remonte au plus grand id trouvé.
+        """
+        with self._lock:
+            stored_max = current_max()
+            if name in self._sequences and self._sequences[name] >= stored_max:
+                return
+            self._sequences[name] = max(self._sequences.get(name, 0), stored_max)
+            self._save()
+
+    def next_id(self, name):
+        """retourne le prochain id de la séquence"""
+        return self.reserve_block(name, 1)[0]
+
+    def reserve_block(self, name, count):
+        """réserve count ids consécutifs et les retourne (range)"""
+        if count < 0:
+            raise ValueError("count doit être positif")
+        with self._lock:
+            first = self._sequences.get(name, 0) + 1
+            if count:
+                self._sequences[name] = first + count - 1
+                self._save()
+            return range(first, first + count)
+
+    def _save(self):
+        """sauvegarde les séquences (appelé sous le verrou)"""
+        data = [{'sequence': name, 'last_value': value} for name, value in sorted(self._sequences.items())]
+        self.storage.save_data(self.SEQUENCES_FILE, data)
@@ -0,0 +1,52 @@
+from bisect import bisect_left, insort
+from itertools import count
+
+class IntervalIndex:
+    """Index d'intervalles [début, fin[ groupés par clé (docteur, patient...).
+
+    Pour chaque clé les intervalles sont triés par début et on mémorise la
+    plus grande durée : un chevauchement avec [start, end[ ne peut venir que
+    d'un intervalle qui commence dans ]start - durée_max, end[, ce qui donne
+    une recherche en O(log n + k) sans jamais reparser de dates.
+    """
+
+    def __init__(self):
+        self._intervals = {}    # clé -> liste triée de (début, seq, fin, item_id)
+        self._max_length = {}   # clé -> plus grande durée indexée
+        self._entries = {}      # item_id -> [(clé, entrée), ...]
+        self._seq = count()     # départage les débuts égaux sans comparer les ids
+
+    def add(self, key, start, end, item_id):
+        """ajoute l'intervalle d'un élément"""
+        entry = (start, next(self._seq), end, item_id)
+        insort(self._intervals.setdefault(key, []), entry)
+        length = end - start
+        if key not in self._max_length or length > self._max_length[key]:
+            self._max_length[key] = length
+        self._entries.setdefault(item_id, []).append((key, entry))
+
+    def remove(self, item_id):
+        """retire tous les intervalles d'un élément"""
+        for key, entry in self._entries.pop(item_id, []):
+            intervals = self._intervals[key]
+            position = bisect_left(intervals, entry)
+            if position < len(intervals) and intervals[position] is entry:
+                del intervals[position]
+
+    def __contains__(self, item_id):
+        return item_id in self._entries
+
+    def find_overlap(self, key, start, end, exclude_id=None):
+        """retourne l'id d'un élément qui chevauche [start, end[, sinon None"""
+        intervals = self._intervals.get(key)
+        if not intervals:
+            return None
+        position = bisect_left(intervals, (start - self._max_length[key],))
+        while position < len(intervals):
+            existing_start, _, existing_end, item_id = intervals[position]
+            if existing_start >= end:
+                break
+            if existing_end > start and not (exclude_id and item_id == exclude_id):
+                return item_id
+            position += 1
+        return None
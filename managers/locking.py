@@ -0,0 +1,13 @@
+import functools
+
+def synchronized(method):
+    """exécute la méthode sous self._lock (RLock du manager)
+
+    Les écrans appellent les managers depuis le thread Tk et depuis le
+    TaskRunner : mutations et lectures d'index passent par ce verrou.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
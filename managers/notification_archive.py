@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+class NotificationArchive:
+    """Archive froide des notifications : un fichier gzip par mois de création.
+
+    data/archives/notifications-AAAA-MM.json.gz contient une liste JSON de
+    notifications (dicts). Un ajout relit la partition, fusionne par
+    notification_id puis la remplace atomiquement : réarchiver les mêmes
+    lignes après un crash ne crée pas de doublon.
+    """
+
+    PREFIX = 'notifications-'
+    SUFFIX = '.json.gz'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, month):
+        return os.path.join(self.directory, f"{self.PREFIX}{month}{self.SUFFIX}")
+
+    def months(self):
+        """mois archivés ('AAAA-MM'), du plus ancien au plus récent"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[len(self.PREFIX):-len(self.SUFFIX)] for name in os.listdir(self.directory)
+                      if name.startswith(self.PREFIX) and name.endswith(self.SUFFIX))
+
+    def _read(self, month):
+        path = self._path(month)
+        if not os.path.exists(path):
+            return []
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _write(self, month, rows):
+        """écrit une partition via un fichier temporaire puis os.replace"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{self.PREFIX}{month}.", suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                # fermer le GzipFile d'abord : il écrit le reste du flux et le trailer
+                with gzip.GzipFile(fileobj=raw, mode='wb') as file:
+                    file.write(json.dumps(rows, ensure_ascii=False).encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(temp_path, self._path(month))
+            self._fsync_directory()
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _fsync_directory(self):
+        """rend le renommage durable (non supporté sous Windows)"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def add(self, rows):
+        """archive des notifications (dicts) dans leurs partitions mensuelles"""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row['created_at'][:7], []).append(row)
+        with self._lock:
+            for month, new_rows in by_month.items():
+                merged = {row['notification_id']: row for row in self._read(month)}
+                merged.update((row['notification_id'], row) for row in new_rows)
+                self._write(month, sorted(merged.values(), key=lambda row: row['created_at']))
+        return sum(len(new_rows) for new_rows in by_month.values())
+
+    def query(self, user_id=None, start_date=None, end_date=None):
+        """notifications archivées (dicts), en ne lisant que les mois de l'intervalle
+
+        start_date / end_date : dates ou datetimes, bornes incluses.
+        """
+        start = start_date.isoformat()[:10] if start_date else None
+        end = end_date.isoformat()[:10] if end_date else None
+        results = []
+        with self._lock:
+            for month in self.months():
+                if (start and month < start[:7]) or (end and month > end[:7]):
+                    continue
+                for row in self._read(month):
+                    day = row['created_at'][:10]
+                    if user_id is not None and row['user_id'] != user_id:
+                        continue
+                    if (start and day < start) or (end and day > end):
+                        continue
+                    results.append(row)
+        return results
@@ -1,31 +1,115 @@
 import json
+import os
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import config
 from models.notification import Notification
 from managers.storage_manager import StorageManager
+from managers.id_allocator import IdAllocator
+from managers.notification_archive import NotificationArchive
+from managers import event_bus as events
+from managers.event_bus import EventBus
 
 class NotificationManager:
-    def __init__(self, storage):
+    def __init__(self, storage, retention=None, event_bus=None):
         self.storage = storage
+        self.event_bus = event_bus or EventBus()
         self.notifications_file = "notifications.json"
+        # durées de conservation (jours) avant archivage, cf. config.NOTIFICATION_RETENTION
+        self.retention = {**config.NOTIFICATION_RETENTION, **(retention or {})}
+        self.archive = NotificationArchive(os.path.join(storage.data_directory, self.retention['archive_dir']))
+        self._lock = threading.RLock()  # la passe de rétention tourne dans un autre thread
+        self._retention_thread = None
+        self._retention_stop = threading.Event()
         self.notifications = []
+        self._by_id = {}      # notification_id -> notif
+        self._by_user = {}    # user_id -> [notifs triées par created_at]
+        self._unread = {}     # user_id -> nb de notifs non lues
+        self._loaded_data = None  # dernière liste lue/écrite via le storage
+        self._batch_depth = 0     # > 0 dans un bloc batch() : la sauvegarde est différée
+        self._batch_dirty = False
         self.load_notifications()
+        self.id_allocator = IdAllocator.shared(storage)
+        self.id_allocator.seed('notification', lambda: IdAllocator.max_numeric_id(
+            notif.notification_id for notif in self.notifications))
     
     def load_notifications(self):
         """charge les notifs depuis le fichier"""
-        try:
-            data = self.storage.load_data(self.notifications_file)
-            self.notifications = [Notification.from_dict(notif) for notif in data]
-        except:
-            self.notifications = []
+        with self._lock:
+            try:
+                data = self.storage.load_data(self.notifications_file)
+                if data is self._loaded_data:
+                    # fichier inchangé : pas besoin de reconstruire les objets
+                    return
+                self._loaded_data = data
+                self.notifications = [Notification.from_dict(notif) for notif in data]
+            except:
+                self.notifications = []
+            self._build_indexes()
+    
+    def _build_indexes(self):
+        """reconstruit les index par id et par user, et les compteurs de non lues"""
+        self._by_id = {}
+        self._by_user = {}
+        self._unread = {}
+        for notif in sorted(self.notifications, key=lambda n: n.created_at):
+            self._index(notif)
+    
+    def _index(self, notif):
+        """ajoute une notif aux index (en gardant l'ordre chronologique du user)"""
+        self._by_id[notif.notification_id] = notif
+        user_notifs = self._by_user.setdefault(notif.user_id, [])
+        if user_notifs and user_notifs[-1].created_at > notif.created_at:
+            bisect.insort(user_notifs, notif, key=lambda n: n.created_at)
+        else:
+            user_notifs.append(notif)  # cas courant : la plus récente
+        if notif.status == "unread":
+            self._unread[notif.user_id] = self._unread.get(notif.user_id, 0) + 1
+    
+    def _unindex(self, notif):
+        """retire une notif des index"""
+        self._by_id.pop(notif.notification_id, None)
+        user_notifs = self._by_user.get(notif.user_id, [])
+        if notif in user_notifs:
+            user_notifs.remove(notif)
+        if notif.status == "unread":
+            self._unread[notif.user_id] -= 1
+    
+    def _set_status(self, notif, status):
+        """change le statut d'une notif en tenant le compteur de non lues à jour"""
+        if notif.status == "unread" and status != "unread":
+            self._unread[notif.user_id] -= 1
+        elif notif.status != "unread" and status == "unread":
+            self._unread[notif.user_id] = self._unread.get(notif.user_id, 0) + 1
+        notif.status = status
     
     def save_notifications(self):
-        """sauvegarde les notifs"""
+        """sauvegarde les notifs (une seule fois en fin de bloc batch())"""
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
         notifications_data = [notif.to_dict() for notif in self.notifications]
         self.storage.save_data(self.notifications_file, notifications_data)
+        self._loaded_data = notifications_data
     
-    def create_notification(self, user_id, title, message, notification_type="system"):
-        """crée une nouvelle notif"""
-        notification_id = f"NOTIF-{len(self.notifications) + 1}"
+    @contextmanager
+    def batch(self):
+        """applique les modifs du bloc en mémoire et ne sauvegarde qu'une fois à la fin"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._batch_dirty:
+                    self._batch_dirty = False
+                    self.save_notifications()
+    
+    def _add(self, notification_id, user_id, title, message, notification_type):
+        """ajoute une notif en mémoire (sans sauvegarder)"""
         notification = Notification(
             notification_id=notification_id,
             user_id=user_id,
@@ -34,49 +118,147 @@ class NotificationManager:
             notification_type=notification_type
         )
         self.notifications.append(notification)
-        self.save_notifications()
+        self._index(notification)
         return notification
     
+    def create_notification(self, user_id, title, message, notification_type="system"):
+        """crée une nouvelle notif"""
+        with self._lock:
+            notification = self._add(f"NOTIF-{self.id_allocator.next_id('notification')}",
+                                     user_id, title, message, notification_type)
+            self.save_notifications()
+        self.event_bus.publish(events.NOTIFICATIONS_CREATED, notifications=[notification])
+        return notification
+    
+    def create_many(self, items):
+        """crée plusieurs notifs en une sauvegarde ; items = [(user_id, titre, message, type), ...]"""
+        items = list(items)
+        ids = self.id_allocator.reserve_block('notification', len(items))
+        with self._lock:
+            created = [self._add(f"NOTIF-{number}", *item) for number, item in zip(ids, items)]
+            if not created:
+                return created
+            self.save_notifications()
+        self.event_bus.publish(events.NOTIFICATIONS_CREATED, notifications=created)
+        return created
+    
     def get_notifications_for_user(self, user_id, status=None):
-        """récupère les notifs d'un user"""
-        notifications = []
-        for notif in self.notifications:
-            if notif.user_id == user_id:
-                if status is None or notif.status == status:
-                    notifications.append(notif)
-        
-        return sorted(notifications, key=lambda x: x.created_at, reverse=True)
+        """récupère les notifs d'un user, les plus récentes d'abord"""
+        with self._lock:
+            notifications = reversed(self._by_user.get(user_id, []))
+            if status is None:
+                return list(notifications)
+            return [notif for notif in notifications if notif.status == status]
+    
+    def get_notification(self, notification_id):
+        """récupère une notif par son id (None si absente)"""
+        return self._by_id.get(notification_id)
+    
+    def _update_status(self, notification_id, status):
+        """change le statut d'une notif et sauvegarde"""
+        with self._lock:
+            notif = self._by_id.get(notification_id)
+            if notif is None:
+                return False
+            self._set_status(notif, status)
+            self.save_notifications()
+        self.event_bus.publish(events.NOTIFICATIONS_UPDATED, notifications=[notif])
+        return True
     
     def mark_notification_as_read(self, notification_id):
         """marque une notif comme lue"""
-        for notif in self.notifications:
-            if notif.notification_id == notification_id:
-                notif.mark_as_read()
-                self.save_notifications()
-                return True
-        return False
+        return self._update_status(notification_id, "read")
     
     def mark_notification_as_sent(self, notification_id):
         """marque une notif comme envoyée"""
-        for notif in self.notifications:
-            if notif.notification_id == notification_id:
-                notif.mark_as_sent()
-                self.save_notifications()
-                return True
-        return False
+        return self._update_status(notification_id, "sent")
     
     def delete_notification(self, notification_id):
         """supprime une notif"""
-        for i, notif in enumerate(self.notifications):
-            if notif.notification_id == notification_id:
-                del self.notifications[i]
-                self.save_notifications()
-                return True
-        return False
+        return self.delete_many([notification_id]) == 1
+    
+    def mark_all_read(self, user_id):
+        """marque toutes les notifs non lues d'un user comme lues ; retourne leur nombre"""
+        with self._lock:
+            unread = [notif for notif in self._by_user.get(user_id, []) if notif.status == "unread"]
+            if not unread:
+                return 0
+            for notif in unread:
+                self._set_status(notif, "read")
+            self.save_notifications()
+        self.event_bus.publish(events.NOTIFICATIONS_UPDATED, notifications=unread)
+        return len(unread)
+    
+    def delete_many(self, notification_ids):
+        """supprime plusieurs notifs en une sauvegarde ; retourne le nombre supprimé"""
+        with self._lock:
+            doomed = {notif.notification_id: notif for notif in map(self._by_id.get, notification_ids) if notif}
+            if not doomed:
+                return 0
+            for notif in doomed.values():
+                self._unindex(notif)
+            self.notifications[:] = [notif for notif in self.notifications if notif.notification_id not in doomed]
+            self.save_notifications()
+        self.event_bus.publish(events.NOTIFICATIONS_DELETED, notifications=list(doomed.values()))
+        return len(doomed)
     
     def get_unread_count(self, user_id):
-        """compte les notifs non lues d'un user"""
-        return len(self.get_notifications_for_user(user_id, status="unread"))
+        """compte les notifs non lues d'un user (compteur tenu à jour, O(1))"""
+        return self._unread.get(user_id, 0)
+    
+    # rétention : les notifs expirées partent dans l'archive gzip mensuelle
+    def _expired(self, now):
+        """notifs à archiver : lues/envoyées depuis plus de read_days, non lues depuis plus de unread_days"""
+        read_limit = now - timedelta(days=self.retention['read_days'])
+        unread_limit = now - timedelta(days=self.retention['unread_days'])
+        return [notif for notif in self.notifications
+                if notif.created_at < (unread_limit if notif.status == "unread" else read_limit)]
+    
+    def archive_expired(self, now=None):
+        """archive puis retire du fichier principal les notifs expirées ; retourne leur nombre
+        
+        L'archive est écrite avant la suppression : après un crash entre les
+        deux, la passe suivante réarchive les mêmes lignes sans doublon.
+        """
+        with self._lock:
+            expired = [notif.to_dict() for notif in self._expired(now or datetime.now())]
+        if not expired:
+            return 0
+        self.archive.add(expired)  # compression et écriture hors verrou
+        return self.delete_many(row['notification_id'] for row in expired)
+    
+    def get_archived_notifications(self, user_id, start_date=None, end_date=None):
+        """notifs archivées d'un user (bornes incluses), les plus récentes d'abord"""
+        rows = self.archive.query(user_id, start_date, end_date)
+        notifications = [Notification.from_dict(row) for row in rows]
+        return sorted(notifications, key=lambda n: n.created_at, reverse=True)
+    
+    def start_retention_service(self):
+        """lance la passe de rétention en arrière-plan, au démarrage puis toutes les interval_hours"""
+        if self._retention_thread and self._retention_thread.is_alive():
+            return
+        self._retention_stop.clear()
+        self._retention_thread = threading.Thread(target=self._retention_loop, daemon=True)
+        self._retention_thread.start()
+    
+    def stop_retention_service(self, timeout=5):
+        """arrête la passe de rétention"""
+        self._retention_stop.set()
+        if self._retention_thread:
+            self._retention_thread.join(timeout=timeout)
+            self._retention_thread = None
+    
+    def _retention_loop(self):
+        """archive les notifs expirées, puis attend interval_hours (ou l'arrêt)"""
+        interval = self.retention['interval_hours'] * 3600
+        while not self._retention_stop.is_set():
+            try:
+                count = self.archive_expired()
+                if count:
+                    logging.info(f"{count} notification(s) archivée(s)")
+            except Exception as e:
+                logging.error(f"Erreur lors de l'archivage des notifications: {e}")
+            self._retention_stop.wait(interval)
     
     # méthodes spécialisées
     def create_appointment_confirmation(self, user_id, appointment_id, doctor_name, date, time):
@@ -106,6 +288,11 @@ class NotificationManager:
         tomorrow = datetime.now() + timedelta(days=1)
         appointments = appointment_manager.get_appointments_by_date(tomorrow.date())
         
+        with self.batch():
+            self._send_appointment_reminders(appointments, user_manager)
+    
+    def _send_appointment_reminders(self, appointments, user_manager):
+        """crée les notifs de rappel (appelé dans un bloc batch())"""
         for appointment in appointments:
             patient_id = appointment.get('patient_id')
             doctor_id = appointment.get('doctor_id')
@@ -0,0 +1,218 @@
+import os
+import threading
+import logging
+from datetime import datetime, timedelta
+from managers.email_manager import EmailManager
+from managers.id_allocator import IdAllocator
+
+class OutboxManager:
+    """File d'envoi d'emails persistée (email_outbox.json).
+
+    Les producteurs appellent enqueue() et rendent la main tout de suite ;
+    un thread vide la file via EmailManager.send_many. Un échec est retenté
+    avec un délai exponentiel (base_delay * 2^(tentatives-1), plafonné à
+    max_delay) ; après max_attempts le message passe en lettre morte.
+    Les messages en attente sont repris au redémarrage.
+
+    Une seule file par dossier de données (shared()) : deux workers sur le
+    même email_outbox.json enverraient deux fois les mêmes messages.
+    """
+
+    OUTBOX_FILE = 'email_outbox.json'
+
+    _shared = {}  # dossier de données -> file
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage, email_manager, max_attempts=5, base_delay=30, max_delay=3600,
+                 batch_size=20, idle_poll=60):
+        self.storage = storage
+        self.email_manager = email_manager
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.idle_poll = idle_poll  # attente max quand rien n'est dû (ou email non configuré)
+        self.messages = self.storage.load_data(self.OUTBOX_FILE)
+        self.id_allocator = IdAllocator.shared(storage)
+        self.id_allocator.seed('email', lambda: IdAllocator.max_numeric_id(m['message_id'] for m in self.messages))
+        self._condition = threading.Condition()
+        self._worker = None
+        self._running = False
+
+    @classmethod
+    def shared(cls, storage, email_manager=None):
+        """retourne la file partagée par tous les managers d'un même dossier de données
+
+        email_manager n'est utilisé qu'à la création ; ensuite tous partagent
+        celui de la file (un seul pool SMTP).
+        """
+        key = os.path.abspath(storage.data_directory)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(storage, email_manager or EmailManager())
+            return cls._shared[key]
+
+    def _snapshot(self):
+        """copie de la file (appelé sous le verrou), sérialisée ensuite hors du verrou"""
+        return [dict(message) for message in self.messages]
+
+    def _save(self, snapshot):
+        """sauvegarde une copie prise par _snapshot()
+
+        À appeler sans _condition, dans storage.transaction() : le verrou du
+        storage (SQLite) est toujours pris avant _condition, comme pour un rdv
+        qui met un email en file pendant sa transaction. Dans l'ordre inverse,
+        le worker et le thread Tk s'attendent l'un l'autre.
+        """
+        self.storage.save_data(self.OUTBOX_FILE, snapshot)
+
+    def enqueue(self, to_email, subject, body, kind="email"):
+        """ajoute un email à la file et réveille le worker ; retourne son id
+
+        Dans une transaction du storage, le message n'est visible du worker
+        qu'après le commit : rien n'est envoyé pour un rdv annulé par un rollback.
+        """
+        message = {
+            'message_id': f"MAIL-{self.id_allocator.next_id('email')}",
+            'kind': kind,
+            'to': to_email,
+            'subject': subject,
+            'body': body,
+            'status': 'pending',
+            'attempts': 0,
+            'created_at': datetime.now().isoformat(),
+            'next_attempt_at': datetime.now().isoformat(),
+            'last_attempt_at': None
+        }
+        with self.storage.transaction():
+            with self._condition:
+                snapshot = self._snapshot()
+            self._save(snapshot + [message])
+            self.storage.after_commit(lambda: self._publish(message))
+        return message['message_id']
+
+    def _publish(self, message):
+        """met un message enregistré à disposition du worker et le réveille"""
+        with self._condition:
+            self.messages.append(message)
+            self._condition.notify()
+        self.start()
+
+    def start(self):
+        """démarre le worker (sans effet s'il tourne déjà)"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout=5):
+        """arrête le worker ; les messages non envoyés restent dans la file"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+
+    def wake(self):
+        """réveille le worker (ex. après configuration de l'email)"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def _due_messages(self, now_iso):
+        """messages à envoyer maintenant (appelé sous le verrou)"""
+        due = [m for m in self.messages if m['status'] == 'pending' and m['next_attempt_at'] <= now_iso]
+        return due[:self.batch_size]
+
+    def _seconds_until_next(self, now):
+        """délai avant le prochain message dû, borné par idle_poll (appelé sous le verrou)"""
+        pending = [m['next_attempt_at'] for m in self.messages if m['status'] == 'pending']
+        if not pending:
+            return self.idle_poll
+        delay = (datetime.fromisoformat(min(pending)) - now).total_seconds()
+        return max(0, min(delay, self.idle_poll))
+
+    def _worker_loop(self):
+        """envoie les messages dus, puis dort jusqu'au prochain ou jusqu'à enqueue()"""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                now = datetime.now()
+                batch = self._due_messages(now.isoformat()) if self.email_manager.is_configured else []
+                if not batch:
+                    self._condition.wait(self._seconds_until_next(now) if self.email_manager.is_configured
+                                         else self.idle_poll)
+                    continue
+            try:
+                results = self.email_manager.send_many([(m['to'], m['subject'], m['body']) for m in batch])
+            except Exception as e:
+                logging.error(f"Erreur du worker d'envoi d'emails: {e}")
+                results = [False] * len(batch)
+            self._record_results(batch, results)
+
+    def _record_results(self, batch, results):
+        """retire les messages envoyés, reprogramme ou met en lettre morte les autres"""
+        now = datetime.now()
+        with self.storage.transaction():
+            with self._condition:
+                sent = set()
+                for message, success in zip(batch, results):
+                    if success:
+                        sent.add(message['message_id'])
+                        continue
+                    message['attempts'] += 1
+                    message['last_attempt_at'] = now.isoformat()
+                    if message['attempts'] >= self.max_attempts:
+                        message['status'] = 'dead'
+                        logging.error(f"Email {message['message_id']} à {message['to']} abandonné "
+                                      f"après {message['attempts']} tentatives")
+                    else:
+                        delay = min(self.base_delay * 2 ** (message['attempts'] - 1), self.max_delay)
+                        message['next_attempt_at'] = (now + timedelta(seconds=delay)).isoformat()
+                if sent:
+                    self.messages[:] = [m for m in self.messages if m['message_id'] not in sent]
+                snapshot = self._snapshot()
+            self._save(snapshot)
+
+    def get_pending(self):
+        """messages en attente d'envoi"""
+        with self._condition:
+            return [m for m in self.messages if m['status'] == 'pending']
+
+    def get_dead_letters(self):
+        """messages abandonnés après max_attempts échecs"""
+        with self._condition:
+            return [m for m in self.messages if m['status'] == 'dead']
+
+    def retry_dead_letter(self, message_id):
+        """remet une lettre morte dans la file"""
+        with self.storage.transaction():
+            with self._condition:
+                for message in self.messages:
+                    if message['message_id'] == message_id and message['status'] == 'dead':
+                        message['status'] = 'pending'
+                        message['attempts'] = 0
+                        message['next_attempt_at'] = datetime.now().isoformat()
+                        snapshot = self._snapshot()
+                        break
+                else:
+                    return False
+            self._save(snapshot)
+        self.wake()
+        self.start()
+        return True
+
+    def purge_dead_letters(self):
+        """supprime les lettres mortes ; retourne leur nombre"""
+        with self.storage.transaction():
+            with self._condition:
+                count = len([m for m in self.messages if m['status'] == 'dead'])
+                if not count:
+                    return 0
+                self.messages[:] = [m for m in self.messages if m['status'] != 'dead']
+                snapshot = self._snapshot()
+            self._save(snapshot)
+        return count
@@ -2,16 +2,25 @@ import json
 import logging
 from datetime import datetime
 from models.prescription import Prescription
+from managers import event_bus as events
+from managers.event_bus import EventBus
+import threading
+from managers.locking import synchronized
 
 class PrescriptionManager:
-    def __init__(self, storage_manager):
+    def __init__(self, storage_manager, event_bus=None):
+        # appelé depuis le thread Tk et le TaskRunner
+        self._lock = threading.RLock()
         self.storage_manager = storage_manager
+        self.event_bus = event_bus or EventBus()
+        self._loaded_data = None  # dernière liste lue/écrite via le storage
         self.prescriptions = self._load_prescriptions()
     
     def _load_prescriptions(self):
         """Charge les ordonnances depuis le fichier JSON."""
         try:
             data = self.storage_manager.load_data('prescriptions.json')
+            self._loaded_data = data
             prescriptions = []
             for prescription_data in data:
                 prescription = Prescription.from_dict(prescription_data)
@@ -25,17 +34,28 @@ class PrescriptionManager:
             logging.error(f"Error loading prescriptions: {e}")
             return []
     
+    @synchronized
+    def reload_prescriptions(self):
+        """Recharge les ordonnances depuis le fichier JSON."""
+        data = self.storage_manager.load_data('prescriptions.json')
+        if data is self._loaded_data:
+            # fichier inchangé : pas besoin de reconstruire les objets
+            return
+        self.prescriptions = self._load_prescriptions()
+    
     def _save_prescriptions(self):
         """Sauvegarde les ordonnances dans le fichier JSON."""
         try:
             data = [prescription.to_dict() for prescription in self.prescriptions]
             self.storage_manager.save_data('prescriptions.json', data)
+            self._loaded_data = data
             logging.info("Successfully saved prescriptions.json")
             return True
         except Exception as e:
             logging.error(f"Error saving prescriptions: {e}")
             return False
     
+    @synchronized
     def create_prescription(self, patient_id, doctor_id, medications, instructions=""):
         """Crée une nouvelle ordonnance."""
         try:
@@ -43,6 +63,7 @@ class PrescriptionManager:
             self.prescriptions.append(prescription)
             
             if self._save_prescriptions():
+                self.event_bus.publish(events.PRESCRIPTION_CREATED, prescription=prescription)
                 return True, f"Ordonnance {prescription.prescription_id} créée avec succès"
             else:
                 return False, "Erreur lors de la sauvegarde de l'ordonnance"
@@ -50,14 +71,17 @@ class PrescriptionManager:
             logging.error(f"Error creating prescription: {e}")
             return False, f"Erreur lors de la création: {str(e)}"
     
+    @synchronized
     def get_prescriptions_for_patient(self, patient_id):
         """Récupère toutes les ordonnances d'un patient."""
         return [p for p in self.prescriptions if p.patient_id == patient_id]
     
+    @synchronized
     def get_prescriptions_for_doctor(self, doctor_id):
         """Récupère toutes les ordonnances d'un médecin."""
         return [p for p in self.prescriptions if p.doctor_id == doctor_id]
     
+    @synchronized
     def get_prescription_by_id(self, prescription_id):
         """Récupère une ordonnance par son ID."""
         for prescription in self.prescriptions:
@@ -65,17 +89,20 @@ class PrescriptionManager:
                 return prescription
         return None
     
+    @synchronized
     def delete_prescription(self, prescription_id):
         """Supprime une ordonnance."""
         prescription = self.get_prescription_by_id(prescription_id)
         if prescription:
             self.prescriptions.remove(prescription)
             if self._save_prescriptions():
+                self.event_bus.publish(events.PRESCRIPTION_DELETED, prescription=prescription)
                 return True, f"Ordonnance {prescription_id} supprimée avec succès"
             else:
                 return False, "Erreur lors de la suppression"
         return False, "Ordonnance non trouvée"
     
+    @synchronized
     def update_prescription(self, prescription_id, medications=None, instructions=None):
         """Met à jour une ordonnance existante."""
         prescription = self.get_prescription_by_id(prescription_id)
@@ -86,11 +113,13 @@ class PrescriptionManager:
                 prescription.instructions = instructions
             
             if self._save_prescriptions():
+                self.event_bus.publish(events.PRESCRIPTION_UPDATED, prescription=prescription)
                 return True, f"Ordonnance {prescription_id} mise à jour avec succès"
             else:
                 return False, "Erreur lors de la mise à jour"
         return False, "Ordonnance non trouvée"
     
+    @synchronized
     def get_all_prescriptions(self):
         """Récupère toutes les ordonnances."""
         return self.prescriptions 
\ No newline at end of file
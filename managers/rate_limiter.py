@@ -0,0 +1,41 @@
+import threading
+import time
+
+class TokenBucket:
+    """Limiteur de débit à seau de jetons, partagé entre threads.
+
+    Le seau se remplit de rate jetons par seconde, jusqu'à capacity ;
+    acquire() prend un jeton ou attend qu'il y en ait un.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate doit être positif")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """ajoute les jetons accumulés depuis la dernière mise à jour (appelé sous le verrou)"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """prend des jetons ; retourne False si timeout expire avant"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,85 @@
+import os
+import threading
+from datetime import datetime
+
+class ReminderLedger:
+    """Registre persistant des rappels envoyés (reminder_ledger.json).
+
+    Une entrée par (rdv, type, délai) : après un redémarrage, ou depuis un
+    autre AppointmentManager, un rappel déjà parti n'est pas renvoyé. Les
+    entrées dont le rdv est passé sont purgées.
+    """
+
+    LEDGER_FILE = 'reminder_ledger.json'
+
+    _shared = {}  # dossier de données -> registre
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self.entries = []
+        self._keys = set()
+        self._refresh()
+        self.prune()
+
+    @classmethod
+    def shared(cls, storage):
+        """retourne le registre partagé par toutes les instances d'un même dossier de données"""
+        key = os.path.abspath(storage.data_directory)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(storage)
+            return cls._shared[key]
+
+    @staticmethod
+    def _key(appointment_id, lead, kind):
+        return f"{appointment_id}|{kind}|{lead}"
+
+    def _refresh(self):
+        """relit le fichier s'il a changé (un stat() grâce au cache du storage)"""
+        entries = self.storage.load_data(self.LEDGER_FILE)
+        if entries is not self.entries:
+            self.entries = entries
+            self._keys = {entry['key'] for entry in entries}
+
+    def was_sent(self, appointment_id, lead, kind="reminder"):
+        """vrai si ce rappel est déjà parti"""
+        with self._lock:
+            self._refresh()
+            return self._key(appointment_id, lead, kind) in self._keys
+
+    def mark_sent(self, items, kind="reminder"):
+        """enregistre des envois : items = [(appointment_id, délai, début du rdv ISO)]"""
+        with self._lock:
+            self._refresh()
+            added = False
+            for appointment_id, lead, appointment_start in items:
+                key = self._key(appointment_id, lead, kind)
+                if key in self._keys:
+                    continue
+                self.entries.append({
+                    'key': key,
+                    'appointment_id': appointment_id,
+                    'kind': kind,
+                    'lead': lead,
+                    'appointment_start': appointment_start,
+                    'sent_at': datetime.now().isoformat()
+                })
+                self._keys.add(key)
+                added = True
+            if added:
+                self.storage.save_data(self.LEDGER_FILE, self.entries)
+
+    def prune(self, now=None):
+        """supprime les entrées dont le rdv est passé ; retourne leur nombre"""
+        now_iso = (now or datetime.now()).isoformat()
+        with self._lock:
+            self._refresh()
+            kept = [entry for entry in self.entries if entry['appointment_start'] >= now_iso]
+            removed = len(self.entries) - len(kept)
+            if removed:
+                self.entries[:] = kept
+                self._keys = {entry['key'] for entry in kept}
+                self.storage.save_data(self.LEDGER_FILE, self.entries)
+            return removed
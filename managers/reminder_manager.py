@@ -1,22 +1,41 @@
-import threading
 import time
+import config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import logging
 from typing import List, Dict, TYPE_CHECKING
-from managers.email_manager import EmailManager
+from managers.outbox_manager import OutboxManager
+from managers.rate_limiter import TokenBucket
+from managers.reminder_ledger import ReminderLedger
+from managers.reminder_scheduler import ReminderScheduler
 from managers.user_manager import UserManager
 
 if TYPE_CHECKING:
     from managers.appointment_manager import AppointmentManager
 
 class ReminderManager:
-    def __init__(self, appointment_manager: 'AppointmentManager', user_manager: UserManager):
+    # délai sous lequel sont enregistrés les rappels « demain » envoyés à la main
+    MANUAL_LEAD = 'J-1'
+
+    def __init__(self, appointment_manager: 'AppointmentManager', user_manager: UserManager,
+                 max_workers: int = 4, rate_per_second: float = 5.0, burst: int = 10,
+                 lead_times: Dict[str, timedelta] = None):
         self.appointment_manager = appointment_manager
         self.user_manager = user_manager
-        self.email_manager = EmailManager()
-        self.reminder_thread = None
+        # emails transactionnels envoyés en arrière-plan, avec reprise ; une
+        # seule file (et un seul worker) par dossier de données
+        self.outbox = OutboxManager.shared(appointment_manager.storage_manager)
+        self.email_manager = self.outbox.email_manager
         self.is_running = False
-        self.sent_reminders = set()  # Pour éviter les doublons
+        # rappels déjà envoyés, persistés et partagés : pas de doublon après un redémarrage
+        self.ledger = ReminderLedger.shared(appointment_manager.storage_manager)
+        # délais de rappel avant le rdv, cf. config.REMINDER_LEAD_TIMES
+        self.lead_times = dict(lead_times or config.REMINDER_LEAD_TIMES)
+        # une échéance par (rdv, délai) ; le thread dort jusqu'à la prochaine
+        self.scheduler = ReminderScheduler(self._on_reminders_due)
+        # envoi des rappels en parallèle, au débit autorisé par le fournisseur
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(rate_per_second, burst)
         
     def start_reminder_service(self):
         """Démarre le service de rappels automatiques"""
@@ -29,79 +48,155 @@ class ReminderManager:
             return
             
         self.is_running = True
-        self.reminder_thread = threading.Thread(target=self._reminder_loop, daemon=True)
-        self.reminder_thread.start()
-        logging.info("Service de rappels démarré")
+        self.ledger.prune()
+        # une seule passe sur les rdv confirmés, ensuite tout est incrémental
+        self.scheduler.clear()
+        for appointment in self.appointment_manager.get_appointments_by_status('planned'):
+            self._schedule(appointment)
+        self.scheduler.start()
+        logging.info(f"Service de rappels démarré ({len(self.scheduler)} rappels programmés)")
         
     def stop_reminder_service(self):
-        """Arrête le service de rappels"""
+        """Arrête le service de rappels (immédiatement)"""
         self.is_running = False
-        if self.reminder_thread:
-            self.reminder_thread.join(timeout=5)
+        self.scheduler.stop()
         logging.info("Service de rappels arrêté")
         
-    def _reminder_loop(self):
-        """Boucle principale du service de rappels"""
-        while self.is_running:
-            try:
-                self._check_and_send_reminders()
-                # Attendre 1 heure avant la prochaine vérification
-                time.sleep(3600)  # 3600 secondes = 1 heure
-            except Exception as e:
-                logging.error(f"Erreur dans la boucle de rappels: {e}")
-                time.sleep(300)  # Attendre 5 minutes en cas d'erreur
-                
-    def _check_and_send_reminders(self):
-        """Vérifie et envoie les rappels pour les rendez-vous de demain"""
-        tomorrow = datetime.now() + timedelta(days=1)
-        tomorrow_date = tomorrow.date()
+    def schedule_appointment(self, appointment: Dict):
+        """(Re)programme les rappels d'un rdv après prise, validation ou changement de statut"""
+        if not self.is_running:
+            return
+        self.scheduler.cancel_group(appointment['appointment_id'])
+        if appointment.get('status') == 'planned':
+            self._schedule(appointment)
+            
+    def unschedule_appointment(self, appointment_id):
+        """Annule les rappels d'un rdv annulé ou supprimé"""
+        self.scheduler.cancel_group(appointment_id)
         
-        # Obtenir tous les rendez-vous
-        appointments = self.appointment_manager.get_all_appointments()
+    def _schedule(self, appointment: Dict):
+        """Programme une échéance par délai de rappel encore à venir
         
-        for appointment in appointments:
-            if appointment['status'] != 'planned':
+        Si des délais sont déjà dépassés (service démarré tard), seul le plus
+        proche du rdv est envoyé tout de suite.
+        """
+        now = datetime.now()
+        start = datetime.fromisoformat(appointment['start_time'])
+        if start <= now:
+            return
+        appointment_id = appointment['appointment_id']
+        catch_up = None
+        for name, lead in sorted(self.lead_times.items(), key=lambda item: item[1], reverse=True):
+            due = start - lead
+            if due <= now:
+                catch_up = name
                 continue
-                
-            appointment_datetime = datetime.fromisoformat(appointment['start_time'])
-            appointment_date = appointment_datetime.date()
+            if not self.ledger.was_sent(appointment_id, name):
+                self.scheduler.schedule((appointment_id, name), due, appointment_id)
+        if catch_up and not self.ledger.was_sent(appointment_id, catch_up):
+            self.scheduler.schedule((appointment_id, catch_up), now, appointment_id)
             
-            # Vérifier si c'est pour demain
-            if appointment_date == tomorrow_date:
-                self._send_reminder_for_appointment(appointment)
+    def _on_reminders_due(self, due):
+        """Envoie les rappels arrivés à échéance (thread de l'ordonnanceur)"""
+        now = datetime.now()
+        leads_by_appointment = {}
+        appointments = []
+        for (appointment_id, name), _ in due:
+            appointment = self.appointment_manager.get_appointment(appointment_id)
+            # le rdv a pu être annulé ou passé entre-temps
+            if (not appointment or appointment['status'] != 'planned'
+                    or datetime.fromisoformat(appointment['start_time']) <= now):
+                continue
+            # déjà envoyé par une autre instance depuis la programmation
+            if self.ledger.was_sent(appointment_id, name):
+                continue
+            if appointment_id not in leads_by_appointment:
+                appointments.append(appointment)
+            leads_by_appointment.setdefault(appointment_id, []).append(name)
+            
+        report = self.dispatch_reminders(appointments)
+        starts = {appointment['appointment_id']: appointment['start_time'] for appointment in appointments}
+        sent = []
+        for result in report['results']:
+            if result['success']:
+                for name in leads_by_appointment[result['appointment_id']]:
+                    sent.append((result['appointment_id'], name, starts[result['appointment_id']]))
+            else:
+                # nouvel essai plus tard (si le rdv n'est pas trop proche)
+                retry_at = now + timedelta(minutes=5)
+                appointment = self.appointment_manager.get_appointment(result['appointment_id'])
+                if appointment and datetime.fromisoformat(appointment['start_time']) > retry_at:
+                    for name in leads_by_appointment[result['appointment_id']]:
+                        self.scheduler.schedule((result['appointment_id'], name), retry_at, result['appointment_id'])
+        self.ledger.mark_sent(sent)
+        self.ledger.prune(now)
                 
-    def _send_reminder_for_appointment(self, appointment: Dict):
-        """Envoie un rappel pour un rendez-vous spécifique"""
-        appointment_id = appointment['appointment_id']
-        patient_id = appointment['patient_id']
-        reminder_key = f"{appointment_id}_{patient_id}"
+    def dispatch_reminders(self, appointments: List[Dict], progress=None, cancelled=None) -> Dict:
+        """Envoie les rappels en parallèle (max_workers threads, débit limité)
         
-        # Éviter les doublons
-        if reminder_key in self.sent_reminders:
-            return
-            
-        # Obtenir les informations du patient
-        patient = self.user_manager.find_user_by_id(patient_id)
-        if not patient or not patient.get('email'):
-            logging.warning(f"Patient {patient_id} non trouvé ou sans email")
-            return
-            
-        # Obtenir les informations du médecin
-        doctor = self.user_manager.find_user_by_id(appointment['doctor_id'])
-        if not doctor:
-            logging.warning(f"Médecin {appointment['doctor_id']} non trouvé")
-            return
+        progress(faits, total) est appelé après chaque envoi ; si cancelled()
+        devient vrai, les envois pas encore commencés sont abandonnés.
+        Retourne les compteurs envoyés/échoués/ignorés et la latence de chaque envoi.
+        """
+        started = time.perf_counter()
+        results = []
+        skipped = 0
+        interrupted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reminder") as executor:
+            futures = []
+            for appointment in appointments:
+                message = self._reminder_message(appointment)
+                if message is None:
+                    skipped += 1
+                    continue
+                futures.append(executor.submit(self._send_reminder, appointment, message))
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                results.append(future.result())
+                if progress is not None:
+                    progress(len(results), len(futures))
+                if not interrupted and cancelled is not None and cancelled():
+                    interrupted = True
+                    for pending in futures:
+                        pending.cancel()
             
-        # Envoyer l'email de rappel
-        patient_name = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip()
-        doctor_name = f"{doctor.get('first_name', '')} {doctor.get('last_name', '')}".strip()
+        latencies = [result['latency'] for result in results]
+        sent = sum(1 for result in results if result['success'])
+        return {
+            "sent": sent,
+            "failed": len(results) - sent,
+            "skipped": skipped,
+            "cancelled": len(futures) - len(results),
+            "results": results,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max_latency": max(latencies, default=0.0),
+            "duration": time.perf_counter() - started
+        }
         
-        if self.email_manager.send_reminder_email(patient['email'], appointment, patient_name, doctor_name):
-            self.sent_reminders.add(reminder_key)
-            logging.info(f"Rappel envoyé pour le rendez-vous {appointment_id} à {patient['email']}")
+    def _send_reminder(self, appointment: Dict, message) -> Dict:
+        """Envoie un rappel (exécuté dans le pool) et mesure sa latence"""
+        self.rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            success = self.email_manager.send_many([message])[0]
+        except Exception as e:
+            logging.error(f"Erreur lors de l'envoi du rappel {appointment['appointment_id']}: {e}")
+            success = False
+        if success:
+            logging.info(f"Rappel envoyé pour le rendez-vous {appointment['appointment_id']} à {message[0]}")
+        return {
+            "appointment_id": appointment['appointment_id'],
+            "patient_id": appointment['patient_id'],
+            "success": success,
+            "latency": time.perf_counter() - started
+        }
             
-    def send_manual_reminders_for_tomorrow(self) -> Dict:
-        """Envoie manuellement les rappels pour les rendez-vous de demain"""
+    def send_manual_reminders_for_tomorrow(self, progress=None, cancelled=None) -> Dict:
+        """Envoie manuellement les rappels pour les rendez-vous de demain
+
+        progress / cancelled : voir dispatch_reminders (envoi depuis un TaskRunner).
+        """
         try:
             if not self.email_manager.is_configured:
                 return {
@@ -113,32 +208,51 @@ class ReminderManager:
             tomorrow = datetime.now() + timedelta(days=1)
             tomorrow_date = tomorrow.date()
             
-            # Obtenir tous les rendez-vous
-            appointments = self.appointment_manager.get_all_appointments()
-            reminders_sent = 0
+            # Obtenir les rendez-vous confirmés de demain
+            appointments = self.appointment_manager.get_appointments_by_date(tomorrow_date, status='planned')
+            # Ignorer les rendez-vous déjà rappelés (automatiquement ou par un clic précédent)
+            appointments = [a for a in appointments
+                            if not self.ledger.was_sent(a['appointment_id'], self.MANUAL_LEAD)]
+            
+            report = self.dispatch_reminders(appointments, progress, cancelled)
+            starts = {a['appointment_id']: a['start_time'] for a in appointments}
+            self.ledger.mark_sent([(r['appointment_id'], self.MANUAL_LEAD, starts[r['appointment_id']])
+                                   for r in report['results'] if r['success']])
+            reminders_sent = report['sent']
             
-            for appointment in appointments:
-                if appointment['status'] != 'planned':
-                    continue
-                    
-                appointment_datetime = datetime.fromisoformat(appointment['start_time'])
-                appointment_date = appointment_datetime.date()
-                
-                # Vérifier si c'est pour demain
-                if appointment_date == tomorrow_date:
-                    if self._send_manual_reminder(appointment):
-                        reminders_sent += 1
-                        
             if reminders_sent > 0:
+                message = f"Rappels envoyés pour {reminders_sent} rendez-vous de demain"
+                if report['failed']:
+                    message += f" ({report['failed']} échecs)"
+                if report['cancelled']:
+                    # les rappels non envoyés ne sont pas marqués : un nouveau clic les enverra
+                    message += f" ({report['cancelled']} annulés)"
+                return {
+                    "success": True,
+                    "message": message,
+                    "count": reminders_sent,
+                    "failed": report['failed'],
+                    "cancelled": report['cancelled'],
+                    "avg_latency": report['avg_latency']
+                }
+            elif report['failed']:
+                return {
+                    "success": False,
+                    "message": f"Échec de l'envoi des {report['failed']} rappels",
+                    "count": 0,
+                    "failed": report['failed']
+                }
+            elif report['cancelled']:
                 return {
                     "success": True,
-                    "message": f"Rappels envoyés pour {reminders_sent} rendez-vous de demain",
-                    "count": reminders_sent
+                    "message": f"Envoi annulé ({report['cancelled']} rappels non envoyés)",
+                    "count": 0,
+                    "cancelled": report['cancelled']
                 }
             else:
                 return {
                     "success": True,
-                    "message": "Aucun rendez-vous confirmé pour demain",
+                    "message": "Aucun rappel à envoyer pour demain",
                     "count": 0
                 }
                 
@@ -150,83 +264,77 @@ class ReminderManager:
                 "count": 0
             }
             
-    def _send_manual_reminder(self, appointment: Dict) -> bool:
-        """Envoie un rappel manuel pour un rendez-vous"""
+    @staticmethod
+    def _when_label(start: datetime) -> str:
+        """« demain », « dans 7 jours »... selon la date du rdv"""
+        days = (start.date() - datetime.now().date()).days
+        if days <= 0:
+            return "aujourd'hui"
+        if days == 1:
+            return "demain"
+        return f"dans {days} jours"
+        
+    def _reminder_message(self, appointment: Dict):
+        """Prépare (email, sujet, corps) du rappel d'un rendez-vous, None si impossible"""
         try:
             patient_id = appointment['patient_id']
             
             # Obtenir les informations du patient
-            patient = self.user_manager.find_user_by_id(patient_id)
+            patient = self.user_manager.find_user_by_patient_id(patient_id)
             if not patient or not patient.get('email'):
                 logging.warning(f"Patient {patient_id} non trouvé ou sans email")
-                return False
+                return None
                 
             # Obtenir les informations du médecin
-            doctor = self.user_manager.find_user_by_id(appointment['doctor_id'])
+            doctor = self.user_manager.find_user_by_doctor_id(appointment['doctor_id'])
             if not doctor:
                 logging.warning(f"Médecin {appointment['doctor_id']} non trouvé")
-                return False
+                return None
                 
-            # Envoyer l'email de rappel
             patient_name = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip()
             doctor_name = f"{doctor.get('first_name', '')} {doctor.get('last_name', '')}".strip()
             
-            return self.email_manager.send_reminder_email(patient['email'], appointment, patient_name, doctor_name)
+            when = self._when_label(datetime.fromisoformat(appointment['start_time']))
+            subject, body = self.email_manager.build_reminder_email(appointment, patient_name, doctor_name, when)
+            return patient['email'], subject, body
             
         except Exception as e:
-            logging.error(f"Erreur lors de l'envoi du rappel manuel: {e}")
-            return False
-        
-    def send_confirmation_email(self, appointment: Dict):
-        """Envoie un email de confirmation de rendez-vous"""
+            logging.error(f"Erreur lors de la préparation du rappel: {e}")
+            return None
+            
+    def _queue_email(self, appointment: Dict, build, kind: str):
+        """Construit un email pour le patient du rdv et le met dans la file d'envoi"""
         try:
             patient_id = appointment['patient_id']
             
             # Obtenir les informations du patient
-            patient = self.user_manager.find_user_by_id(patient_id)
+            patient = self.user_manager.find_user_by_patient_id(patient_id)
             if not patient or not patient.get('email'):
                 logging.warning(f"Patient {patient_id} non trouvé ou sans email")
                 return False
                 
             # Obtenir les informations du médecin
-            doctor = self.user_manager.find_user_by_id(appointment['doctor_id'])
+            doctor = self.user_manager.find_user_by_doctor_id(appointment['doctor_id'])
             if not doctor:
                 logging.warning(f"Médecin {appointment['doctor_id']} non trouvé")
                 return False
                 
-            # Envoyer l'email de confirmation
             patient_name = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip()
             doctor_name = f"{doctor.get('first_name', '')} {doctor.get('last_name', '')}".strip()
             
-            return self.email_manager.send_appointment_confirmation(patient['email'], appointment, patient_name, doctor_name)
+            # L'envoi réel est fait par le worker de l'outbox
+            subject, body = build(appointment, patient_name, doctor_name)
+            self.outbox.enqueue(patient['email'], subject, body, kind=kind)
+            return True
             
         except Exception as e:
-            logging.error(f"Erreur lors de l'envoi de l'email de confirmation: {e}")
+            logging.error(f"Erreur lors de la mise en file de l'email ({kind}): {e}")
             return False
+        
+    def send_confirmation_email(self, appointment: Dict):
+        """Met en file l'email de confirmation de rendez-vous"""
+        return self._queue_email(appointment, self.email_manager.build_appointment_confirmation, 'confirmation')
             
     def send_cancellation_email(self, appointment: Dict):
-        """Envoie un email d'annulation de rendez-vous"""
-        try:
-            patient_id = appointment['patient_id']
-            
-            # Obtenir les informations du patient
-            patient = self.user_manager.find_user_by_id(patient_id)
-            if not patient or not patient.get('email'):
-                logging.warning(f"Patient {patient_id} non trouvé ou sans email")
-                return False
-                
-            # Obtenir les informations du médecin
-            doctor = self.user_manager.find_user_by_id(appointment['doctor_id'])
-            if not doctor:
-                logging.warning(f"Médecin {appointment['doctor_id']} non trouvé")
-                return False
-                
-            # Envoyer l'email d'annulation
-            patient_name = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip()
-            doctor_name = f"{doctor.get('first_name', '')} {doctor.get('last_name', '')}".strip()
-            
-            return self.email_manager.send_appointment_cancellation(patient['email'], appointment, patient_name, doctor_name)
-            
-        except Exception as e:
-            logging.error(f"Erreur lors de l'envoi de l'email d'annulation: {e}")
-            return False 
\ No newline at end of file
+        """Met en file l'email d'annulation de rendez-vous"""
+        return self._queue_email(appointment, self.email_manager.build_appointment_cancellation, 'cancellation')
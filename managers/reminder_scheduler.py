@@ -0,0 +1,132 @@
+import heapq
+import threading
+import logging
+from datetime import datetime
+from itertools import count
+
+class ReminderScheduler:
+    """Ordonnanceur à échéances : un tas (échéance, seq, clé) et un thread.
+
+    Le thread dort sur une condition exactement jusqu'à la prochaine
+    échéance ; schedule() et cancel() le réveillent. Les clés sont des
+    tuples (groupe, nom) pour pouvoir annuler toutes les échéances d'un
+    groupe (ex. tous les rappels d'un rdv). Les entrées annulées restent
+    dans le tas et sont ignorées quand elles sortent.
+    """
+
+    MAX_SLEEP = 3600  # réévalue au moins toutes les heures (changement d'heure système)
+
+    def __init__(self, callback):
+        self._callback = callback  # appelé hors verrou avec [(clé, payload), ...]
+        self._heap = []            # [échéance, seq, clé, payload, active]
+        self._entries = {}         # clé -> entrée active
+        self._groups = {}          # groupe -> {clés}
+        self._seq = count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def schedule(self, key, due, payload=None):
+        """programme (ou reprogramme) une échéance"""
+        with self._condition:
+            self._cancel(key)
+            entry = [due, next(self._seq), key, payload, True]
+            heapq.heappush(self._heap, entry)
+            self._entries[key] = entry
+            self._groups.setdefault(key[0], set()).add(key)
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+    def cancel(self, key):
+        """annule une échéance"""
+        with self._condition:
+            self._cancel(key)
+
+    def cancel_group(self, group):
+        """annule toutes les échéances d'un groupe"""
+        with self._condition:
+            for key in list(self._groups.get(group, ())):
+                self._cancel(key)
+
+    def _cancel(self, key):
+        """désactive une entrée (appelé sous le verrou)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[4] = False
+            keys = self._groups.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[key[0]]
+
+    def clear(self):
+        """retire toutes les échéances"""
+        with self._condition:
+            self._heap.clear()
+            self._entries.clear()
+            self._groups.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def next_due(self):
+        """prochaine échéance active, ou None"""
+        with self._condition:
+            self._drop_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_cancelled(self):
+        """retire les entrées annulées du sommet du tas (appelé sous le verrou)"""
+        while self._heap and not self._heap[0][4]:
+            heapq.heappop(self._heap)
+
+    def start(self):
+        """démarre le thread (sans effet s'il tourne déjà)"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """arrête le thread immédiatement (il ne fait que dormir sur la condition)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def _run(self):
+        """boucle : attend la prochaine échéance, puis passe les entrées dues au callback"""
+        while True:
+            with self._condition:
+                while True:
+                    if not self._running:
+                        return
+                    self._drop_cancelled()
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = (self._heap[0][0] - datetime.now()).total_seconds()
+                    if delay > 0:
+                        self._condition.wait(min(delay, self.MAX_SLEEP))
+                        continue
+                    break
+                now = datetime.now()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if entry[4]:
+                        self._cancel(entry[2])
+                        due.append((entry[2], entry[3]))
+            if due:
+                try:
+                    self._callback(due)
+                except Exception as e:
+                    logging.error(f"Erreur lors du traitement des échéances: {e}")
@@ -1,23 +1,270 @@
 from managers.storage_manager import StorageManager
-from datetime import datetime
+from managers.id_allocator import IdAllocator
+from managers import event_bus as events
+from managers.event_bus import EventBus
+from datetime import datetime, date, time, timedelta
+from bisect import bisect_left, bisect_right
+import threading
+from managers.locking import synchronized
 
 class ScheduleManager:
-    def __init__(self, storage):
+    # fenêtre des créneaux récurrents quand aucune date n'est demandée
+    RECURRING_HORIZON_DAYS = 28
+    # au-delà, get_available_dates arrête de chercher
+    MAX_SEARCH_DAYS = 365
+
+    def __init__(self, storage, event_bus=None):
+        # appelé depuis le thread Tk et le TaskRunner : index protégés par ce verrou
+        self._lock = threading.RLock()
         self.storage = storage
+        self.event_bus = event_bus or EventBus()
         self.timeslots_file = 'timeslots.json'
+        self.rules_file = 'availability_rules.json'
+        self.exceptions_file = 'availability_exceptions.json'
         self.timeslots = self._load()
+        self._build_index()
+        self.rules = self.storage.load_data(self.rules_file)
+        self.exceptions = self.storage.load_data(self.exceptions_file)
+        self._build_rule_index()
+        self.id_allocator = IdAllocator.shared(storage)
+        self.id_allocator.seed('timeslot', lambda: IdAllocator.max_numeric_id(ts['timeslot_id'] for ts in self.timeslots))
+        self.id_allocator.seed('availability_rule', lambda: IdAllocator.max_numeric_id(r['rule_id'] for r in self.rules))
+        self.id_allocator.seed('availability_exception', lambda: IdAllocator.max_numeric_id(
+            e['exception_id'] for e in self.exceptions))
 
     def _load(self):
         """charge les créneaux depuis le fichier"""
         return self.storage.load_data(self.timeslots_file)
 
+    @synchronized
+    def reload_timeslots(self):
+        """recharge les créneaux (et les règles récurrentes) depuis le fichier"""
+        rules = self.storage.load_data(self.rules_file)
+        exceptions = self.storage.load_data(self.exceptions_file)
+        if rules is not self.rules or exceptions is not self.exceptions:
+            self.rules = rules
+            self.exceptions = exceptions
+            self._build_rule_index()
+        timeslots = self._load()
+        if timeslots is self.timeslots:
+            # fichier inchangé (cache du storage) : l'index est à jour
+            return
+        self.timeslots = timeslots
+        self._build_index()
+
     def _save(self):
         """sauvegarde les créneaux"""
         self.storage.save_data(self.timeslots_file, self.timeslots)
 
+    def _build_index(self):
+        """indexe les créneaux par docteur (triés par début) et par (docteur, début)"""
+        self._starts_by_doctor = {}  # doctor_id -> débuts ISO triés
+        self._slots_by_doctor = {}   # doctor_id -> créneaux dans le même ordre
+        self._slot_by_key = {}       # (doctor_id, début ISO) -> créneau
+        for slot in self.timeslots:
+            self._index_slot(slot)
+
+    def _index_slot(self, slot):
+        """ajoute un créneau aux index"""
+        doctor_id = slot['doctor_id']
+        start_iso = slot['start_time']
+        starts = self._starts_by_doctor.setdefault(doctor_id, [])
+        slots = self._slots_by_doctor.setdefault(doctor_id, [])
+        position = bisect_right(starts, start_iso)
+        starts.insert(position, start_iso)
+        slots.insert(position, slot)
+        # en cas de doublon on garde le premier, comme l'ancien parcours linéaire
+        self._slot_by_key.setdefault((doctor_id, start_iso), slot)
+
+    def _find_slot(self, doctor_id, start_time_iso):
+        """retrouve un créneau par docteur et heure de début en O(1)"""
+        return self._slot_by_key.get((doctor_id, start_time_iso))
+
+    def _build_rule_index(self):
+        """indexe les règles hebdomadaires par docteur et jour de semaine, et les absences par docteur"""
+        self._rules_by_doctor = {}       # doctor_id -> {jour de semaine: [règles]}
+        self._exceptions_by_doctor = {}  # doctor_id -> [(date début, date fin)]
+        for rule in self.rules:
+            weekdays = self._rules_by_doctor.setdefault(rule['doctor_id'], {})
+            weekdays.setdefault(rule['weekday'], []).append(rule)
+        for exception in self.exceptions:
+            self._exceptions_by_doctor.setdefault(exception['doctor_id'], []).append(
+                (exception['start_date'], exception['end_date'])
+            )
+
+    def _is_day_off(self, doctor_id, day_iso):
+        """vrai si le jour tombe dans une absence du docteur"""
+        return any(start <= day_iso <= end for start, end in self._exceptions_by_doctor.get(doctor_id, []))
+
+    def _generate_slots(self, doctor_id, start, end):
+        """calcule à la volée les créneaux des règles récurrentes qui commencent dans [start, end["""
+        weekdays = self._rules_by_doctor.get(doctor_id)
+        if not weekdays or start >= end:
+            return []
+        slots = []
+        day = start.date()
+        last_day = (end - timedelta(microseconds=1)).date()
+        while day <= last_day:
+            day_iso = day.isoformat()
+            rules = weekdays.get(day.weekday())
+            if rules and not self._is_day_off(doctor_id, day_iso):
+                for rule in rules:
+                    if day_iso < rule['valid_from'] or (rule['valid_until'] and day_iso > rule['valid_until']):
+                        continue
+                    slot_length = timedelta(minutes=rule['slot_minutes'])
+                    current = datetime.combine(day, time.fromisoformat(rule['start']))
+                    rule_end = datetime.combine(day, time.fromisoformat(rule['end']))
+                    while current + slot_length <= rule_end:
+                        if start <= current < end:
+                            slots.append({
+                                "timeslot_id": None,
+                                "doctor_id": doctor_id,
+                                "start_time": current.isoformat(),
+                                "end_time": (current + slot_length).isoformat(),
+                                "is_reserved": False,
+                                "rule_id": rule['rule_id']
+                            })
+                        current += slot_length
+            day += timedelta(days=1)
+        return slots
+
+    def _merge_slots(self, stored, generated):
+        """fusionne créneaux stockés et générés ; un créneau stocké (bloqué...) remplace le généré"""
+        if not generated:
+            return stored
+        by_start = {slot['start_time']: slot for slot in generated}
+        for slot in stored:
+            by_start.pop(slot['start_time'], None)
+        if not by_start:
+            return stored
+        return sorted(stored + list(by_start.values()), key=lambda slot: slot['start_time'])
+
+    def _recurring_window(self):
+        """fenêtre par défaut des créneaux récurrents : aujourd'hui + RECURRING_HORIZON_DAYS"""
+        start = datetime.combine(date.today(), time.min)
+        return start, start + timedelta(days=self.RECURRING_HORIZON_DAYS)
+
+    @synchronized
+    def add_recurring_availability(self, doctor_id, weekday, start_time, end_time,
+                                   slot_minutes=60, valid_from=None, valid_until=None):
+        """ajoute une disponibilité hebdomadaire (weekday : 0 = lundi) ; les créneaux ne sont pas stockés"""
+        if not 0 <= weekday <= 6:
+            raise ValueError("Le jour de la semaine doit être entre 0 (lundi) et 6 (dimanche)")
+        if slot_minutes <= 0:
+            raise ValueError("La durée d'un créneau doit être positive")
+        if start_time >= end_time:
+            raise ValueError("L'heure de début doit être avant l'heure de fin")
+        valid_from = valid_from or date.today()
+        if valid_until and valid_until < valid_from:
+            raise ValueError("La date de fin doit être après la date de début")
+        rule = {
+            "rule_id": self.id_allocator.next_id('availability_rule'),
+            "doctor_id": doctor_id,
+            "weekday": weekday,
+            "start": start_time.strftime('%H:%M'),
+            "end": end_time.strftime('%H:%M'),
+            "slot_minutes": slot_minutes,
+            "valid_from": valid_from.isoformat(),
+            "valid_until": valid_until.isoformat() if valid_until else None
+        }
+        self.rules.append(rule)
+        self._build_rule_index()
+        self.storage.save_data(self.rules_file, self.rules)
+        print(f"Disponibilité récurrente ajoutée pour Dr {doctor_id} (jour {weekday}, {rule['start']}-{rule['end']}).")
+        self.event_bus.publish(events.SCHEDULE_CHANGED, doctor_id=doctor_id)
+        return rule
+
+    @synchronized
+    def remove_recurring_availability(self, rule_id):
+        """supprime une règle de disponibilité hebdomadaire"""
+        rule = next((rule for rule in self.rules if rule['rule_id'] == rule_id), None)
+        if rule is None:
+            return False
+        self.rules.remove(rule)
+        self._build_rule_index()
+        self.storage.save_data(self.rules_file, self.rules)
+        self.event_bus.publish(events.SCHEDULE_CHANGED, doctor_id=rule['doctor_id'])
+        return True
+
+    @synchronized
+    def get_recurring_rules(self, doctor_id):
+        """récupère les règles hebdomadaires d'un docteur"""
+        return [rule for rule in self.rules if rule['doctor_id'] == doctor_id]
+
+    @synchronized
+    def add_availability_exception(self, doctor_id, start_date, end_date=None, reason=""):
+        """ajoute une absence (congés...) : les règles récurrentes ne génèrent rien ces jours-là
+        et les créneaux libres déjà stockés sur la période sont bloqués"""
+        end_date = end_date or start_date
+        if end_date < start_date:
+            raise ValueError("La date de fin doit être après la date de début")
+        exception = {
+            "exception_id": self.id_allocator.next_id('availability_exception'),
+            "doctor_id": doctor_id,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "reason": reason
+        }
+        self.exceptions.append(exception)
+        self._build_rule_index()
+        period = (datetime.combine(start_date, time.min), datetime.combine(end_date, time.min) + timedelta(days=1))
+        free_slots = self.get_doctor_slots_in_range(doctor_id, *period, free_only=True)
+        # gardés pour les débloquer si l'absence est supprimée
+        exception["blocked_timeslot_ids"] = [slot['timeslot_id'] for slot in free_slots]
+        with self.storage.transaction():
+            self.storage.save_data(self.exceptions_file, self.exceptions)
+            if free_slots:
+                for slot in free_slots:
+                    slot['is_reserved'] = True
+                self._save()
+        self.event_bus.publish(events.SCHEDULE_CHANGED, doctor_id=doctor_id)
+        return exception
+
+    @synchronized
+    def remove_availability_exception(self, exception_id):
+        """supprime une absence et débloque les créneaux stockés qu'elle avait bloqués"""
+        exception = next((e for e in self.exceptions if e['exception_id'] == exception_id), None)
+        if exception is None:
+            return False
+        self.exceptions.remove(exception)
+        self._build_rule_index()
+        doctor_id = exception['doctor_id']
+        blocked_ids = set(exception.get('blocked_timeslot_ids', ()))
+        released = 0
+        for slot in self.timeslots:
+            if slot['timeslot_id'] not in blocked_ids or not slot['is_reserved']:
+                continue
+            day = slot['start_time'][:10]
+            if self._is_day_off(doctor_id, day):
+                # une autre absence couvre encore ce jour : c'est elle qui garde le créneau bloqué
+                other = next(e for e in self.exceptions
+                             if e['doctor_id'] == doctor_id and e['start_date'] <= day <= e['end_date'])
+                other.setdefault('blocked_timeslot_ids', []).append(slot['timeslot_id'])
+            else:
+                slot['is_reserved'] = False
+                released += 1
+        with self.storage.transaction():
+            self.storage.save_data(self.exceptions_file, self.exceptions)
+            if released:
+                self._save()
+        self.event_bus.publish(events.SCHEDULE_CHANGED, doctor_id=exception['doctor_id'])
+        return True
+
+    @synchronized
+    def get_availability_exceptions(self, doctor_id):
+        """récupère les absences d'un docteur"""
+        return [e for e in self.exceptions if e['doctor_id'] == doctor_id]
+
+    @staticmethod
+    def _day_bounds(day):
+        """bornes ISO [début, fin[ d'une journée"""
+        start = datetime.combine(day, time.min)
+        return start, start + timedelta(days=1)
+
+    @synchronized
     def add_availability(self, doctor_id, start_time, end_time):
         """ajoute un créneau disponible pour un docteur"""
-        timeslot_id = len(self.timeslots) + 1
+        timeslot_id = self.id_allocator.next_id('timeslot')
         new_slot = {
             "timeslot_id": timeslot_id,
             "doctor_id": doctor_id,
@@ -26,62 +273,215 @@ class ScheduleManager:
             "is_reserved": False
         }
         self.timeslots.append(new_slot)
+        self._index_slot(new_slot)
         self._save()
         print(f"Disponibilité ajoutée pour Dr {doctor_id} de {start_time} à {end_time}.")
+        self.event_bus.publish(events.SLOTS_ADDED, doctor_id=doctor_id, count=1)
         return new_slot
 
-    def get_doctor_availability(self, doctor_id):
-        """récupère les créneaux libres d'un docteur"""
-        return [ts for ts in self.timeslots if ts['doctor_id'] == doctor_id and not ts['is_reserved']]
+    @staticmethod
+    def _slot_starts(start_date, end_date, day_start, day_end, slot_minutes, weekdays=None):
+        """valide une plage et retourne les débuts de créneaux [(début, fin)] jour par jour"""
+        if end_date < start_date:
+            raise ValueError("La date de fin doit être après la date de début")
+        if day_start >= day_end:
+            raise ValueError("L'heure de début doit être avant l'heure de fin")
+        if slot_minutes <= 0:
+            raise ValueError("La durée d'un créneau doit être positive")
+        if weekdays is not None and any(not 0 <= weekday <= 6 for weekday in weekdays):
+            raise ValueError("Les jours de la semaine doivent être entre 0 (lundi) et 6 (dimanche)")
+        slot_length = timedelta(minutes=slot_minutes)
+        bounds = []
+        day = start_date
+        while day <= end_date:
+            if weekdays is None or day.weekday() in weekdays:
+                current = datetime.combine(day, day_start)
+                last = datetime.combine(day, day_end)
+                while current + slot_length <= last:
+                    bounds.append((current, current + slot_length))
+                    current += slot_length
+            day += timedelta(days=1)
+        return bounds
+
+    @synchronized
+    def add_availability_range(self, doctor_id, start_date, end_date, day_start, day_end,
+                               slot_minutes=60, weekdays=None):
+        """ajoute des créneaux sur une plage de dates (heures quotidiennes fixes) en une seule sauvegarde"""
+        bounds = self._slot_starts(start_date, end_date, day_start, day_end, slot_minutes, weekdays)
+        # les créneaux déjà ouverts sont ignorés
+        bounds = [(start, end) for start, end in bounds if not self._find_slot(doctor_id, start.isoformat())]
+        added = []
+        with self.storage.transaction():
+            timeslot_ids = self.id_allocator.reserve_block('timeslot', len(bounds))
+            for timeslot_id, (start_time, end_time) in zip(timeslot_ids, bounds):
+                new_slot = {
+                    "timeslot_id": timeslot_id,
+                    "doctor_id": doctor_id,
+                    "start_time": start_time.isoformat(),
+                    "end_time": end_time.isoformat(),
+                    "is_reserved": False
+                }
+                self.timeslots.append(new_slot)
+                self._index_slot(new_slot)
+                added.append(new_slot)
+            if added:
+                self._save()
+        print(f"{len(added)} disponibilités ajoutées pour Dr {doctor_id} du {start_date} au {end_date}.")
+        if added:
+            self.event_bus.publish(events.SLOTS_ADDED, doctor_id=doctor_id, count=len(added))
+        return added
+
+    @synchronized
+    def block_range(self, doctor_id, start_date, end_date, day_start, day_end, slot_minutes=60, weekdays=None):
+        """bloque les créneaux libres d'une plage de dates en une seule sauvegarde ; retourne le nombre bloqué"""
+        bounds = self._slot_starts(start_date, end_date, day_start, day_end, slot_minutes, weekdays)
+        to_block = []        # créneaux stockés libres
+        to_materialize = []  # créneaux récurrents à stocker avant blocage
+        for start_time, _ in bounds:
+            start_iso = start_time.isoformat()
+            slot = self._find_slot(doctor_id, start_iso)
+            if slot is None:
+                generated = self._recurring_slot(doctor_id, start_iso)
+                if generated is not None:
+                    to_materialize.append(generated)
+            elif not slot['is_reserved']:
+                to_block.append(slot)
+        if not to_block and not to_materialize:
+            return 0
+        # ids, créneaux et séquences : un seul commit
+        with self.storage.transaction():
+            timeslot_ids = self.id_allocator.reserve_block('timeslot', len(to_materialize))
+            for timeslot_id, generated in zip(timeslot_ids, to_materialize):
+                to_block.append(self._store_slot(dict(generated, timeslot_id=timeslot_id)))
+            for slot in to_block:
+                slot['is_reserved'] = True
+            self._save()
+        self.event_bus.publish(events.SCHEDULE_CHANGED, doctor_id=doctor_id)
+        return len(to_block)
+
+    @synchronized
+    def get_doctor_slots_in_range(self, doctor_id, start, end, free_only=False):
+        """récupère les créneaux d'un docteur qui commencent dans [start, end["""
+        starts = self._starts_by_doctor.get(doctor_id, [])
+        slots = self._slots_by_doctor.get(doctor_id, [])
+        first = bisect_left(starts, start.isoformat())
+        last = bisect_left(starts, end.isoformat())
+        merged = self._merge_slots(slots[first:last], self._generate_slots(doctor_id, start, end))
+        return [ts for ts in merged if not (free_only and ts['is_reserved'])]
+
+    def _stored_and_recurring(self, doctor_id):
+        """créneaux stockés + créneaux récurrents de la fenêtre par défaut"""
+        stored = self._slots_by_doctor.get(doctor_id, [])
+        if doctor_id not in self._rules_by_doctor:
+            return list(stored)
+        return self._merge_slots(list(stored), self._generate_slots(doctor_id, *self._recurring_window()))
+
+    @synchronized
+    def get_doctor_availability(self, doctor_id, day=None):
+        """récupère les créneaux libres d'un docteur (d'un jour donné si précisé)"""
+        if day is not None:
+            return self.get_doctor_slots_in_range(doctor_id, *self._day_bounds(day), free_only=True)
+        return [ts for ts in self._stored_and_recurring(doctor_id) if not ts['is_reserved']]
+
+    @synchronized
+    def get_doctor_schedule(self, doctor_id, day=None):
+        """récupère tous les créneaux d'un docteur (d'un jour donné si précisé)"""
+        if day is not None:
+            return self.get_doctor_slots_in_range(doctor_id, *self._day_bounds(day))
+        return self._stored_and_recurring(doctor_id)
 
-    def get_doctor_schedule(self, doctor_id):
-        """récupère tous les créneaux d'un docteur"""
-        return [ts for ts in self.timeslots if ts['doctor_id'] == doctor_id]
+    @synchronized
+    def get_available_dates(self, doctor_id, limit=None):
+        """récupère les dates (triées) ayant au moins un créneau libre"""
+        dates = set()
+        for slot in self._slots_by_doctor.get(doctor_id, []):
+            if slot['is_reserved']:
+                continue
+            dates.add(slot['start_time'][:10])
+        if doctor_id in self._rules_by_doctor:
+            # jour par jour à partir d'aujourd'hui, jusqu'à avoir assez de dates
+            day = date.today()
+            found = 0
+            for _ in range(self.MAX_SEARCH_DAYS):
+                if limit is not None and found >= limit:
+                    break
+                day_iso = day.isoformat()
+                if day_iso in dates or self.get_doctor_slots_in_range(doctor_id, *self._day_bounds(day), free_only=True):
+                    dates.add(day_iso)
+                    found += 1
+                day += timedelta(days=1)
+        dates = sorted(dates)
+        if limit is not None:
+            dates = dates[:limit]
+        return [datetime.fromisoformat(d).date() for d in dates]
 
+    def _recurring_slot(self, doctor_id, start_time_iso):
+        """créneau récurrent (non stocké) qui commence à start_time_iso, ou None"""
+        start = datetime.fromisoformat(start_time_iso)
+        for slot in self._generate_slots(doctor_id, start, start + timedelta(microseconds=1)):
+            return slot
+        return None
+
+    def _store_slot(self, slot):
+        """ajoute un créneau à la liste et aux index"""
+        self.timeslots.append(slot)
+        self._index_slot(slot)
+        return slot
+
+    def _materialize(self, doctor_id, start_time_iso):
+        """stocke un créneau récurrent pour pouvoir modifier son état (blocage)"""
+        slot = self._recurring_slot(doctor_id, start_time_iso)
+        if slot is None:
+            return None
+        return self._store_slot(dict(slot, timeslot_id=self.id_allocator.next_id('timeslot')))
+
+    @synchronized
     def reserve_timeslot(self, doctor_id, start_time):
         """réserve un créneau"""
-        for slot in self.timeslots:
-            if slot['doctor_id'] == doctor_id and slot['start_time'] == start_time.isoformat():
-                if not slot['is_reserved']:
-                    slot['is_reserved'] = True
-                    self._save()
-                    return True
-                else:
-                    return False
+        slot = self._find_slot(doctor_id, start_time.isoformat())
+        if slot and not slot['is_reserved']:
+            slot['is_reserved'] = True
+            self._save()
+            self.event_bus.publish(events.SLOT_RESERVED, doctor_id=doctor_id, start_time=slot['start_time'])
+            return True
         return False
 
+    @synchronized
     def unreserve_timeslot(self, doctor_id, start_time_iso):
         """libère un créneau"""
-        for slot in self.timeslots:
-            if slot['doctor_id'] == doctor_id and slot['start_time'] == start_time_iso:
-                if slot['is_reserved']:
-                    slot['is_reserved'] = False
-                    self._save()
-                    return True
-                else:
-                    return False
+        slot = self._find_slot(doctor_id, start_time_iso)
+        if slot and slot['is_reserved']:
+            slot['is_reserved'] = False
+            self._save()
+            self.event_bus.publish(events.SLOT_RELEASED, doctor_id=doctor_id, start_time=start_time_iso)
+            return True
         return False
 
+    @synchronized
     def block_timeslot(self, doctor_id, start_time, end_time):
         """bloque un créneau"""
-        for slot in self.timeslots:
-            if slot['doctor_id'] == doctor_id and slot['start_time'] == start_time.isoformat():
-                if not slot['is_reserved']:
-                    slot['is_reserved'] = True
-                    self._save()
-                    return True
-                else:
-                    return False
+        slot = self._find_slot(doctor_id, start_time.isoformat()) or self._materialize(doctor_id, start_time.isoformat())
+        if slot and not slot['is_reserved']:
+            slot['is_reserved'] = True
+            self._save()
+            self.event_bus.publish(events.SLOT_BLOCKED, doctor_id=doctor_id, start_time=slot['start_time'])
+            return True
         return False
 
+    @synchronized
     def unblock_timeslot(self, doctor_id, start_time_iso):
         """débloque un créneau"""
-        for slot in self.timeslots:
-            if slot['doctor_id'] == doctor_id and slot['start_time'] == start_time_iso:
-                if slot['is_reserved']:
-                    slot['is_reserved'] = False
-                    self._save()
-                    return True
-                else:
-                    return False
-        return False 
\ No newline at end of file
+        slot = self._find_slot(doctor_id, start_time_iso)
+        if slot and slot['is_reserved']:
+            slot['is_reserved'] = False
+            # débloqué à la main : la suppression d'une absence ne doit plus y toucher (il peut être réservé d'ici là)
+            owners = [e for e in self.exceptions if slot['timeslot_id'] in e.get('blocked_timeslot_ids', ())]
+            for exception in owners:
+                exception['blocked_timeslot_ids'].remove(slot['timeslot_id'])
+            with self.storage.transaction():
+                if owners:
+                    self.storage.save_data(self.exceptions_file, self.exceptions)
+                self._save()
+            self.event_bus.publish(events.SLOT_UNBLOCKED, doctor_id=doctor_id, start_time=start_time_iso)
+            return True
+        return False
@@ -0,0 +1,324 @@
+import json
+import os
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from managers.storage_manager import StorageManager
+
+class SQLiteStorageManager:
+    """Backend SQLite (stdlib) avec le même contrat load_data/save_data que StorageManager.
+
+    Chaque dataset connu a sa table : les colonnes filtrables sont indexées
+    et l'enregistrement complet est gardé en JSON. Les autres fichiers sont
+    stockés tels quels dans la table documents.
+    """
+
+    # dataset -> (table, champ clé, colonnes indexées)
+    TABLES = {
+        'users.json': ('users', 'user_id', ('email', 'role', 'patient_id', 'doctor_id', 'secretary_id', 'last_name')),
+        'appointments.json': ('appointments', 'appointment_id', ('patient_id', 'doctor_id', 'status', 'start_time', 'end_time')),
+        'timeslots.json': ('timeslots', 'timeslot_id', ('doctor_id', 'start_time', 'end_time', 'is_reserved')),
+        'notifications.json': ('notifications', 'notification_id', ('user_id', 'status', 'created_at')),
+        'prescriptions.json': ('prescriptions', 'prescription_id', ('patient_id', 'doctor_id', 'date'))
+    }
+
+    def __init__(self, db_filename='cabinet.db', migrate=True):
+        self.data_directory = 'data'
+        if not os.path.exists(self.data_directory):
+            os.makedirs(self.data_directory)
+        self.db_path = os.path.join(self.data_directory, db_filename)
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._row_state = {}  # dataset -> {record_key: (position, data)} tel qu'en base
+        self._after_commit = []  # callbacks de la transaction en cours
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if migrate:
+            self.migrate_from_json()
+
+    def _create_schema(self):
+        """Crée les tables et index s'ils n'existent pas."""
+        with self._lock:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            for table, _, columns in self.TABLES.values():
+                column_defs = ", ".join(f"{column}" for column in columns)
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    f"record_key TEXT PRIMARY KEY, position INTEGER NOT NULL, {column_defs}, data TEXT NOT NULL)"
+                )
+                for column in columns:
+                    self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+
+    @contextmanager
+    def transaction(self):
+        """Groupe les écritures du bloc dans une seule transaction SQLite."""
+        callbacks = []
+        with self._lock:
+            if self._transaction_depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self._transaction_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.connection.execute("ROLLBACK")
+                    # l'état connu ne correspond plus à la base : relu au prochain save
+                    self._row_state.clear()
+                    self._after_commit.clear()
+                raise
+            else:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    callbacks, self._after_commit = self._after_commit, []
+                    self.connection.execute("COMMIT")
+        # hors du verrou : un callback peut prendre les verrous d'un autre manager
+        StorageManager._run_callbacks(callbacks)
+
+    def after_commit(self, callback):
+        """Appelle callback après le COMMIT de la transaction en cours (tout de suite hors transaction).
+
+        Rien n'est appelé si la transaction est annulée (ROLLBACK).
+        """
+        with self._lock:
+            if self._transaction_depth:
+                self._after_commit.append(callback)
+                return
+        StorageManager._run_callbacks([callback])
+
+    def load_data(self, filename):
+        """Charge un dataset (liste d'enregistrements) depuis la base."""
+        try:
+            with self._lock:
+                row = self.connection.execute("SELECT data FROM documents WHERE name = ?", (filename,)).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+                if filename not in self.TABLES:
+                    logging.info(f"Dataset {filename} not found, creating empty list")
+                    return []
+                table = self.TABLES[filename][0]
+                rows = self.connection.execute(
+                    f"SELECT record_key, position, data FROM {table} ORDER BY position").fetchall()
+                self._row_state[filename] = {record_key: (position, data) for record_key, position, data in rows}
+            logging.info(f"Successfully loaded {filename}")
+            return [json.loads(data) for (_, _, data) in rows]
+        except Exception as e:
+            logging.error(f"Unexpected error loading {filename}: {e}")
+            return []
+
+    def save_data(self, filename, data):
+        """Sauvegarde un dataset : seules les lignes modifiées sont écrites."""
+        try:
+            with self.transaction():
+                records = None
+                if filename in self.TABLES:
+                    records = StorageManager._index_records(data, self.TABLES[filename][1])
+                if records is None:
+                    # Dataset non tabulaire (ou clés dupliquées) : stocké en bloc
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO documents (name, data) VALUES (?, ?)",
+                        (filename, json.dumps(data, ensure_ascii=False))
+                    )
+                    return
+                self.connection.execute("DELETE FROM documents WHERE name = ?", (filename,))
+                self._save_rows(filename, records)
+            logging.info(f"Successfully saved {filename}")
+        except Exception as e:
+            logging.error(f"Error saving {filename}: {e}")
+            raise
+
+    def _save_rows(self, filename, records):
+        """Insère/met à jour les lignes changées et supprime celles qui ont disparu.
+
+        La comparaison se fait avec l'état gardé en mémoire depuis la dernière
+        lecture ou écriture : la table n'est relue qu'au premier save. Une
+        ligne garde sa position (ordre d'insertion) : supprimer ou modifier un
+        enregistrement n'écrit que cette ligne. Les positions ne sont
+        renumérotées que si l'ordre de la liste a changé.
+        """
+        table, _, columns = self.TABLES[filename]
+        existing = self._row_state.get(filename)
+        if existing is None:
+            existing = {record_key: (position, data) for record_key, position, data in
+                        self.connection.execute(f"SELECT record_key, position, data FROM {table}")}
+        serialized = {json.dumps(key): json.dumps(record, ensure_ascii=False) for key, record in records.items()}
+        positions = self._row_positions(serialized, existing)
+        placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+        upsert = f"INSERT OR REPLACE INTO {table} (record_key, position, {', '.join(columns)}, data) VALUES ({placeholders})"
+        current = {}
+        changed = []
+        for (record_key, data), record in zip(serialized.items(), records.values()):
+            current[record_key] = (positions[record_key], data)
+            if existing.get(record_key) != current[record_key]:
+                changed.append((record_key, positions[record_key],
+                                *(self._column_value(record.get(column)) for column in columns), data))
+        if changed:
+            self.connection.executemany(upsert, changed)
+        removed = [(record_key,) for record_key in existing if record_key not in current]
+        if removed:
+            self.connection.executemany(f"DELETE FROM {table} WHERE record_key = ?", removed)
+        self._row_state[filename] = current
+
+    @staticmethod
+    def _row_positions(serialized, existing):
+        """Position de chaque ligne : l'ancienne, ou la suivante pour un ajout en fin de liste.
+
+        Si l'ordre de la liste ne suit plus les positions (insertion au
+        milieu, tri...), tout est renuméroté dans l'ordre de la liste.
+        """
+        next_position = max((position for position, _ in existing.values()), default=-1) + 1
+        positions = {}
+        previous = -1
+        for record_key in serialized:
+            state = existing.get(record_key)
+            if state is None:
+                position, next_position = next_position, next_position + 1
+            else:
+                position = state[0]
+            if position <= previous:
+                return {record_key: index for index, record_key in enumerate(serialized)}
+            positions[record_key] = previous = position
+        return positions
+
+    @staticmethod
+    def _column_value(value):
+        """Valeur stockable dans une colonne indexée."""
+        if isinstance(value, bool):
+            return int(value)
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        return json.dumps(value, ensure_ascii=False)
+
+    def migrate_from_json(self, json_storage=None):
+        """Importe une seule fois les fichiers data/*.json existants.
+
+        Les datasets de TABLES vont dans leur table, tous les autres
+        (séquences, règles, outbox, registre des rappels...) dans documents.
+        """
+        with self._lock:
+            done = self.connection.execute("SELECT value FROM meta WHERE name = 'migrated_from_json'").fetchone()
+            if done:
+                return False
+            json_storage = json_storage or StorageManager()
+            with self.transaction():
+                for filename, (table, _, _) in self.TABLES.items():
+                    if self.connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                        continue
+                    data = json_storage.load_data(filename)
+                    if data:
+                        self.save_data(filename, data)
+                for filename in self._json_documents(json_storage.data_directory):
+                    if self.connection.execute("SELECT 1 FROM documents WHERE name = ?", (filename,)).fetchone():
+                        continue
+                    self.save_data(filename, json_storage.load_data(filename))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('migrated_from_json', datetime('now'))"
+                )
+            logging.info(f"JSON data migrated into {self.db_path}")
+            return True
+
+    def _where(self, filename, filters=None, range_column=None, start=None, end=None):
+        """Clause WHERE (et ses paramètres) : égalités + intervalle [start, end[."""
+        _, _, columns = self.TABLES[filename]
+        clauses = []
+        params = []
+        for column, value in (filters or {}).items():
+            if value is None:
+                continue
+            if column not in columns:
+                raise ValueError(f"Colonne non indexée: {column}")
+            clauses.append(f"{column} = ?")
+            params.append(self._column_value(value))
+        if range_column and start is not None:
+            clauses.append(f"{range_column} >= ?")
+            params.append(start.isoformat() if hasattr(start, 'isoformat') else start)
+        if range_column and end is not None:
+            clauses.append(f"{range_column} < ?")
+            params.append(end.isoformat() if hasattr(end, 'isoformat') else end)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _json_documents(self, directory):
+        """Fichiers data/*.json hors TABLES (stockés dans documents)."""
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory)
+                      if name.endswith('.json') and name not in self.TABLES
+                      and os.path.isfile(os.path.join(directory, name)))
+
+    def _query(self, filename, filters=None, range_column=None, start=None, end=None,
+               order_by=None, limit=None, offset=0):
+        """Requête générique sur une table : égalités + intervalle [start, end[."""
+        table, _, columns = self.TABLES[filename]
+        where, params = self._where(filename, filters, range_column, start, end)
+        sql = f"SELECT data FROM {table}{where}"
+        if order_by:
+            descending = order_by.startswith('-')
+            column = order_by.lstrip('-')
+            if column not in columns:
+                raise ValueError(f"Colonne non indexée: {column}")
+            sql += f" ORDER BY {column} {'DESC' if descending else 'ASC'}, position"
+        else:
+            sql += " ORDER BY position"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def _count(self, filename, filters=None, range_column=None, start=None, end=None):
+        """Nombre de lignes qui vérifient les mêmes filtres que _query."""
+        table = self.TABLES[filename][0]
+        where, params = self._where(filename, filters, range_column, start, end)
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+
+    def query_appointments(self, doctor_id=None, patient_id=None, status=None, start=None, end=None,
+                           order_by='start_time', limit=None, offset=0):
+        """Rdv filtrés par médecin, patient, statut et/ou début dans [start, end[."""
+        return self._query('appointments.json', {'doctor_id': doctor_id, 'patient_id': patient_id, 'status': status},
+                           'start_time', start, end, order_by, limit, offset)
+
+    def query_timeslots(self, doctor_id=None, start=None, end=None, free_only=False,
+                        order_by='start_time', limit=None, offset=0):
+        """Créneaux d'un médecin dont le début est dans [start, end[."""
+        filters = {'doctor_id': doctor_id, 'is_reserved': False if free_only else None}
+        return self._query('timeslots.json', filters, 'start_time', start, end, order_by, limit, offset)
+
+    def query_notifications(self, user_id=None, status=None, order_by='-created_at', limit=None, offset=0):
+        """Notifications d'un utilisateur, les plus récentes d'abord."""
+        return self._query('notifications.json', {'user_id': user_id, 'status': status},
+                           order_by=order_by, limit=limit, offset=offset)
+
+    def query_users(self, role=None, order_by='last_name', limit=None, offset=0):
+        """Utilisateurs (d'un rôle donné) triés et paginés."""
+        return self._query('users.json', {'role': role}, order_by=order_by, limit=limit, offset=offset)
+
+    def count_appointments(self, doctor_id=None, patient_id=None, status=None, start=None, end=None):
+        """Nombre de rdv pour les filtres de query_appointments."""
+        return self._count('appointments.json', {'doctor_id': doctor_id, 'patient_id': patient_id, 'status': status},
+                           'start_time', start, end)
+
+    def count_users(self, role=None):
+        """Nombre d'utilisateurs (d'un rôle donné)."""
+        return self._count('users.json', {'role': role})
+
+    def invalidate(self, filename=None):
+        """Rien à vider : chaque lecture interroge la base."""
+
+    def flush(self):
+        """Rien à faire : chaque save_data est déjà commité."""
+
+    def compact(self, filename=None):
+        """Rend l'espace libre au système de fichiers."""
+        with self._lock:
+            self.connection.execute("VACUUM")
+
+    def close(self):
+        """Ferme la connexion."""
+        with self._lock:
+            self.connection.close()
@@ -1,19 +1,74 @@
 from managers.storage_manager import StorageManager
+from managers.id_allocator import IdAllocator
 from models.patient import Patient
 # We will add other roles like Doctor and Secretary later
 import uuid
 import re
+import threading
+from managers.locking import synchronized
 
 class UserManager:
+    # Role ID fields, in the order find_user_by_role_id tries them
+    ROLE_ID_FIELDS = ('patient_id', 'doctor_id', 'secretary_id')
+
     def __init__(self, storage_manager):
+        # Called from the Tk thread and the GUI task runner: guards the list and indexes
+        self._lock = threading.RLock()
         self.storage_manager = storage_manager
         self.users_file = 'users.json'
         self.users = self._load_users()
+        self._build_indexes()
+        self.id_allocator = IdAllocator.shared(storage_manager)
+        self.id_allocator.seed('user', lambda: IdAllocator.max_numeric_id(user['user_id'] for user in self.users))
 
     def _load_users(self):
         """Loads users from the JSON file."""
         return self.storage_manager.load_data(self.users_file)
 
+    @synchronized
+    def reload_users(self):
+        """Reloads users from the JSON file."""
+        users = self._load_users()
+        if users is self.users:
+            # File unchanged (storage cache): the indexes are up to date
+            return
+        self.users = users
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """Rebuilds the lookup dictionaries (email, user_id and role IDs)."""
+        self._by_email = {}    # casefolded email -> user
+        self._by_user_id = {}  # user_id -> user
+        self._by_role_id = {field: {} for field in self.ROLE_ID_FIELDS}
+        self._sorted_pages = {}  # (role, order_by) -> sorted users, for get_users_page
+        for user in self.users:
+            self._index_user(user)
+
+    @staticmethod
+    def _email_key(email):
+        """Normalises an email for lookups."""
+        return email.strip().casefold() if isinstance(email, str) else email
+
+    def _index_user(self, user):
+        """Adds a user to the indexes (the first user wins on duplicates, like the old scans)."""
+        self._sorted_pages.clear()
+        if user.get('email') is not None:
+            self._by_email.setdefault(self._email_key(user['email']), user)
+        if user.get('user_id') is not None:
+            self._by_user_id.setdefault(user['user_id'], user)
+        for field, index in self._by_role_id.items():
+            if user.get(field) is not None:
+                index.setdefault(user[field], user)
+
+    def _unindex_user(self, user):
+        """Removes a user from the indexes."""
+        self._sorted_pages.clear()
+        keys = [(self._by_email, self._email_key(user.get('email'))), (self._by_user_id, user.get('user_id'))]
+        keys += [(index, user.get(field)) for field, index in self._by_role_id.items()]
+        for index, key in keys:
+            if key is not None and index.get(key) is user:
+                del index[key]
+
     def _save_users(self):
         """Saves the current list of users to the JSON file."""
         self.storage_manager.save_data(self.users_file, self.users)
@@ -35,64 +90,62 @@ class UserManager:
         clean_ssn = re.sub(r'[^\d]', '', ssn)
         return len(clean_ssn) >= 10
 
+    @synchronized
     def find_user_by_email(self, email):
-        """Finds a user by their email address."""
-        for user in self.users:
-            if user['email'] == email:
-                return user
-        return None
+        """Finds a user by their email address (case-insensitive)."""
+        return self._by_email.get(self._email_key(email))
 
+    @synchronized
     def find_user_by_id(self, user_id):
         """Finds a user by their user ID."""
-        for user in self.users:
-            if user.get('user_id') == user_id:
-                return user
-        return None
+        return self._by_user_id.get(user_id)
 
+    @synchronized
     def find_user_by_patient_id(self, patient_id):
         """Finds a patient by their patient ID."""
-        for user in self.users:
-            if user.get('patient_id') == patient_id:
-                return user
-        return None
+        return self._by_role_id['patient_id'].get(patient_id)
 
+    @synchronized
     def find_user_by_doctor_id(self, doctor_id):
         """Finds a doctor by their doctor ID."""
-        for user in self.users:
-            if user.get('doctor_id') == doctor_id:
-                return user
-        return None
+        return self._by_role_id['doctor_id'].get(doctor_id)
 
+    @synchronized
     def find_user_by_role_id(self, role_id):
         """Finds a user by any role ID (patient_id, doctor_id, secretary_id)."""
-        for user in self.users:
-            if (user.get('patient_id') == role_id or 
-                user.get('doctor_id') == role_id or 
-                user.get('secretary_id') == role_id):
+        for index in self._by_role_id.values():
+            user = index.get(role_id)
+            if user is not None:
                 return user
         return None
 
+    @synchronized
     def get_user(self, user_id):
-        """Gets a user by their ID (alias for find_user_by_id)."""
-        return self.find_user_by_id(user_id)
+        """Gets a user by their user ID or, failing that, by a role ID.
 
+        Appointments store role IDs (PAT-n, DR-n), so the notification code
+        passes those here.
+        """
+        return self.find_user_by_id(user_id) or self.find_user_by_role_id(user_id)
+
+    @synchronized
     def update_user(self, email, updated_data):
         """Updates a user's information by email."""
-        for i, user in enumerate(self.users):
-            if user.get('email') == email:
-                self.users[i].update(updated_data)
-                self._save_users()
-                return True
-        return False
+        user = self.find_user_by_email(email)
+        if user is None:
+            return False
+        self._unindex_user(user)
+        user.update(updated_data)
+        self._index_user(user)
+        self._save_users()
+        return True
 
+    @synchronized
     def get_next_user_id(self):
-        """Generates a new unique user ID."""
-        # This is a simple way to generate IDs. For a real application,
-        # a more robust method like UUIDs would be better.
-        if not self.users:
-            return 1
-        return max(user['user_id'] for user in self.users) + 1
+        """Generates a new unique user ID from the shared user sequence."""
+        return self.id_allocator.next_id('user')
 
+    @synchronized
     def register_patient(self, first_name, last_name, email, phone, password, date_of_birth, ssn):
         """Registers a new patient and saves them to the file."""
         # Validation
@@ -128,10 +181,12 @@ class UserManager:
             "role": "Patient"
         }
         self.users.append(new_patient)
+        self._index_user(new_patient)
         self._save_users()
         print("Registration successful!")
         return new_patient
 
+    @synchronized
     def register_secretary(self, first_name, last_name, email, phone, password):
         """Registers a new secretary and saves them to the file."""
         # Validation
@@ -163,10 +218,12 @@ class UserManager:
             "role": "Secretary"
         }
         self.users.append(new_secretary)
+        self._index_user(new_secretary)
         self._save_users()
         print("Secretary registration successful!")
         return new_secretary
 
+    @synchronized
     def register_doctor(self, first_name, last_name, email, phone, password, specialty):
         """Registers a new doctor and saves them to the file."""
         # Validation
@@ -199,28 +256,54 @@ class UserManager:
             "role": "Doctor"
         }
         self.users.append(new_doctor)
+        self._index_user(new_doctor)
         self._save_users()
         print("Doctor registration successful!")
         return new_doctor
 
+    @synchronized
     def login_user(self, email, password):
         """Logs a user in by checking their email and password."""
-        self.users = self._load_users() # Reload users from file before login
+        self.reload_users() # Reload users from file before login
         user = self.find_user_by_email(email)
         if user and user['password'] == password:  # Direct comparison
             # Do not print here, let the GUI handle messages
             return user
         return None
 
+    @synchronized
     def get_all_users(self):
         """Gets all users."""
-        return self.users
+        return list(self.users)  # copy: the task runner may change the list
 
+    @synchronized
+    def get_users_page(self, role=None, offset=0, limit=50, order_by='last_name'):
+        """Gets one page of users, sorted by order_by ('-field' for descending).
+
+        Returns (users, total) where total is the number of users matching
+        role, so list views can size their scrollbar without loading every row.
+        The SQLite backend pages in the database; the JSON backend sorts once
+        and reuses the sorted list until the next change.
+        """
+        query = getattr(self.storage_manager, 'query_users', None)
+        if query is not None:
+            return query(role, order_by, limit, offset), self.storage_manager.count_users(role)
+        key = (role, order_by)
+        users = self._sorted_pages.get(key)
+        if users is None:
+            field = order_by.lstrip('-')
+            users = [user for user in self.users if role is None or user.get('role') == role]
+            users.sort(key=lambda user: str(user.get(field) or ''), reverse=order_by.startswith('-'))
+            self._sorted_pages[key] = users
+        return users[offset:offset + limit], len(users)
+
+    @synchronized
     def delete_user(self, user_id):
         """Deletes a user by their user ID."""
-        for i, user in enumerate(self.users):
-            if user['user_id'] == user_id:
-                del self.users[i]
-                self._save_users()
-                return True
-        return False 
\ No newline at end of file
+        user = self.find_user_by_id(user_id)
+        if user is None:
+            return False
+        self.users.remove(user)
+        self._unindex_user(user)
+        self._save_users()
+        return True 
\ No newline at end of file
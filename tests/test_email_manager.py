@@ -0,0 +1,73 @@
+import time
+import unittest
+
+from managers.email_manager import EmailManager, SMTPConnectionPool
+from tests.test_storage_manager import StorageTestCase
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def sendmail(self, sender, to_email, message):
+        self.sent.append(to_email)
+
+    def noop(self):
+        return (250, b'OK')
+
+    def quit(self):
+        self.closed = True
+
+
+class SendManyTest(StorageTestCase):
+    def _manager(self, connect):
+        manager = EmailManager()
+        manager.sender_email = 'cabinet@example.com'
+        manager.sender_password = 'secret'
+        manager.is_configured = True
+        manager.pool = SMTPConnectionPool(connect)
+        return manager
+
+    def test_unreachable_server_fails_the_batch_after_one_reconnect(self):
+        attempts = []
+
+        def connect():
+            attempts.append(1)
+            raise OSError("connection timed out")
+
+        manager = self._manager(connect)
+        messages = [(f"patient{i}@example.com", "Sujet", "Corps") for i in range(10)]
+
+        self.assertEqual(manager.send_many(messages), [False] * 10)
+        self.assertEqual(len(attempts), 2)
+
+    def test_batch_is_sent_over_one_session(self):
+        sessions = []
+
+        def connect():
+            sessions.append(FakeSession())
+            return sessions[-1]
+
+        manager = self._manager(connect)
+        messages = [(f"patient{i}@example.com", "Sujet", "Corps") for i in range(3)]
+
+        self.assertEqual(manager.send_many(messages), [True] * 3)
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(len(sessions[0].sent), 3)
+
+
+class IdleReaperTest(unittest.TestCase):
+    def test_idle_sessions_are_closed_in_the_background(self):
+        session = FakeSession()
+        pool = SMTPConnectionPool(lambda: session, idle_timeout=0.05)
+        with pool.connection():
+            pass
+
+        time.sleep(0.5)
+        self.assertTrue(session.closed)
+        self.assertEqual(pool._idle, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from managers.storage_manager import StorageManager
+from managers.id_allocator import IdAllocator
+from tests.test_storage_manager import StorageTestCase
+
+
+class SeedTest(StorageTestCase):
+    def test_sequence_behind_the_data_is_raised(self):
+        storage = StorageManager()
+        # sequences.json en retard sur les rdv (crash entre les deux écritures)
+        storage.save_data(IdAllocator.SEQUENCES_FILE, [{'sequence': 'appointment', 'last_value': 3}])
+        allocator = IdAllocator(storage)
+        allocator.seed('appointment', lambda: IdAllocator.max_numeric_id(['APT-3', 'APT-7']))
+        self.assertEqual(allocator.next_id('appointment'), 8)
+
+    def test_sequence_never_goes_down(self):
+        storage = StorageManager()
+        storage.save_data(IdAllocator.SEQUENCES_FILE, [{'sequence': 'appointment', 'last_value': 10}])
+        allocator = IdAllocator(storage)
+        allocator.seed('appointment', lambda: 7)
+        self.assertEqual(allocator.next_id('appointment'), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
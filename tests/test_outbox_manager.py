@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from managers.appointment_manager import AppointmentManager
+from managers.sqlite_storage_manager import SQLiteStorageManager
+from tests.test_storage_manager import StorageTestCase
+
+
+class FailingEmailManager:
+    """Server that refuses every message: each batch makes the worker save the outbox."""
+
+    is_configured = True
+
+    def __init__(self):
+        self.batches = 0
+
+    def send_many(self, messages):
+        self.batches += 1
+        return [False] * len(messages)
+
+
+class OutboxTestCase(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = SQLiteStorageManager('test.db', migrate=False)
+        self.storage.save_data('users.json', [
+            {'user_id': 1, 'role': 'Patient', 'patient_id': 'PAT-1', 'email': 'patient@example.com',
+             'first_name': 'Leia', 'last_name': 'Organa'},
+            {'user_id': 2, 'role': 'Doctor', 'doctor_id': 'DR-1', 'email': 'doctor@example.com',
+             'first_name': 'Ben', 'last_name': 'Kenobi'},
+        ])
+        self.manager = AppointmentManager(self.storage)
+        self.outbox = self.manager.reminder_manager.outbox
+        self.outbox.email_manager = FailingEmailManager()
+        self.outbox.base_delay = 0
+        self.outbox.max_attempts = 10 ** 6
+
+    def tearDown(self):
+        self.outbox.stop()
+        self.storage.close()
+        super().tearDown()
+
+    def _slot(self, index):
+        start = datetime.now().replace(microsecond=0) + timedelta(days=1, hours=index)
+        return start, start + timedelta(minutes=30)
+
+
+class WorkerWhileBookingTest(OutboxTestCase):
+    def test_booking_does_not_deadlock_with_the_worker(self):
+        self.outbox.start()
+        results = []
+
+        def book():
+            for index in range(50):
+                start, end = self._slot(index)
+                results.append(self.manager.book_appointment('PAT-1', 'DR-1', start, end, 'Contrôle',
+                                                              auto_confirm=True)[0])
+
+        booker = threading.Thread(target=book, daemon=True)
+        booker.start()
+        booker.join(timeout=30)
+
+        self.assertFalse(booker.is_alive(), "booking blocked by the outbox worker")
+        self.assertEqual(results, [True] * 50)
+        self.assertGreater(self.outbox.email_manager.batches, 0)
+        self.assertEqual(len(self.storage.load_data('email_outbox.json')), 50)
+
+
+class WakeAfterCommitTest(OutboxTestCase):
+    def test_rolled_back_message_is_never_sent(self):
+        self.outbox.start()
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.outbox.enqueue('patient@example.com', 'Sujet', 'Corps')
+                time.sleep(0.2)
+                raise RuntimeError("rollback")
+
+        time.sleep(0.2)
+        self.assertEqual(self.outbox.email_manager.batches, 0)
+        self.assertEqual(self.outbox.get_pending(), [])
+        self.assertEqual(self.storage.load_data('email_outbox.json'), [])
+
+
+class SharedOutboxTest(OutboxTestCase):
+    def test_managers_on_the_same_data_share_one_outbox(self):
+        other = AppointmentManager(self.storage)
+        self.assertIs(other.reminder_manager.outbox, self.outbox)
+        self.assertIs(other.reminder_manager.email_manager, self.outbox.email_manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
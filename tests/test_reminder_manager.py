@@ -0,0 +1,25 @@
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import config
+from managers.storage_manager import StorageManager
+from managers.appointment_manager import AppointmentManager
+from tests.test_storage_manager import StorageTestCase
+
+
+class LeadTimesTest(StorageTestCase):
+    def test_lead_times_default_to_config(self):
+        lead_times = {'J-7': timedelta(days=7), 'H-2': timedelta(hours=2)}
+        with mock.patch.object(config, 'REMINDER_LEAD_TIMES', lead_times):
+            manager = AppointmentManager(StorageManager())
+        self.assertEqual(manager.reminder_manager.lead_times, lead_times)
+
+    def test_lead_times_passed_through_appointment_manager(self):
+        lead_times = {'J-1': timedelta(days=1), 'H-2': timedelta(hours=2)}
+        manager = AppointmentManager(StorageManager(), reminder_lead_times=lead_times)
+        self.assertEqual(manager.reminder_manager.lead_times, lead_times)
+
+
+if __name__ == '__main__':
+    unittest.main()
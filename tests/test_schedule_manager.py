@@ -0,0 +1,82 @@
+import unittest
+from datetime import date, datetime, time, timedelta
+
+from managers.storage_manager import StorageManager
+from managers.schedule_manager import ScheduleManager
+from tests.test_storage_manager import StorageTestCase
+
+
+class ScheduleTestCase(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = StorageManager()
+        self.schedule = ScheduleManager(self.storage)
+        self.day = date.today() + timedelta(days=14)
+
+    def count_commits(self):
+        """Records the datasets of every commit made from now on."""
+        commits = []
+        commit_group = self.storage._commit_group
+
+        def recording(datasets, **kwargs):
+            commits.append(sorted(datasets))
+            return commit_group(datasets, **kwargs)
+        self.storage._commit_group = recording
+        return commits
+
+
+class BlockRangeTest(ScheduleTestCase):
+    def test_blocking_recurring_slots_is_one_commit(self):
+        self.schedule.add_recurring_availability('DR-1', self.day.weekday(), time(8), time(18))
+        self.assertEqual(len(self.schedule.get_doctor_availability('DR-1', self.day)), 10)
+        commits = self.count_commits()
+
+        blocked = self.schedule.block_range('DR-1', self.day, self.day, time(8), time(18))
+
+        self.assertEqual(blocked, 10)
+        self.assertEqual(commits, [['sequences.json', 'timeslots.json']])
+        self.assertEqual(self.schedule.get_doctor_availability('DR-1', self.day), [])
+
+
+class AvailabilityExceptionTest(ScheduleTestCase):
+    def _slot(self, hour):
+        start = datetime.combine(self.day, time(hour))
+        return self.schedule.add_availability('DR-1', start, start + timedelta(hours=1))
+
+    def test_removing_an_exception_unblocks_its_stored_slots(self):
+        self._slot(9)
+        self._slot(10)
+        exception = self.schedule.add_availability_exception('DR-1', self.day, reason="Congés")
+        self.assertEqual(self.schedule.get_doctor_availability('DR-1', self.day), [])
+
+        self.assertTrue(self.schedule.remove_availability_exception(exception['exception_id']))
+
+        free = self.schedule.get_doctor_availability('DR-1', self.day)
+        self.assertEqual(len(free), 2)
+        reloaded = ScheduleManager(self.storage)
+        self.assertEqual(len(reloaded.get_doctor_availability('DR-1', self.day)), 2)
+
+    def test_slots_stay_blocked_while_another_exception_covers_them(self):
+        self._slot(9)
+        first = self.schedule.add_availability_exception('DR-1', self.day)
+        second = self.schedule.add_availability_exception('DR-1', self.day, self.day + timedelta(days=1))
+
+        self.schedule.remove_availability_exception(first['exception_id'])
+        self.assertEqual(self.schedule.get_doctor_availability('DR-1', self.day), [])
+
+        self.schedule.remove_availability_exception(second['exception_id'])
+        self.assertEqual(len(self.schedule.get_doctor_availability('DR-1', self.day)), 1)
+
+    def test_slot_unblocked_by_hand_is_not_touched_on_removal(self):
+        slot = self._slot(9)
+        exception = self.schedule.add_availability_exception('DR-1', self.day)
+        self.schedule.unblock_timeslot('DR-1', slot['start_time'])
+        self.schedule.reserve_timeslot('DR-1', datetime.fromisoformat(slot['start_time']))
+
+        self.schedule.remove_availability_exception(exception['exception_id'])
+
+        self.assertTrue(slot['is_reserved'])
+
+
+if __name__ == '__main__':
+    unittest.main()
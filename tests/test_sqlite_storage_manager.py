@@ -0,0 +1,70 @@
+import unittest
+
+from managers.storage_manager import StorageManager
+from managers.sqlite_storage_manager import SQLiteStorageManager
+from tests.test_storage_manager import StorageTestCase
+
+
+class MigrationTest(StorageTestCase):
+    def test_migration_copies_tables_and_documents(self):
+        json_storage = StorageManager()
+        datasets = {
+            'users.json': [{'user_id': 1, 'last_name': 'Skywalker', 'role': 'Patient'}],
+            'appointments.json': [{'appointment_id': 'APT-1', 'patient_id': 'PAT-1', 'doctor_id': 'DR-1',
+                                   'status': 'pending', 'start_time': '2030-01-01T10:00:00',
+                                   'end_time': '2030-01-01T11:00:00'}],
+            'sequences.json': [{'sequence': 'appointment', 'last_value': 41}],
+            'availability_rules.json': [{'rule_id': 1, 'doctor_id': 'DR-1', 'weekday': 0}],
+            'availability_exceptions.json': [{'exception_id': 1, 'doctor_id': 'DR-1'}],
+            'email_outbox.json': [{'message_id': 'M-1', 'status': 'pending'}],
+            'reminder_ledger.json': [{'key': 'APT-1|reminder|J-1', 'appointment_start': '2030-01-01T10:00:00'}],
+        }
+        for filename, data in datasets.items():
+            json_storage.save_data(filename, data)
+
+        storage = SQLiteStorageManager('test.db')
+
+        for filename, data in datasets.items():
+            self.assertEqual(storage.load_data(filename), data, filename)
+        self.assertFalse(storage.migrate_from_json(json_storage))
+        storage.close()
+
+
+class SaveRowsTest(StorageTestCase):
+    def test_save_writes_only_changed_rows_without_rereading_the_table(self):
+        storage = SQLiteStorageManager('test.db', migrate=False)
+        users = [{'user_id': user_id, 'last_name': f"User {user_id}"} for user_id in range(100)]
+        storage.save_data('users.json', users)
+
+        statements = []
+        storage.connection.set_trace_callback(statements.append)
+        users[5]['last_name'] = 'Changed'
+        del users[50]
+        storage.save_data('users.json', users)
+        storage.connection.set_trace_callback(None)
+
+        self.assertFalse([sql for sql in statements if sql.startswith('SELECT')])
+        writes = [sql for sql in statements if sql.startswith(('INSERT', 'DELETE FROM users'))]
+        # user 5 modifié, user 50 supprimé : les suivants gardent leur position
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(storage.load_data('users.json'), users)
+        storage.close()
+
+    def test_reordered_list_is_loaded_in_the_new_order(self):
+        storage = SQLiteStorageManager('test.db', migrate=False)
+        users = [{'user_id': user_id, 'last_name': f"User {user_id}"} for user_id in range(10)]
+        storage.save_data('users.json', users)
+        users.append({'user_id': 10, 'last_name': 'User 10'})
+        storage.save_data('users.json', users)
+        users.insert(3, {'user_id': 11, 'last_name': 'User 11'})
+        users.reverse()
+        storage.save_data('users.json', users)
+
+        storage.close()
+        storage = SQLiteStorageManager('test.db', migrate=False)
+        self.assertEqual(storage.load_data('users.json'), users)
+        storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
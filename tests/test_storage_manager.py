@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from managers.storage_manager import StorageManager
+
+
+class StorageTestCase(unittest.TestCase):
+    """Runs each test in an empty working directory (the managers use ./data)."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.mkdtemp()
+        os.chdir(self._tmp)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+class JournalRecoveryTest(StorageTestCase):
+    def _users(self, *ids):
+        return [{'user_id': user_id, 'last_name': f"User {user_id}"} for user_id in ids]
+
+    def test_torn_tail_does_not_swallow_next_commit(self):
+        storage = StorageManager()
+        storage.save_data('users.json', self._users(1, 2))
+        storage.save_data('users.json', self._users(1, 2, 3))
+        journal_path = os.path.join('data', 'users.json.journal')
+        # Crash pendant un append : fragment sans fin de ligne
+        with open(journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('{"op": "put", "val')
+
+        storage = StorageManager()
+        users = storage.load_data('users.json')
+        self.assertEqual([user['user_id'] for user in users], [1, 2, 3])
+        storage.save_data('users.json', users + self._users(4))
+
+        reloaded = StorageManager().load_data('users.json')
+        self.assertEqual([user['user_id'] for user in reloaded], [1, 2, 3, 4])
+
+    def test_glued_line_keeps_the_complete_entry(self):
+        storage = StorageManager()
+        storage.save_data('users.json', self._users(1, 2))
+        storage.save_data('users.json', self._users(1, 2, 3))
+        journal_path = os.path.join('data', 'users.json.journal')
+        entry = json.dumps({'op': 'put', 'value': self._users(4)[0]})
+        with open(journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('{"op": "put", "val' + entry + '\n')
+
+        users = StorageManager().load_data('users.json')
+        self.assertEqual([user['user_id'] for user in users], [1, 2, 3, 4])
+
+    def test_damaged_middle_line_is_skipped(self):
+        storage = StorageManager()
+        storage.save_data('users.json', self._users(1))
+        journal_path = os.path.join('data', 'users.json.journal')
+        with open(journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('not json\n')
+            journal.write(json.dumps({'op': 'put', 'value': self._users(2)[0]}) + '\n')
+
+        users = StorageManager().load_data('users.json')
+        self.assertEqual([user['user_id'] for user in users], [1, 2])
+
+
+class WriteBehindTest(StorageTestCase):
+    def test_save_blocks_once_too_many_records_are_pending(self):
+        storage = StorageManager(write_behind=True, write_delay=60, max_pending_records=10)
+        storage.save_data('users.json', [{'user_id': user_id} for user_id in range(10)])
+
+        blocked = threading.Thread(target=storage.save_data, args=('timeslots.json', [{'timeslot_id': 1}]),
+                                   daemon=True)
+        blocked.start()
+        blocked.join(timeout=0.2)
+        self.assertTrue(blocked.is_alive())
+
+        storage.flush()
+        blocked.join(timeout=5)
+        self.assertFalse(blocked.is_alive())
+        storage.close()
+        self.assertEqual(StorageManager().load_data('timeslots.json'), [{'timeslot_id': 1}])
+
+    def test_pending_copy_is_isolated_from_nested_changes(self):
+        storage = StorageManager(write_behind=True, write_delay=60)
+        exceptions = [{'exception_id': 1, 'blocked_timeslot_ids': [1, 2]}]
+        storage.save_data('availability_exceptions.json', exceptions)
+        exceptions[0]['blocked_timeslot_ids'].append(3)
+        exceptions[0]['exception_id'] = 2
+        storage.close()
+
+        self.assertEqual(StorageManager().load_data('availability_exceptions.json'),
+                         [{'exception_id': 1, 'blocked_timeslot_ids': [1, 2]}])
+
+
+if __name__ == '__main__':
+    unittest.main()